@@ -1,10 +1,14 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import pandas_datareader as pdr
-from datetime import datetime, timedelta
+import numpy as np
+import plotly.graph_objects as go
+from concurrent.futures import ThreadPoolExecutor
+from analytics.market_calendar import MAX_ENTRY_AGE, cache_epoch
+from analytics.metrics import begin_run, bind, cached, render_debug_panel, timed
+from analytics.valuation import fetch_inputs, get_aaa_yield, graham_grid, graham_value, recommendation
+from analytics.universe import index_members
 
-stocks = ('SET50.BK','ADVANC.BK', 'AOT.BK', 'AWC.BK', 'BANPU.BK', 'BBL.BK', 'BDMS.BK', 'BEM.BK', 'BGRIM.BK', 'BH.BK', 'BTS.BK', 'CBG.BK', 'CENTEL.BK', 'COM7.BK', 'CPALL.BK', 'CPF.BK', 'CPN.BK', 'CRC.BK', 'DELTA.BK', 'EA.BK', 'EGCO.BK', 'GLOBAL.BK', 'GPSC.BK', 'GULF.BK', 'HMPRO.BK', 'INTUCH.BK', 'IVL.BK', 'KBANK.BK', 'KCE.BK', 'KTB.BK', 'KTC.BK', 'LH.BK', 'MINT.BK', 'MTC.BK', 'OR.BK', 'OSP.BK', 'PTT.BK', 'PTTEP.BK', 'PTTGC.BK', 'RATCH.BK', 'SAWAD.BK', 'SCB.BK', 'SCC.BK', 'SCGP.BK', 'TISCO.BK', 'TLI.BK', 'TOP.BK', 'TRUE.BK', 'TTB.BK', 'TU.BK', 'WHA.BK')
+stocks = index_members("SET50")
 
 streamlit_style = """
 <style>
@@ -19,145 +23,111 @@ background-image: linear-gradient(90deg, rgb(0 0 0), rgb(0 0 0));
 </style>
 """
 
+begin_run("graham")
 st.markdown(streamlit_style, unsafe_allow_html=True)
 
 st.header("ประเมินมูลค่าหุ้น")
 st.write('สูตรประเมินแบบ Benjamin Graham')
+mode = st.radio("โหมด", ["คำนวณรายตัว", "วิเคราะห์ความอ่อนไหว"], horizontal=True)
 ticker = st.selectbox("เลือกหุ้น", stocks)
 ng_pe = st.text_input('PE ที่ไม่มีการเติบโต', 8.5)
 multiplier = st.text_input('ระยะการเติบโต', 2)
 margin = st.text_input('ส่วนเผื่อราคา (%)', 35)
 
-def get_current_price(ticker_data):
-    """ฟังก์ชันสำหรับหาราคาปัจจุบันจากหลายแหล่ง"""
-    quote = ticker_data.info
-    
-    # ลองหาราคาจากหลายฟิลด์
-    price_fields = [
-        "regularMarketPrice",
-        "regularMarketPreviousClose", 
-        "currentPrice",
-        "ask",
-        "bid",
-        "previousClose"
-    ]
-    
-    for field in price_fields:
-        if field in quote and quote[field] is not None:
-            try:
-                price = float(quote[field])
-                if price > 0:
-                    return price
-            except (ValueError, TypeError):
-                continue
-    
-    # ถ้าไม่เจอราคาจาก info ให้ลองใช้ history
-    try:
-        hist = ticker_data.history(period="5d")
-        if not hist.empty:
-            return float(hist['Close'].iloc[-1])
-    except Exception:
-        pass
-    
-    return None
+@cached("graham.inputs", st.cache_data(ttl=MAX_ENTRY_AGE), key=cache_epoch)
+def load_inputs(tickers):
+    """Price, EPS and growth per ticker (one shared bond yield), fetched once per epoch"""
+    current_yield = get_aaa_yield()
 
-def get_eps(ticker_data):
-    """ฟังก์ชันสำหรับหา EPS"""
-    quote = ticker_data.info
-    
-    eps_fields = [
-        "trailingEps",
-        "forwardEps", 
-        "eps"
-    ]
-    
-    for field in eps_fields:
-        if field in quote and quote[field] is not None:
-            try:
-                eps = float(quote[field])
-                if eps != 0:
-                    return eps
-            except (ValueError, TypeError):
-                continue
-    
-    return None
+    def fetch(ticker):
+        try:
+            return {"Ticker": ticker, **fetch_inputs(ticker, current_yield=current_yield)}
+        except Exception:
+            return None
 
-def get_growth_rate(ticker_data):
-    """ฟังก์ชันสำหรับหาอัตราการเติบโต"""
-    quote = ticker_data.info
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        rows = [row for row in executor.map(bind(fetch), tickers) if row and row["eps"] is not None]
+    return pd.DataFrame(rows, columns=["Ticker", "current_price", "eps", "growth_rate", "current_yield"])
+
+def sensitivity(ticker, multiplier, margin):
+    """Heatmaps of the Graham value over growth rate x yield (one ticker) or ticker x growth rate (SET50)"""
+    scope = st.radio("ขอบเขต", ["หุ้นที่เลือก", "ทั้ง SET50"], horizontal=True)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        growth_range = st.slider("อัตราการเติบโต (%)", 0.0, 30.0, (0.0, 20.0), 0.5)
+    with col2:
+        yield_range = st.slider("ผลตอบแทนบอนด์ (%)", 0.5, 10.0, (1.0, 8.0), 0.25)
+    with col3:
+        pe_range = st.slider("PE ที่ไม่มีการเติบโต", 4.0, 15.0, (7.0, 10.0), 0.5)
+    steps = st.number_input("จำนวนจุดต่อแกน", min_value=5, max_value=201, value=41, step=1)
     
-    growth_fields = [
-        "earningsGrowth",
-        "earningsQuarterlyGrowth",
-        "revenueGrowth"
-    ]
+    # ปรับช่วงของกริดได้โดยไม่ต้องดึงข้อมูลใหม่ (ข้อมูลถูก cache ไว้ตาม epoch ของตลาด)
+    inputs = load_inputs(tuple(stocks) if scope == "ทั้ง SET50" else (ticker,))
+    if inputs.empty:
+        st.error("ไม่สามารถดึงราคาหรือ EPS ได้")
+        return
     
-    for field in growth_fields:
-        if field in quote and quote[field] is not None:
-            try:
-                growth = float(quote[field])
-                # แปลงเป็นเปอร์เซ็นต์ถ้าเป็นทศนิยม
-                if abs(growth) <= 1:
-                    growth = growth * 100
-                return growth
-            except (ValueError, TypeError):
-                continue
+    growth_rates = np.linspace(*growth_range, steps)
+    yields = np.linspace(*yield_range, steps)
+    ng_pes = np.arange(pe_range[0], pe_range[1] + 0.25, 0.5)
+    with timed("graham.grid"):
+        grid = graham_grid(inputs["eps"], growth_rates, yields, ng_pes, multiplier, margin)
+    st.caption(f"{grid['intrinsic_value'].size:,} สถานการณ์")
     
-    # ถ้าไม่เจอให้ใช้ค่าเริ่มต้น 5%
-    return 5.0
-
-def get_aaa_yield():
-    """ฟังก์ชันสำหรับหาผลตอบแทนบอนด์ AAA"""
-    try:
-        # ลองใช้ 10-year Treasury rate แทน AAA
-        treasury_df = pdr.get_data_fred('DGS10', start=datetime.now() - timedelta(days=30))
-        if not treasury_df.empty:
-            current_yield = treasury_df.dropna().iloc[-1][0]
-            return float(current_yield)
-    except Exception:
-        pass
-    
-    try:
-        # ลองใช้ AAA อีกครั้ง
-        aaa_df = pdr.get_data_fred('AAA', start=datetime.now() - timedelta(days=30))
-        if not aaa_df.empty:
-            current_yield = aaa_df.dropna().iloc[-1][0]
-            return float(current_yield)
-    except Exception:
-        pass
+    metric = st.radio("แสดงค่า", ["มูลค่าที่แท้จริง", "ราคาที่ยอมรับได้", "ส่วนต่างจากราคาปัจจุบัน (%)"], horizontal=True)
+    pe_base = st.select_slider("PE ที่ไม่มีการเติบโตที่แสดง", options=list(ng_pes),
+                               value=ng_pes[np.abs(ng_pes - 8.5).argmin()])
+    values = grid["accept_price" if metric == "ราคาที่ยอมรับได้" else "intrinsic_value"]
+    values = values[:, list(ng_pes).index(pe_base)]
+    if metric == "ส่วนต่างจากราคาปัจจุบัน (%)":
+        # ราคาที่ยอมรับได้เทียบกับราคาปัจจุบัน: บวก = ราคาปัจจุบันต่ำกว่า
+        values = (grid["accept_price"][:, list(ng_pes).index(pe_base)]
+                  / inputs["current_price"].to_numpy().reshape(-1, 1, 1) - 1) * 100
     
-    # ถ้าไม่สามารถดึงข้อมูลได้ให้ใช้ค่าเริ่มต้น 4%
-    return 4.0
+    if scope == "หุ้นที่เลือก":
+        row = inputs.iloc[0]
+        fig = go.Figure(go.Heatmap(z=values[0], x=yields, y=growth_rates, colorscale="RdYlGn",
+                                   colorbar=dict(title=metric)))
+        # ค่าที่จุดปัจจุบันมาจากสูตรเดียวกับโหมดคำนวณรายตัว
+        current = graham_value(row["eps"], row["growth_rate"], row["current_yield"], pe_base, multiplier, margin)
+        fig.add_trace(go.Scatter(x=[row["current_yield"]], y=[row["growth_rate"]], mode="markers",
+                                 marker=dict(color="black", size=10, symbol="x"), name="ค่าปัจจุบัน",
+                                 hovertemplate=f"มูลค่าที่แท้จริง {current['intrinsic_value']:.2f}<br>"
+                                               f"ราคาที่ยอมรับได้ {current['accept_price']:.2f}<extra></extra>"))
+        fig.update_layout(title=f"{ticker}: {metric} (PE {pe_base})",
+                          xaxis_title="ผลตอบแทนบอนด์ (%)", yaxis_title="อัตราการเติบโต (%)", height=600)
+    else:
+        bond_yield = st.select_slider("ผลตอบแทนบอนด์ที่แสดง (%)", options=list(np.round(yields, 2)),
+                                      value=np.round(yields, 2)[np.abs(yields - inputs["current_yield"].iloc[0]).argmin()])
+        column = int(np.abs(yields - bond_yield).argmin())
+        fig = go.Figure(go.Heatmap(z=values[:, :, column], x=growth_rates, y=inputs["Ticker"],
+                                   colorscale="RdYlGn", colorbar=dict(title=metric)))
+        fig.update_layout(title=f"SET50: {metric} (PE {pe_base}, บอนด์ {bond_yield}%)",
+                          xaxis_title="อัตราการเติบโต (%)", height=max(400, 18 * len(inputs)))
+    with timed("graham.heatmap", "render"):
+        st.plotly_chart(fig, use_container_width=True)
 
 def get_data(ticker, ng_pe, multiplier, margin):
     try:
-        ticker_data = yf.Ticker(ticker)
-        
-        # ดึงราคาปัจจุบัน
-        current_price = get_current_price(ticker_data)
-        if current_price is None:
+        try:
+            inputs = fetch_inputs(ticker)
+        except ValueError:
             st.error(f"ไม่สามารถดึงราคาปัจจุบันของ {ticker} ได้")
             return None
         
         # ดึง EPS
-        eps = get_eps(ticker_data)
+        eps = inputs["eps"]
         if eps is None:
             st.warning(f"ไม่สามารถดึงข้อมูล EPS ของ {ticker} ได้ กรุณาใส่ค่าด้วยตนเอง")
             eps = st.number_input("กรุณาใส่ค่า EPS:", min_value=0.0, step=0.01)
             if eps == 0:
                 return None
         
-        # ดึงอัตราการเติบโต
-        growth_rate = get_growth_rate(ticker_data)
-        
-        # ดึงผลตอบแทนบอนด์
-        current_yield = get_aaa_yield()
-        
         output = {
-            "current_price": float(current_price),
+            "current_price": inputs["current_price"],
             "eps": float(eps),
-            "growth_rate": float(growth_rate),
-            "current_yield": float(current_yield),
+            "growth_rate": inputs["growth_rate"],
+            "current_yield": inputs["current_yield"],
             "ng_pe": float(ng_pe),
             "multiplier": float(multiplier),
             "margin": float(margin)
@@ -168,7 +138,14 @@ def get_data(ticker, ng_pe, multiplier, margin):
         st.error(f"เกิดข้อผิดพลาด: {str(e)}")
         return None
 
-if st.button('คํานวณ'):
+if mode == "วิเคราะห์ความอ่อนไหว":
+    try:
+        multiplier_value, margin_value = float(multiplier), float(margin)
+    except ValueError:
+        st.error("กรุณาใส่ตัวเลขในช่องระยะการเติบโตและส่วนเผื่อราคา")
+    else:
+        sensitivity(ticker, multiplier_value, margin_value)
+elif st.button('คํานวณ'):
     try:
         data = get_data(ticker, ng_pe, multiplier, margin)
         
@@ -187,16 +164,11 @@ if st.button('คํานวณ'):
             # คำนวณมูลค่าที่แท้จริง
             # ใช้สูตร Benjamin Graham: V = EPS × (8.5 + 2g) × 4.4 / Y
             # โดยที่ g = growth rate, Y = current yield
-            growth_decimal = data["growth_rate"] / 100 if data["growth_rate"] > 1 else data["growth_rate"]
-            yield_decimal = data["current_yield"] / 100 if data["current_yield"] > 1 else data["current_yield"]
-            
-            int_value = (data["eps"] * (data["ng_pe"] + data["multiplier"] * growth_decimal * 100) * 4.4) / data["current_yield"]
-            int_value = round(int_value, 2)
-            
+            value = graham_value(data["eps"], data["growth_rate"], data["current_yield"],
+                                 data["ng_pe"], data["multiplier"], data["margin"])
+            int_value = round(value["intrinsic_value"], 2)
             stock_price = round(data["current_price"], 2)
-            margin_rate = data["margin"] / 100
-            accept_price = (1 - margin_rate) * int_value
-            accept_price = round(accept_price, 2)
+            accept_price = round(value["accept_price"], 2)
             
             col4, col5, col6 = st.columns(3)
             with col4:
@@ -211,9 +183,10 @@ if st.button('คํานวณ'):
             
             # เพิ่มคำแนะนำ
             st.markdown("""---""")
-            if stock_price <= accept_price:
+            advice = recommendation(stock_price, int_value, accept_price)
+            if advice == "buy":
                 st.success(f"🟢 **แนะนำซื้อ**: ราคาปัจจุบัน ({stock_price} ฿) ต่ำกว่าราคาที่ยอมรับได้ ({accept_price} ฿)")
-            elif stock_price <= int_value:
+            elif advice == "consider":
                 st.warning(f"🟡 **พิจารณา**: ราคาปัจจุบัน ({stock_price} ฿) อยู่ระหว่างราคาที่ยอมรับได้และมูลค่าที่แท้จริง")
             else:
                 st.error(f"🔴 **ไม่แนะนำ**: ราคาปัจจุบัน ({stock_price} ฿) สูงกว่ามูลค่าที่แท้จริง ({int_value} ฿)")
@@ -222,3 +195,5 @@ if st.button('คํานวณ'):
         st.error(f"เกิดข้อผิดพลาดในการคำนวณ: {str(e)}")
 else:
     st.text("")
+
+render_debug_panel()
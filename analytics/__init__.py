@@ -0,0 +1 @@
+"""Reusable computation engines shared by the Streamlit pages."""
@@ -0,0 +1,194 @@
+"""JSON API over the analytics engines, for machine clients.
+
+Run with ``uvicorn analytics.api:app`` or ``python -m analytics.api``.
+
+``GET /graham/{ticker}``
+    Graham valuation (query: ``ng_pe``, ``multiplier``, ``margin``).
+``GET /drawdown/{ticker}``
+    Max drawdown of price and total return (query: ``years``).
+``GET /screener``
+    Fundamentals of an index's members (query: ``index`` and the screener
+    thresholds such as ``pe_ratio`` or ``roe``).
+``GET /metrics``
+    Prometheus metrics of this process.
+
+Responses are cached in process until the market calendar says new data
+can appear, and carry an ``ETag``; a matching ``If-None-Match`` gets
+``304 Not Modified``. ``Cache-Control: max-age`` is the time until the
+next session opens (0 while the market is open, so clients revalidate).
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+
+from analytics.market_calendar import cache_epoch, seconds_until_change
+from analytics.metrics import prometheus_text, timed
+from analytics.report import drawdown_row, fundamentals_row, graham_row
+from analytics.screener import FILTER_RULES, apply_filters, build_fundamentals_table, build_screen_index
+from analytics.universe import index_members
+from analytics.valuation import DEFAULT_MARGIN, DEFAULT_MULTIPLIER, DEFAULT_NG_PE, get_aaa_yield
+
+# จำนวน thread ที่ดึงข้อมูลปัจจัยพื้นฐานพร้อมกัน
+FETCH_WORKERS = 8
+
+# ทศนิยมใน JSON (ตัดเศษจากการเก็บแบบ float32 ของตารางสกรีน)
+JSON_DECIMALS = 6
+
+_responses = {}
+_tables = {}
+_lock = threading.Lock()
+
+
+def _to_json(result):
+    """UTF-8 JSON of a row dict or a DataFrame; NaN becomes null and dates ISO strings."""
+    if isinstance(result, pd.DataFrame):
+        text = result.to_json(orient="records", date_format="iso", force_ascii=False,
+                              double_precision=JSON_DECIMALS)
+    else:
+        text = pd.Series(result, dtype=object).to_json(date_format="iso", force_ascii=False,
+                                                       double_precision=JSON_DECIMALS)
+    return text.encode("utf-8")
+
+
+def _cached_body(key, compute):
+    """``(body, etag)`` for ``key``, computed at most once per market-data epoch."""
+    epoch = cache_epoch()
+    with _lock:
+        entry = _responses.get(key)
+    if entry is not None and entry[0] == epoch:
+        return entry[1], entry[2]
+    body = _to_json(compute())
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+    with _lock:
+        # ทิ้งคำตอบของ epoch เก่าทั้งหมดเมื่อมีข้อมูลใหม่
+        for stale in [k for k, v in _responses.items() if v[0] != epoch]:
+            del _responses[stale]
+        _responses[key] = (epoch, body, etag)
+    return body, etag
+
+
+async def _respond(request, name, compute):
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    with timed(f"api.{name}", "request") as event:
+        try:
+            body, etag = await run_in_threadpool(_cached_body, key, compute)
+        except ValueError as e:
+            return _error(400, e)
+        except Exception as e:
+            return _error(502, e)
+        event["bytes"] = len(body)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={seconds_until_change()}"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _error(status, error):
+    return Response(json.dumps({"error": str(error)}, ensure_ascii=False), status_code=status,
+                    media_type="application/json")
+
+
+def _float(request, name, default=None):
+    value = request.query_params.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def _screen_table(index):
+    """Fundamentals table and sort index of ``index`` members, built once per epoch."""
+    epoch = cache_epoch()
+    with _lock:
+        entry = _tables.get(index)
+    if entry is not None and entry[0] == epoch:
+        return entry[1], entry[2]
+    tickers = index_members(index)
+    if not tickers:
+        raise ValueError(f"Unknown index: {index}")
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        records = list(executor.map(fundamentals_row, tickers))
+    table = build_fundamentals_table(records)
+    screen_index = build_screen_index(table)
+    with _lock:
+        _tables[index] = (epoch, table, screen_index)
+    return table, screen_index
+
+
+async def graham(request):
+    ticker = request.path_params["ticker"]
+    try:
+        params = {
+            "ng_pe": _float(request, "ng_pe", DEFAULT_NG_PE),
+            "multiplier": _float(request, "multiplier", DEFAULT_MULTIPLIER),
+            "margin": _float(request, "margin", DEFAULT_MARGIN),
+        }
+    except ValueError as e:
+        return _error(400, e)
+    return await _respond(request, "graham", lambda: graham_row(
+        ticker, current_yield=get_aaa_yield(), **params))
+
+
+async def drawdown(request):
+    ticker = request.path_params["ticker"]
+    try:
+        years = int(_float(request, "years", 5))
+    except ValueError as e:
+        return _error(400, e)
+    return await _respond(request, "drawdown", lambda: drawdown_row(ticker, years))
+
+
+async def screener(request):
+    index = request.query_params.get("index", "SET50")
+    filters = {}
+    try:
+        for active_key, value_key, *_ in FILTER_RULES:
+            value = _float(request, value_key)
+            filters[active_key] = value is not None
+            filters[value_key] = value
+    except ValueError as e:
+        return _error(400, e)
+
+    def compute():
+        table, screen_index = _screen_table(index)
+        return apply_filters(table, filters, screen_index)
+
+    return await _respond(request, "screener", compute)
+
+
+async def metrics(request):
+    return PlainTextResponse(prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+app = Starlette(routes=[
+    Route("/graham/{ticker}", graham),
+    Route("/drawdown/{ticker}", drawdown),
+    Route("/screener", screener),
+    Route("/metrics", metrics),
+])
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analytics.indicators import compute_indicators
+from analytics.screener import FILTER_RULES, TECHNICAL_RULES, criteria_mask
+
+# ความถี่ในการปรับพอร์ต -> (รหัส period ของ pandas, จำนวนครั้งต่อปี)
+REBALANCE_FREQUENCIES = {
+    "W": ("W", 52),
+    "M": ("M", 12),
+    "Q": ("Q", 4),
+}
+
+# อัตราผลตอบแทนที่ไม่มีความเสี่ยงต่อปี (สัดส่วน) ที่ใช้คำนวณ Sharpe Ratio เหมือน calculate_performance
+RISK_FREE_RATE = 0.02
+
+# เกณฑ์ทั้งหมดที่ทดสอบ: ปัจจัยพื้นฐานจากข้อมูลย้อนหลัง และเทคนิคจากราคา
+BACKTEST_RULES = FILTER_RULES + TECHNICAL_RULES
+
+# ราคาย้อนหลังก่อนวันเริ่มทดสอบที่ต้องโหลดเพิ่ม เพื่อให้ SMA50 และ RSI14 มีค่าตั้งแต่รอบแรก
+INDICATOR_WARMUP = pd.DateOffset(days=100)
+
+# ค่าเกณฑ์ของแต่ละตัวกรอง -> สวิตช์เปิดใช้
+_ACTIVE_KEYS = {value_key: active_key for active_key, value_key, *_ in BACKTEST_RULES}
+
+# ข้อมูลที่แชร์ให้ worker แต่ละ process (ส่งครั้งเดียวตอนเริ่ม process)
+_worker_state = {}
+
+
+def rebalance_dates(index, freq="M"):
+    """Last trading day of every rebalance period in ``index``."""
+    period, _ = REBALANCE_FREQUENCIES[freq]
+    index = pd.DatetimeIndex(index)
+    last = pd.Series(index, index=index).groupby(index.to_period(period)).max()
+    return pd.DatetimeIndex(last.to_numpy())
+
+
+def build_panels(history, dates, tickers):
+    """Turn a long snapshot history into ``{metric: dates x tickers}`` float32 arrays.
+
+    Each rebalance date sees the latest snapshot taken on or before it
+    (point-in-time, no look-ahead).
+    """
+    history = history.sort_values("Date")
+    metrics = [rule[2] for rule in FILTER_RULES]
+    panels = {}
+    for column in metrics:
+        wide = history.pivot_table(index="Date", columns="Ticker", values=column, aggfunc="last")
+        wide = wide.reindex(columns=tickers)
+        wide = wide.reindex(wide.index.union(dates)).ffill().reindex(dates)
+        panels[column] = wide.to_numpy(dtype=np.float32)
+    return panels
+
+
+def build_technical_panels(prices, dates):
+    """RSI14 and the distance from SMA50 (%) of every ticker at each rebalance date.
+
+    Computed from the daily closes up to each date, so they are point-in-time
+    like the fundamentals panels. Dates before an indicator has enough
+    history are NaN and never pass an active criterion.
+    """
+    close = prices.ffill()
+    indicators, _ = compute_indicators(close)
+    columns = {
+        "RSI14": indicators["RSI14"],
+        "% จาก SMA50": (close / indicators["SMA50"] - 1) * 100,
+    }
+    return {
+        column: frame.reindex(dates).to_numpy(dtype=np.float32)
+        for column, frame in columns.items()
+    }
+
+
+def forward_returns(prices, dates):
+    """Return of every ticker from each rebalance date to the next one."""
+    prices = prices.ffill().reindex(dates)
+    return (prices.shift(-1) / prices - 1).to_numpy(dtype=np.float64)
+
+
+def prepare(prices, history, freq="M", risk_free_rate=RISK_FREE_RATE):
+    """Precompute everything a rule evaluation needs, once per data set.
+
+    ``risk_free_rate`` is the annual rate (a fraction) used for the Sharpe ratio.
+    """
+    dates = rebalance_dates(prices.index, freq)
+    if history is not None and len(history):
+        dates = dates[dates >= history["Date"].min()]
+    tickers = list(prices.columns)
+    panels = build_panels(history, dates, tickers)
+    panels.update(build_technical_panels(prices, dates))
+    return {
+        "dates": dates,
+        "tickers": tickers,
+        "panels": panels,
+        "returns": forward_returns(prices, dates),
+        "periods_per_year": REBALANCE_FREQUENCIES[freq][1],
+        "risk_free_rate": risk_free_rate,
+    }
+
+
+def run_rule(prepared, filters):
+    """Equal-weight backtest of one filter set over all rebalance dates at once.
+
+    Both the fundamental and the technical (RSI/SMA) criteria are applied.
+    Returns a dict with the period returns, the equity curve, the number of
+    holdings per period and summary statistics.
+    """
+    returns = prepared["returns"]
+    selected = criteria_mask(prepared["panels"], filters, returns.shape, BACKTEST_RULES)
+    selected &= np.isfinite(returns)
+    holdings = selected.sum(axis=1)
+    gross = np.where(selected, returns, 0.0).sum(axis=1)
+    period_returns = np.divide(
+        gross, holdings, out=np.zeros_like(gross), where=holdings > 0
+    )[:-1]
+
+    dates = prepared["dates"]
+    period_returns = pd.Series(period_returns, index=dates[1:])
+    equity = (1 + period_returns).cumprod()
+    return {
+        "returns": period_returns,
+        "equity": equity,
+        "holdings": pd.Series(holdings[:-1], index=dates[:-1]),
+        "stats": summarize(period_returns, prepared["periods_per_year"], holdings[:-1],
+                           prepared["risk_free_rate"]),
+    }
+
+
+def summarize(period_returns, periods_per_year, holdings=None, risk_free_rate=RISK_FREE_RATE):
+    """Headline statistics of a series of period returns.
+
+    The Sharpe ratio is (annualized return - ``risk_free_rate``) divided by
+    the annualized volatility, with the annual rate as a fraction, the same
+    convention as ``calculate_performance``.
+    """
+    if len(period_returns) == 0:
+        return {}
+    equity = (1 + period_returns).cumprod()
+    total_return = equity.iloc[-1] - 1
+    annual_return = (1 + total_return) ** (periods_per_year / len(period_returns)) - 1
+    annual_volatility = period_returns.std() * np.sqrt(periods_per_year)
+    drawdown = equity / equity.cummax() - 1
+    stats = {
+        "Total Return (%)": total_return * 100,
+        "Annualized Return (%)": annual_return * 100,
+        "Annualized Volatility (%)": annual_volatility * 100,
+        "Sharpe Ratio": (annual_return - risk_free_rate) / annual_volatility
+        if annual_volatility else np.nan,
+        "Max Drawdown (%)": min(drawdown.min(), 0) * 100,
+    }
+    if holdings is not None:
+        stats["Average Holdings"] = float(np.mean(holdings))
+    return stats
+
+
+def make_filter_grid(base_filters, **values):
+    """Every combination of the given threshold values on top of ``base_filters``.
+
+    ``make_filter_grid(filters, pe_ratio=[10, 15], roe=[5, 10])`` returns four
+    filter dicts; each varied criterion is switched on.
+    """
+    keys = list(values)
+    grid = []
+    for combo in itertools.product(*(values[k] for k in keys)):
+        filters = dict(base_filters)
+        for key, value in zip(keys, combo):
+            filters[key] = value
+            filters[_ACTIVE_KEYS[key]] = True
+        grid.append(filters)
+    return grid
+
+
+def _init_worker(prepared):
+    _worker_state["prepared"] = prepared
+
+
+def _run_stats(filters):
+    return run_rule(_worker_state["prepared"], filters)["stats"]
+
+
+def run_grid(prepared, filter_grid, workers=1):
+    """Backtest many filter sets and return one row of statistics per rule.
+
+    With ``workers > 1`` the rules are split across a process pool; the
+    prepared panels are sent to each worker once, not once per rule.
+    """
+    if workers > 1 and len(filter_grid) > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(prepared,)
+        ) as executor:
+            stats = list(executor.map(_run_stats, filter_grid, chunksize=16))
+    else:
+        stats = [run_rule(prepared, filters)["stats"] for filters in filter_grid]
+
+    rows = []
+    for filters, rule_stats in zip(filter_grid, stats):
+        row = {
+            value_key: filters.get(value_key) if filters.get(active_key) else None
+            for active_key, value_key, *_ in BACKTEST_RULES
+        }
+        row.update(rule_stats)
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,272 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics.market_calendar import TIMEZONE, trading_seconds_per_day
+from analytics.providers import ProviderError, get_provider
+
+# ที่เก็บแท่งราคาระหว่างวัน: หนึ่งไฟล์ .npy ต่อหุ้นต่อเดือน แยกตามความถี่ที่ดาวน์โหลด
+BAR_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "bars"
+)
+
+# ความถี่ที่รองรับ -> ความยาวแท่ง (วินาที)
+INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "1d": 86400}
+
+# ตัวเลือกความถี่บนหน้าเว็บ (None = ข้อมูลรายวันแบบเดิม)
+FREQUENCY_CHOICES = {"รายวัน": None, "1 นาที": "1m", "5 นาที": "5m", "15 นาที": "15m"}
+
+# ระยะย้อนหลังสูงสุดที่ Yahoo ให้ดาวน์โหลดต่อครั้งสำหรับแต่ละความถี่
+FETCH_PERIODS = {"1m": "7d", "5m": "60d", "15m": "60d", "30m": "60d", "1h": "730d"}
+
+# 32 ไบต์ต่อแท่ง: เวลา (วินาที UTC), OHLC แบบ float32 และปริมาณซื้อขาย
+BAR_DTYPE = np.dtype([
+    ("time", "<i8"),
+    ("open", "<f4"),
+    ("high", "<f4"),
+    ("low", "<f4"),
+    ("close", "<f4"),
+    ("volume", "<i8"),
+])
+
+FRAME_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# เวลาไทยเร็วกว่า UTC 7 ชั่วโมง ใช้จัดแท่งรายวันให้ตรงวันทำการ
+_LOCAL_OFFSET = 7 * 3600
+
+
+def _ticker_dir(root, interval, ticker):
+    return os.path.join(root, interval, ticker)
+
+
+def _month_path(root, interval, ticker, month):
+    return os.path.join(_ticker_dir(root, interval, ticker), f"{month}.npy")
+
+
+def bars_from_frame(frame):
+    """Structured bar array from an OHLCV frame with a DatetimeIndex.
+
+    Naive timestamps are taken as Bangkok local time. Rows without a close
+    are dropped.
+    """
+    frame = frame.dropna(subset=["Close"])
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is None:
+        index = index.tz_localize(TIMEZONE)
+    close = frame["Close"].to_numpy(dtype=np.float64, na_value=np.nan)
+    bars = np.empty(len(frame), dtype=BAR_DTYPE)
+    bars["time"] = index.tz_convert("UTC").as_unit("s").asi8
+    for field, column in FRAME_COLUMNS.items():
+        if field == "volume":
+            volume = frame[column].to_numpy(dtype=np.float64, na_value=0) if column in frame else 0
+            bars[field] = np.nan_to_num(volume)
+        elif column in frame:
+            # ช่องที่ว่างใช้ราคาปิดแทน
+            values = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            bars[field] = np.where(np.isnan(values), close, values)
+        else:
+            bars[field] = close
+    return np.sort(bars, order="time")
+
+
+def _months(times):
+    """Month (``datetime64[M]``, UTC) of each bar time."""
+    return np.asarray(times).astype("datetime64[s]").astype("datetime64[M]")
+
+
+def _write(bars, path):
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, bars)
+    os.replace(tmp_path, path)
+
+
+def append_bars(ticker, bars, interval="1m", root=BAR_DIR):
+    """Merge ``bars`` into the ticker's monthly files; newer values win on equal times."""
+    if len(bars) == 0:
+        return 0
+    os.makedirs(_ticker_dir(root, interval, ticker), exist_ok=True)
+    months = _months(bars["time"])
+    written = 0
+    for month in np.unique(months):
+        new = bars[months == month]
+        path = _month_path(root, interval, ticker, str(month))
+        if os.path.exists(path):
+            new = np.concatenate([np.load(path), new])
+        # เก็บแท่งล่าสุดของแต่ละเวลา
+        order = np.argsort(new["time"], kind="stable")[::-1]
+        _, first = np.unique(new["time"][order], return_index=True)
+        merged = new[order[first]]
+        _write(merged, path)
+        written += len(merged)
+    return written
+
+
+def stored_intervals(ticker, root=BAR_DIR):
+    """Intervals with stored bars for ``ticker``, finest first."""
+    return [
+        interval for interval in INTERVALS
+        if glob.glob(os.path.join(_ticker_dir(root, interval, ticker), "????-??.npy"))
+    ]
+
+
+def _base_interval(ticker, interval, root):
+    """Stored interval to resample ``interval`` from.
+
+    Among the stored intervals that divide ``interval``, the one reaching
+    furthest back wins (Yahoo keeps far less 1m than 5m history), then the
+    finest.
+    """
+    step = INTERVALS[interval]
+    best = None
+    for base in stored_intervals(ticker, root):
+        if INTERVALS[base] > step or step % INTERVALS[base]:
+            continue
+        first = min(glob.glob(os.path.join(_ticker_dir(root, base, ticker), "????-??.npy")))
+        first_time = np.load(first, mmap_mode="r")["time"][0]
+        if best is None or first_time < best[1]:
+            best = (base, first_time)
+    return None if best is None else best[0]
+
+
+def load_bars(ticker, start=None, end=None, interval="1m", root=BAR_DIR):
+    """Stored bars of one interval between ``start`` and ``end`` (Bangkok time).
+
+    Month files are memory-mapped and cut with a binary search on the time
+    column, so only the pages inside the range are read. A range within one
+    month is returned as a read-only view of the mapped file.
+    """
+    start_s = _epoch(start)
+    end_s = _epoch(end)
+    parts = []
+    for path in sorted(glob.glob(os.path.join(_ticker_dir(root, interval, ticker), "????-??.npy"))):
+        month = pd.Timestamp(os.path.basename(path)[:7] + "-01", tz="UTC")
+        month_start = int(month.timestamp())
+        month_end = int((month + pd.DateOffset(months=1)).timestamp())
+        if (start_s is not None and month_end <= start_s) or (end_s is not None and month_start >= end_s):
+            continue
+        bars = np.load(path, mmap_mode="r")
+        times = bars["time"]
+        lo = 0 if start_s is None else np.searchsorted(times, start_s, side="left")
+        hi = len(bars) if end_s is None else np.searchsorted(times, end_s, side="left")
+        if hi > lo:
+            parts.append(bars[lo:hi])
+    if not parts:
+        return np.empty(0, dtype=BAR_DTYPE)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def _epoch(moment):
+    if moment is None:
+        return None
+    moment = pd.Timestamp(moment)
+    if moment.tzinfo is None:
+        moment = moment.tz_localize(TIMEZONE)
+    return int(moment.timestamp())
+
+
+def resample(bars, interval):
+    """Aggregate bars to a coarser ``interval`` (first open, max high, min low, last close, summed volume).
+
+    Buckets are aligned to Bangkok clock time, so ``1d`` bars follow the
+    trading day. Runs on the arrays with ``reduceat``; no frame is built.
+    """
+    step = INTERVALS[interval]
+    if len(bars) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    bucket = (bars["time"] + _LOCAL_OFFSET) // step
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(bars)] - 1
+    out = np.empty(len(starts), dtype=BAR_DTYPE)
+    out["time"] = bucket[starts] * step - _LOCAL_OFFSET
+    out["open"] = bars["open"][starts]
+    out["high"] = np.maximum.reduceat(bars["high"], starts)
+    out["low"] = np.minimum.reduceat(bars["low"], starts)
+    out["close"] = bars["close"][ends]
+    out["volume"] = np.add.reduceat(bars["volume"], starts)
+    return out
+
+
+def periods_per_year(interval):
+    """Bars per year at ``interval``, for annualizing returns and volatility."""
+    if interval is None or interval == "1d":
+        return 252
+    return 252 * trading_seconds_per_day() // INTERVALS[interval]
+
+
+def to_frame(bars):
+    """OHLCV DataFrame indexed by naive Bangkok time, like the daily downloads."""
+    index = pd.to_datetime(np.asarray(bars["time"]), unit="s", utc=True)
+    index = index.tz_convert(TIMEZONE).tz_localize(None).rename("Date")
+    return pd.DataFrame(
+        {column: np.asarray(bars[field]) for field, column in FRAME_COLUMNS.items()}, index=index
+    )
+
+
+def load_resampled(ticker, interval, start=None, end=None, root=BAR_DIR):
+    """Bars of ``ticker`` at ``interval``, resampled from the finest stored interval."""
+    base = _base_interval(ticker, interval, root)
+    if base is None:
+        return np.empty(0, dtype=BAR_DTYPE)
+    bars = load_bars(ticker, start, end, base, root)
+    return bars if base == interval else resample(bars, interval)
+
+
+def close_matrix(tickers, interval, start=None, end=None, root=BAR_DIR):
+    """Time x ticker close prices at ``interval`` (outer-joined on bar times)."""
+    closes = {}
+    for ticker in tickers:
+        bars = load_resampled(ticker, interval, start, end, root)
+        if len(bars):
+            frame = to_frame(bars)
+            closes[ticker] = frame["Close"]
+    if not closes:
+        return pd.DataFrame()
+    return pd.DataFrame(closes).sort_index()
+
+
+def update_bars(tickers, interval="1m", provider=None, root=BAR_DIR):
+    """Download the latest ``interval`` bars for ``tickers`` and add them to the store.
+
+    Yahoo only serves a short window of intraday history (``FETCH_PERIODS``),
+    so calling this regularly builds up months of bars locally. Returns the
+    number of stored bars per ticker.
+    """
+    if provider is None:
+        provider = get_provider()
+    tickers = list(tickers)
+    data = provider.download(tickers, period=FETCH_PERIODS[interval], interval=interval)
+    counts = {}
+    if data.empty:
+        return counts
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(1):
+                continue
+            frame = data.xs(ticker, axis=1, level=1)
+        else:
+            frame = data
+        counts[ticker] = append_bars(ticker, bars_from_frame(frame), interval, root)
+    return counts
+
+
+def load_intraday(tickers, interval, start=None, update=True, root=BAR_DIR):
+    """OHLCV frames at ``interval`` per ticker, topping up the store first.
+
+    New bars are downloaded at ``interval`` itself (the longest history
+    Yahoo offers for it) and merged into the store; the result is read back
+    from the store, so it covers everything collected so far.
+    """
+    if update:
+        try:
+            update_bars(tickers, interval, root=root)
+        except ProviderError:
+            # ผู้ให้บริการข้อมูลไม่มีแท่งระหว่างวัน (เช่นโหมด replay) ใช้ข้อมูลที่เก็บไว้แล้ว
+            pass
+    frames = {}
+    for ticker in tickers:
+        bars = load_resampled(ticker, interval, start, root=root)
+        if len(bars):
+            frames[ticker] = to_frame(bars)
+    return frames
@@ -0,0 +1,261 @@
+"""Benchmarks for the computational hot paths on synthetic data.
+
+Run ``python -m analytics.bench`` (see ``--help``). Every case is timed on
+synthetic price matrices of growing size so scaling can be tracked; save a
+run with ``--json`` and pass it back with ``--compare`` to flag regressions.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics.correlation import rolling_correlation
+from analytics.dca import simulate_dca
+from analytics.forecasting import training_frames
+from analytics.indicators import compute_indicators
+from analytics.performance import (
+    calculate_max_drawdown,
+    calculate_performance,
+    calculate_portfolio,
+    relativereturn,
+)
+from analytics.screener import apply_filters, build_fundamentals_table, build_screen_index
+from analytics.simulation import project_portfolio
+
+DEFAULT_TICKERS = (1, 10, 100, 1000)
+DEFAULT_YEARS = (1, 5, 30)
+
+SCREEN_FILTERS = {
+    "pe_active": True, "pe_ratio": 25.0,
+    "pb_active": True, "pb_ratio": 3.0,
+    "de_active": True, "de_ratio": 2.0,
+    "roe_active": True, "roe": 10.0,
+    "roa_active": True, "roa": 5.0,
+}
+
+
+def synthetic_prices(n_tickers, years, seed=0):
+    """Business-day GBM price matrix (dates x tickers) starting at 100."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("1990-01-01", periods=int(years * 252))
+    steps = rng.normal(0.0003, 0.02, size=(len(dates), n_tickers))
+    prices = 100 * np.exp(np.cumsum(steps, axis=0))
+    return pd.DataFrame(prices, index=dates, columns=[f"S{i:04d}.BK" for i in range(n_tickers)])
+
+
+def synthetic_fundamentals(n_tickers, seed=0):
+    """Screener records with realistic ranges and some missing values."""
+    rng = np.random.default_rng(seed)
+    sectors = ["Energy", "Financial Services", "Technology", "Consumer Cyclical", "Industrials"]
+
+    def maybe(value):
+        return None if rng.random() < 0.05 else float(value)
+
+    return [
+        {
+            "Ticker": f"S{i:04d}.BK",
+            "Company Name": f"Synthetic {i}",
+            "PE Ratio": maybe(rng.uniform(2, 60)),
+            "PB Ratio": maybe(rng.uniform(0.2, 8)),
+            "Debt to Equity": maybe(rng.uniform(0, 300)),
+            "ROE": maybe(rng.uniform(-0.2, 0.4)),
+            "ROA": maybe(rng.uniform(-0.1, 0.2)),
+            "Current Price": maybe(rng.uniform(1, 500)),
+            "Market Cap": maybe(rng.uniform(1e8, 1e12)),
+            "Sector": sectors[i % len(sectors)],
+        }
+        for i in range(n_tickers)
+    ]
+
+
+def _single(prices):
+    return prices.iloc[:, :1].rename(columns={prices.columns[0]: "Close"})
+
+
+def _setup_dca(prices, years):
+    # 252 วันทำการต่อปีสั้นกว่า 12 เดือนปฏิทินเล็กน้อย จึงนับเฉพาะงวดที่วันซื้อยังอยู่ในช่วงข้อมูล
+    start, end = prices.index[0], prices.index[-1]
+    months = sum(start + pd.DateOffset(months=i) <= end for i in range(int(years * 12)))
+    return (_single(prices), 1000.0, months, start)
+
+
+def _setup_drawdown(prices, years):
+    return (prices.iloc[:, :1].set_axis(["Price"], axis=1),)
+
+
+def _setup_portfolio(prices, years):
+    weights = np.full(prices.shape[1], 1 / prices.shape[1])
+    return (prices, weights)
+
+
+def _run_portfolio(prices, weights):
+    return calculate_performance(calculate_portfolio(prices, weights))
+
+
+def _setup_projection(prices, years):
+    portfolio = calculate_portfolio(*_setup_portfolio(prices, years))
+    return (portfolio,)
+
+
+def _run_projection(portfolio):
+    return project_portfolio(portfolio, 252, n_paths=10_000, seed=0, workers=1)
+
+
+def _setup_screener(n_tickers):
+    return (build_fundamentals_table(synthetic_fundamentals(n_tickers)),)
+
+
+def _run_screen_scan(table):
+    return apply_filters(table, SCREEN_FILTERS)
+
+
+def _setup_screen_index(n_tickers):
+    table = build_fundamentals_table(synthetic_fundamentals(n_tickers))
+    return (table, build_screen_index(table))
+
+
+def _run_screen_index(table, index):
+    return apply_filters(table, SCREEN_FILTERS, index)
+
+
+def _setup_prophet(prices, years):
+    from prophet import Prophet
+
+    frame = pd.DataFrame({"ds": prices.index, "y": prices.iloc[:, 0].to_numpy()})
+    return (Prophet, frame)
+
+
+def _run_prophet(prophet_class, frame):
+    m = prophet_class()
+    m.fit(frame)
+    return m.predict(m.make_future_dataframe(periods=365))
+
+
+# ชื่อเคส -> (มิติที่วัด, ฟังก์ชันเตรียมข้อมูล, ฟังก์ชันที่จับเวลา)
+# "years": ราคาหุ้นตัวเดียวยาวขึ้นเรื่อย ๆ, "matrix": จำนวนหุ้น x จำนวนปี,
+# "universe": ตารางปัจจัยพื้นฐานตามจำนวนหุ้น
+CASES = {
+    "simulate_dca": ("years", _setup_dca, simulate_dca),
+    "calculate_max_drawdown": ("years", _setup_drawdown, calculate_max_drawdown),
+    "prophet_fit_predict": ("years", _setup_prophet, _run_prophet),
+    "calculate_portfolio+performance": ("matrix", _setup_portfolio, _run_portfolio),
+    "relativereturn": ("matrix", lambda prices, years: (prices,), relativereturn),
+    "compute_indicators": ("matrix", lambda prices, years: (prices,), compute_indicators),
+    "training_frames": ("matrix", lambda prices, years: (prices,), training_frames),
+    "project_portfolio": ("years", _setup_projection, _run_projection),
+    "rolling_correlation": ("matrix", lambda prices, years: (prices.pct_change().iloc[1:], 60), rolling_correlation),
+    "apply_filters (scan)": ("universe", _setup_screener, _run_screen_scan),
+    "apply_filters (index)": ("universe", _setup_screen_index, _run_screen_index),
+}
+
+# ขนาดสูงสุดของเคสที่ช้ามาก (ปี, จำนวนหุ้น) เพื่อให้ชุดทดสอบจบในเวลาที่เหมาะสม
+LIMITS = {
+    "prophet_fit_predict": (10, 1),
+    "rolling_correlation": (30, 100),
+}
+
+
+def time_call(func, args, repeat):
+    """Run ``func(*args)`` ``repeat`` times; return the timings in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run(cases=None, tickers=DEFAULT_TICKERS, years=DEFAULT_YEARS, repeat=3, seed=0, log=None):
+    """Time every selected case over its size grid and return one row per run."""
+    rows = []
+    for name in cases or CASES:
+        sweep, setup, func = CASES[name]
+        max_years, max_tickers = LIMITS.get(name, (max(years), max(tickers)))
+        if sweep == "years":
+            sizes = [(1, y) for y in years if y <= max_years]
+        elif sweep == "matrix":
+            sizes = [(n, y) for n in tickers for y in years if n <= max_tickers and y <= max_years]
+        else:
+            sizes = [(n, None) for n in tickers if n <= max_tickers]
+
+        for n_tickers, n_years in sizes:
+            try:
+                if sweep == "universe":
+                    args = setup(n_tickers)
+                else:
+                    args = setup(synthetic_prices(n_tickers, n_years, seed), n_years)
+            except ImportError as e:
+                if log:
+                    log(f"skip {name}: {e}")
+                break
+            timings = time_call(func, args, repeat)
+            row = {
+                "case": name,
+                "tickers": n_tickers,
+                "years": n_years,
+                "best_ms": min(timings) * 1000,
+                "median_ms": statistics.median(timings) * 1000,
+            }
+            rows.append(row)
+            if log:
+                log(f"{name:34s} tickers={n_tickers:<5d} years={n_years or '-':<3} "
+                    f"best={row['best_ms']:10.2f} ms  median={row['median_ms']:10.2f} ms")
+    return pd.DataFrame(rows)
+
+
+def compare(results, baseline, threshold=0.2):
+    """Join ``results`` with a ``baseline`` run and mark slowdowns above ``threshold``."""
+    keys = ["case", "tickers", "years"]
+    merged = results.merge(baseline[keys + ["best_ms"]], on=keys, how="left",
+                           suffixes=("", "_baseline"))
+    merged["change"] = merged["best_ms"] / merged["best_ms_baseline"] - 1
+    merged["regression"] = merged["change"] > threshold
+    return merged
+
+
+def _ints(text):
+    return tuple(int(x) for x in text.split(",") if x.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", help="comma separated case names (default: all)")
+    parser.add_argument("--tickers", type=_ints, default=DEFAULT_TICKERS, help="e.g. 1,10,100,1000")
+    parser.add_argument("--years", type=_ints, default=DEFAULT_YEARS, help="e.g. 1,5,30")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --json run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown vs baseline counted as a regression (default 0.2 = 20%%)")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (sweep, _, _) in CASES.items():
+            print(f"{name:34s} {sweep}")
+        return 0
+
+    cases = [c.strip() for c in args.cases.split(",")] if args.cases else None
+    unknown = set(cases or []) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    results = run(cases, args.tickers, args.years, args.repeat, log=print)
+    if args.json:
+        results.to_json(args.json, orient="records", indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = pd.DataFrame(json.load(f))
+        merged = compare(results, baseline, args.threshold)
+        print(merged.to_string(index=False))
+        if merged["regression"].any():
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# ความกว้างกราฟโดยประมาณ (พิกเซล) ใช้กำหนดจำนวนจุดที่ส่งไปยังเบราว์เซอร์
+DEFAULT_WIDTH_PX = 1000
+
+
+def _as_float(values):
+    if isinstance(getattr(values, "dtype", None), pd.DatetimeTZDtype):
+        # รวมถึงเวลาที่มี timezone (เช่นข้อมูล yfinance เวลาไทย) ซึ่ง np.asarray ให้เป็น object
+        return pd.DatetimeIndex(values).as_unit("ns").asi8.astype(np.float64)
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def _fill_gaps(y):
+    """Fill NaN so bucket statistics stay defined; the chart still shows the gaps."""
+    y = pd.Series(_as_float(y)).ffill().bfill()
+    return y.fillna(0).to_numpy()
+
+
+def lttb_indices(y, n_out, x=None):
+    """Largest-Triangle-Three-Buckets: ``n_out`` indices that keep the shape of ``y``."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = _fill_gaps(y)
+    x = np.arange(n, dtype=np.float64) if x is None else _as_float(x)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start = edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_stop = max(next_stop, next_start + 1)
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return np.unique(out)
+
+
+def minmax_indices(y, n_buckets):
+    """Index of the minimum and maximum of ``y`` in each of ``n_buckets`` buckets."""
+    n = len(y)
+    if 2 * n_buckets + 2 >= n:
+        return np.arange(n)
+    y = _as_float(y)
+    size = -(-n // n_buckets)
+    padded = np.full(size * n_buckets, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lows = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1) + offsets
+    highs = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1) + offsets
+    idx = np.concatenate([[0, n - 1], lows, highs])
+    return np.unique(idx[idx < n])
+
+
+def downsample(frame, max_points=None, method="lttb", width_px=DEFAULT_WIDTH_PX):
+    """Decimate every column of ``frame`` to what ``width_px`` pixels can show.
+
+    Rows kept for any column are kept for all, so the lines still share one
+    x axis; the per-column budget is split so the total stays near
+    ``max_points`` (one point per pixel for LTTB, a min/max pair per pixel
+    for ``method="minmax"``). A Series is treated as a one-column frame.
+    """
+    if max_points is None:
+        max_points = width_px * (2 if method == "minmax" else 1)
+    if len(frame) <= max_points:
+        return frame
+    columns = [frame] if isinstance(frame, pd.Series) else [frame[c] for c in frame.columns]
+    budget = max(max_points // max(len(columns), 1), 3)
+    x = frame.index if isinstance(frame.index, pd.DatetimeIndex) else None
+    picked = []
+    for column in columns:
+        if method == "minmax":
+            picked.append(minmax_indices(column.to_numpy(), budget // 2))
+        else:
+            picked.append(lttb_indices(column.to_numpy(), budget, x))
+    return frame.iloc[np.unique(np.concatenate(picked))]
+
+
+def window(frame, start=None, end=None, column=None):
+    """Rows of ``frame`` inside ``[start, end]``, by index or by a date ``column``.
+
+    Charts call this before ``downsample`` so a narrower (zoomed) range is
+    decimated less and reaches full resolution once it fits the pixel budget.
+    """
+    keys = frame.index if column is None else frame[column]
+    keep = np.ones(len(frame), dtype=bool)
+    if start is not None:
+        keep &= np.asarray(keys >= pd.Timestamp(start))
+    if end is not None:
+        keep &= np.asarray(keys <= pd.Timestamp(end))
+    return frame[keep]
+
+
+# คอลัมน์ของผลพยากรณ์ Prophet ที่ใช้วาดกราฟ
+FORECAST_COLUMNS = ["ds", "yhat", "yhat_lower", "yhat_upper", "trend", "weekly", "yearly"]
+
+
+def forecast_figure(history, forecast, width_px=DEFAULT_WIDTH_PX):
+    """Plotly figure of actual prices, the forecast and its uncertainty band.
+
+    Only ``ds``/``yhat``/bounds (and the actual ``y``) are used, each
+    decimated to ``width_px``, so the figure stays small and renders on the
+    page's own plotly client instead of an embedded HTML document.
+    """
+    band = downsample(
+        forecast.set_index("ds")[["yhat", "yhat_lower", "yhat_upper"]], width_px=width_px
+    )
+    actual = downsample(history.set_index("ds")["y"], width_px=width_px)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=band.index, y=band["yhat_upper"], mode="lines",
+                             line=dict(width=0), showlegend=False, hoverinfo="skip"))
+    fig.add_trace(go.Scatter(x=band.index, y=band["yhat_lower"], mode="lines",
+                             line=dict(width=0), fill="tonexty",
+                             fillcolor="rgba(0, 114, 178, 0.2)", name="ช่วงความเชื่อมั่น"))
+    fig.add_trace(go.Scatter(x=band.index, y=band["yhat"], mode="lines",
+                             line=dict(color="#0072B2", width=2), name="ค่าพยากรณ์"))
+    fig.add_trace(go.Scatter(x=actual.index, y=actual, mode="markers",
+                             marker=dict(color="black", size=3), name="ราคาจริง"))
+    fig.update_layout(xaxis_rangeslider_visible=True, height=600)
+    return fig
+
+
+def component_figures(forecast):
+    """Trend, weekly and yearly component figures built from the forecast frame.
+
+    Plotly replacements for ``Prophet.plot_components``; seasonal components
+    are folded to one week and one year, so each figure has at most a few
+    hundred points.
+    """
+    figures = []
+    trend = downsample(forecast.set_index("ds")["trend"])
+    figures.append(("แนวโน้ม (Trend)", go.Figure(go.Scatter(x=trend.index, y=trend, mode="lines"))))
+    ds = pd.DatetimeIndex(forecast["ds"])
+    if "weekly" in forecast:
+        weekly = forecast["weekly"].groupby(ds.dayofweek).mean()
+        days = ["จันทร์", "อังคาร", "พุธ", "พฤหัสบดี", "ศุกร์", "เสาร์", "อาทิตย์"]
+        figures.append(("รายสัปดาห์ (Weekly)", go.Figure(
+            go.Scatter(x=[days[d] for d in weekly.index], y=weekly.to_numpy(), mode="lines"))))
+    if "yearly" in forecast:
+        yearly = forecast["yearly"].groupby(ds.dayofyear).mean()
+        figures.append(("รายปี (Yearly)", go.Figure(
+            go.Scatter(x=yearly.index, y=yearly.to_numpy(), mode="lines"))))
+    for title, fig in figures:
+        fig.update_layout(title_text=title, height=300, margin=dict(t=40, b=20))
+    return [fig for _, fig in figures]
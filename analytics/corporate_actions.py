@@ -0,0 +1,127 @@
+"""Dividends, splits and total-return indices kept on disk per ticker.
+
+Each ticker's file under ``data/actions`` holds the unadjusted daily close,
+the dividend and split events and a ``Total Return`` index (close with
+every dividend reinvested on its ex-date). Updates fetch only the days
+after the last stored one and extend the index from its last value; when a
+new split arrives the stored rows are rescaled instead of re-downloaded.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from analytics.providers import get_provider
+
+ACTIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "actions"
+)
+
+# วันเริ่มต้นของประวัติเมื่อยังไม่มีไฟล์ของหุ้นตัวนั้น
+DEFAULT_START = "2000-01-01"
+
+COLUMNS = ["Close", "Dividends", "Stock Splits", "Total Return"]
+
+_lock = threading.Lock()
+
+
+def _path(ticker, root):
+    return os.path.join(root, f"{ticker}.parquet")
+
+
+def _normalize(frame):
+    """Close, Dividends and Stock Splits indexed by naive trading date."""
+    if frame is None or frame.empty or "Close" not in frame:
+        return pd.DataFrame(columns=COLUMNS[:3], dtype=float)
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    out = pd.DataFrame({
+        "Close": frame["Close"].to_numpy(dtype=float, na_value=np.nan),
+        "Dividends": frame["Dividends"].to_numpy(dtype=float, na_value=0) if "Dividends" in frame else 0.0,
+        "Stock Splits": frame["Stock Splits"].to_numpy(dtype=float, na_value=0) if "Stock Splits" in frame else 0.0,
+    }, index=index.normalize().rename("Date"))
+    out = out.dropna(subset=["Close"])
+    return out[~out.index.duplicated(keep="last")].sort_index()
+
+
+def load_actions(ticker, root=ACTIONS_DIR):
+    """Stored prices, actions and total-return index of ``ticker`` (empty if none)."""
+    path = _path(ticker, root)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=COLUMNS, dtype=float)
+    return pd.read_parquet(path)
+
+
+def extend_total_return(stored, new):
+    """Append the rows of ``new`` after the end of ``stored`` and extend the index.
+
+    Prices are in current share units (like Yahoo's split-adjusted close),
+    so splits in the new rows scale the stored close, dividends and index
+    down by the split ratio. Each new day's index grows by
+    ``(close + dividend) / previous close``.
+    """
+    new = _normalize(new)
+    if not stored.empty:
+        new = new[new.index > stored.index[-1]]
+    if new.empty:
+        return stored
+
+    if stored.empty:
+        previous_close, previous_index = new["Close"].iloc[0], new["Close"].iloc[0]
+        growth_from = 1
+    else:
+        splits = new["Stock Splits"].to_numpy()
+        ratio = np.prod(splits[splits > 0]) if (splits > 0).any() else 1.0
+        stored = stored.copy()
+        if ratio != 1.0:
+            # ราคาเก่าถูกปรับตามการแตกพาร์ใหม่ ไม่ต้องดาวน์โหลดประวัติทั้งหมดอีกครั้ง
+            stored[["Close", "Dividends", "Total Return"]] /= ratio
+        previous_close, previous_index = stored["Close"].iloc[-1], stored["Total Return"].iloc[-1]
+        growth_from = 0
+
+    close = new["Close"].to_numpy()
+    prev = np.r_[previous_close, close[:-1]]
+    growth = (close + new["Dividends"].to_numpy()) / prev
+    growth[:growth_from] = 1.0
+    new["Total Return"] = previous_index * np.cumprod(growth)
+    return pd.concat([stored, new]) if not stored.empty else new
+
+
+def update_actions(ticker, provider=None, root=ACTIONS_DIR, start=DEFAULT_START):
+    """Fetch the days after the last stored one and save the extended series."""
+    if provider is None:
+        provider = get_provider()
+    with _lock:
+        stored = load_actions(ticker, root)
+        since = start if stored.empty else stored.index[-1]
+        merged = extend_total_return(stored, provider.actions(ticker, start=since))
+        if merged is not stored:
+            os.makedirs(root, exist_ok=True)
+            tmp_path = _path(ticker, root) + ".tmp"
+            merged.to_parquet(tmp_path)
+            os.replace(tmp_path, _path(ticker, root))
+    return merged
+
+
+def total_return_frame(ticker, start=None, end=None, update=True, provider=None, root=ACTIONS_DIR):
+    """Close, dividends, splits and total return of ``ticker`` between ``start`` and ``end``.
+
+    ``Total Return`` is rebased to equal the close on the first row, so it
+    reads as the price of a holding that reinvested every dividend since
+    ``start``.
+    """
+    if update:
+        frame = update_actions(ticker, provider, root)
+    else:
+        frame = load_actions(ticker, root)
+    if start is not None:
+        frame = frame[frame.index >= pd.Timestamp(start)]
+    if end is not None:
+        frame = frame[frame.index < pd.Timestamp(end)]
+    if frame.empty:
+        return frame
+    frame = frame.copy()
+    frame["Total Return"] *= frame["Close"].iloc[0] / frame["Total Return"].iloc[0]
+    return frame
@@ -0,0 +1,107 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import fcluster, leaves_list, linkage
+from scipy.spatial.distance import squareform
+
+
+def _prepare(returns):
+    """Demeaned values with NaN set to 0 plus the validity mask (float64)."""
+    values = np.asarray(returns, dtype=np.float64)
+    mask = np.isfinite(values)
+    with np.errstate(invalid="ignore"):
+        centered = values - np.nanmean(np.where(mask, values, np.nan), axis=0)
+    return np.where(mask, centered, 0.0), mask.astype(np.float64)
+
+
+def _pairwise(sxy, sx, sxx, n, ddof=1):
+    """Pairwise-complete covariance and correlation from accumulated sums.
+
+    ``sx[i, j]``/``sxx[i, j]`` are the sum/sum of squares of column ``i``
+    over rows where both ``i`` and ``j`` are present, ``n[i, j]`` the count.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (sxy - sx * sx.T / n) / (n - ddof)
+        var = (sxx - sx * sx / n) / (n - ddof)
+        corr = cov / np.sqrt(var * var.T)
+    cov[n <= ddof] = np.nan
+    corr[n <= ddof] = np.nan
+    return cov, np.clip(corr, -1, 1)
+
+
+def covariance_matrices(returns):
+    """Full-period pairwise-complete covariance and correlation, via matrix products.
+
+    Missing values (e.g. before a listing date) are excluded pair by pair,
+    matching ``DataFrame.cov()``/``DataFrame.corr()``.
+    """
+    x, m = _prepare(returns)
+    n = m.T @ m
+    sx = x.T @ m
+    sxx = (x * x).T @ m
+    cov, corr = _pairwise(x.T @ x, sx, sxx, n)
+    columns = list(returns.columns)
+    return (
+        pd.DataFrame(cov, index=columns, columns=columns),
+        pd.DataFrame(corr, index=columns, columns=columns),
+    )
+
+
+def rolling_correlation(returns, window, min_periods=None):
+    """Rolling pairwise correlation for every pair at once.
+
+    Keeps running window sums and updates them incrementally: each new row
+    adds its outer products and the row leaving the window subtracts its
+    own, so every step costs O(N^2) regardless of ``window``. Returns a
+    float32 array of shape ``(dates, tickers, tickers)``.
+    """
+    min_periods = window if min_periods is None else min_periods
+    x, m = _prepare(returns)
+    n_dates, n_tickers = x.shape
+    sxy = np.zeros((n_tickers, n_tickers))
+    sx = np.zeros((n_tickers, n_tickers))
+    sxx = np.zeros((n_tickers, n_tickers))
+    n = np.zeros((n_tickers, n_tickers))
+    out = np.full((n_dates, n_tickers, n_tickers), np.nan, dtype=np.float32)
+
+    for t in range(n_dates):
+        for row, sign in ((t, 1.0), (t - window, -1.0)):
+            if row < 0:
+                continue
+            xr, mr = x[row], m[row]
+            sxy += sign * np.outer(xr, xr)
+            sx += sign * np.outer(xr, mr)
+            sxx += sign * np.outer(xr * xr, mr)
+            n += sign * np.outer(mr, mr)
+        _, corr = _pairwise(sxy, sx, sxx, n)
+        corr[n < min_periods] = np.nan
+        out[t] = corr
+    return out
+
+
+def average_correlation(corr_stack, index):
+    """Mean off-diagonal correlation at every date of a rolling stack."""
+    n_tickers = corr_stack.shape[1]
+    off_diagonal = ~np.eye(n_tickers, dtype=bool)
+    with warnings.catch_warnings():
+        # วันที่ยังไม่ครบหน้าต่างจะเป็น NaN ทั้งแถว
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        values = np.nanmean(corr_stack[:, off_diagonal], axis=1)
+    return pd.Series(values, index=index)
+
+
+def cluster(corr, n_clusters=None, method="average"):
+    """Hierarchical clustering on the correlation distance ``sqrt((1 - rho) / 2)``.
+
+    Returns ``(order, labels)``: the ticker order that places similar names
+    next to each other (for heatmaps), and a cluster number per ticker when
+    ``n_clusters`` is given.
+    """
+    corr = corr.fillna(0).to_numpy(copy=True)
+    np.fill_diagonal(corr, 1.0)
+    distance = np.sqrt(np.clip((1 - corr) / 2, 0, 1))
+    tree = linkage(squareform(distance, checks=False), method=method)
+    order = leaves_list(tree)
+    labels = fcluster(tree, n_clusters, criterion="maxclust") if n_clusters else None
+    return order, labels
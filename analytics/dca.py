@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+
+def simulate_dca(stock_data, monthly_amount, duration_months, start_date, reinvest_dividends=False):
+    """Buy ``monthly_amount`` of stock every month and track the holding.
+
+    ``stock_data`` needs a ``Close`` column and may have a ``Dividends``
+    column (cash per share on the ex-date). Dividends on shares held before
+    each ex-date are either reinvested at that day's close or kept as cash.
+
+    Returns one row per purchase with the date, shares held, total invested,
+    dividends received in cash and portfolio value (shares plus cash) at
+    that date.
+    """
+    dca_data = pd.DataFrame(columns=["Date", "Shares", "Total Invested", "Dividends", "Portfolio Value"])
+    total_invested = 0
+    shares = 0
+    cash = 0
+    start_date = pd.to_datetime(start_date)  # Convert start_date to datetime
+
+    close = stock_data["Close"].to_numpy(dtype=float)
+    if "Dividends" in stock_data:
+        dividends = np.nan_to_num(stock_data["Dividends"].to_numpy(dtype=float))
+    else:
+        dividends = np.zeros(len(close))
+    # ต่อหุ้น: จำนวนหุ้นที่ได้เพิ่มเมื่อนำปันผลไปซื้อ (คูณสะสม) และเงินปันผลสะสม
+    reinvest_growth = np.cumprod(1 + dividends / close)
+    cash_per_share = np.cumsum(dividends)
+
+    previous = None
+    for i in range(duration_months):
+        date = start_date + pd.DateOffset(months=i)  # Calculate the monthly date
+        position = stock_data.index.searchsorted(date)  # Adjust to the closest trading day
+        date = stock_data.index[position]
+        if previous is not None:
+            # ปันผลที่ขึ้นเครื่องหมาย XD ระหว่างงวดก่อนหน้าจนถึงวันนี้ (ก่อนซื้อเพิ่ม)
+            if reinvest_dividends:
+                shares *= reinvest_growth[position] / reinvest_growth[previous]
+            else:
+                cash += shares * (cash_per_share[position] - cash_per_share[previous])
+        price = close[position]
+        shares_bought = monthly_amount / price
+        shares += shares_bought
+        total_invested += monthly_amount
+        portfolio_value = shares * price + cash
+        dca_data.loc[len(dca_data)] = [date, shares, total_invested, cash, portfolio_value]
+        previous = position
+
+    return dca_data
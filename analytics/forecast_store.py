@@ -0,0 +1,91 @@
+"""Stored forecasts, fitted once for the longest horizon and sliced on read.
+
+Each forecast is saved under ``data/forecasts/<model version>/<ticker>/``
+in a file named after a hash of its training data. It covers
+``MAX_HORIZON_DAYS``, so any shorter horizon is a filtered Parquet read
+instead of a new fit and predict. When a ticker is refitted on newer data,
+its older file is removed.
+"""
+import glob
+import hashlib
+import os
+
+import pandas as pd
+
+from analytics.forecasting import forecast_many
+
+FORECAST_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "forecasts"
+)
+
+# ขอบบนของแถบเลื่อนจำนวนปีในหน้าพยากรณ์ (4 ปี)
+MAX_HORIZON_DAYS = 4 * 365
+
+# เปลี่ยนเมื่อปรับการตั้งค่าแบบจำลอง เพื่อไม่ให้ใช้ผลพยากรณ์จากแบบจำลองเก่า
+MODEL_VERSION = "prophet-default-1"
+
+
+def training_key(df_train):
+    """Short hash of a ``ds``/``y`` training frame."""
+    hashed = pd.util.hash_pandas_object(df_train[["ds", "y"]], index=False)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()[:16]
+
+
+def _ticker_dir(ticker, version, root):
+    return os.path.join(root, version, ticker)
+
+
+def _path(ticker, key, version, root):
+    return os.path.join(_ticker_dir(ticker, version, root), f"{key}.parquet")
+
+
+def horizon_end(df_train, period):
+    """Last forecast date for ``period`` days after the training data."""
+    return pd.Timestamp(df_train["ds"].iloc[-1]) + pd.Timedelta(days=period)
+
+
+def load_forecast(ticker, df_train, period, version=MODEL_VERSION, root=FORECAST_DIR):
+    """Stored forecast for this training data cut to ``period`` days, or None."""
+    path = _path(ticker, training_key(df_train), version, root)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path, filters=[("ds", "<=", horizon_end(df_train, period))])
+
+
+def save_forecast(ticker, df_train, forecast, version=MODEL_VERSION, root=FORECAST_DIR):
+    """Store a full-horizon forecast and drop the ticker's forecasts for older data."""
+    path = _path(ticker, training_key(df_train), version, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    forecast.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    for old in glob.glob(os.path.join(_ticker_dir(ticker, version, root), "*.parquet")):
+        if old != path:
+            os.remove(old)
+
+
+def stored_forecasts(frames, period, workers=None, version=MODEL_VERSION, root=FORECAST_DIR):
+    """Forecasts for ``period`` days per ticker, fitting only tickers not in the store.
+
+    Missing tickers are fitted for ``MAX_HORIZON_DAYS`` through
+    ``forecast_many``, saved, then sliced like the stored ones. Returns
+    ``(forecasts, errors)`` keyed by ticker, in the order of ``frames``.
+    """
+    forecasts = {}
+    missing = {}
+    for ticker, df_train in frames.items():
+        forecast = load_forecast(ticker, df_train, period, version, root)
+        if forecast is None:
+            missing[ticker] = df_train
+        else:
+            forecasts[ticker] = forecast
+
+    errors = {}
+    if missing:
+        fitted, errors = forecast_many(missing, MAX_HORIZON_DAYS, workers)
+        for ticker, forecast in fitted.items():
+            save_forecast(ticker, missing[ticker], forecast, version, root)
+            end = horizon_end(missing[ticker], period)
+            forecasts[ticker] = forecast[forecast["ds"] <= end].reset_index(drop=True)
+    forecasts = {ticker: forecasts[ticker] for ticker in frames if ticker in forecasts}
+    return forecasts, errors
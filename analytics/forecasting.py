@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from analytics.charting import FORECAST_COLUMNS
+
+# จำนวนแถวขั้นต่ำที่ใช้ฝึกแบบจำลองได้
+MIN_TRAINING_ROWS = 30
+
+
+def training_frames(prices, min_rows=MIN_TRAINING_ROWS):
+    """Prophet training frames (``ds``/``y``) for every column of a dates x tickers matrix.
+
+    The whole matrix is cleaned in one pass (numeric cast, missing and
+    non-positive prices dropped) and split per ticker by column position,
+    so no per-ticker copy/rename/dropna is needed. Tickers with fewer than
+    ``min_rows`` usable rows are left out.
+    """
+    values = prices.to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = np.isfinite(values) & (values > 0)
+    dates = pd.DatetimeIndex(prices.index).tz_localize(None).to_numpy()
+    frames = {}
+    for j in np.flatnonzero(valid.sum(axis=0) >= min_rows):
+        rows = valid[:, j]
+        frames[prices.columns[j]] = pd.DataFrame({"ds": dates[rows], "y": values[rows, j]})
+    return frames
+
+
+def fit_forecast(job):
+    """Worker entry point: fit Prophet on one ticker and predict ``period`` days ahead."""
+    ticker, df_train, period = job
+    import logging
+
+    from prophet import Prophet
+
+    # ข้อความของ cmdstanpy จากหลาย worker ปนกันจนอ่านไม่ออก
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    m = Prophet()
+    m.fit(df_train)
+    forecast = m.predict(m.make_future_dataframe(periods=period))
+    return ticker, forecast[[c for c in FORECAST_COLUMNS if c in forecast.columns]]
+
+
+def forecast_many(frames, period, workers=None):
+    """Fit one model per ticker across a process pool.
+
+    Returns ``(forecasts, errors)``: forecast frames and error messages,
+    both keyed by ticker, so one failed fit does not stop the batch.
+    """
+    if workers is None:
+        workers = min(len(frames), os.cpu_count() or 1)
+    jobs = [(ticker, frame, period) for ticker, frame in frames.items()]
+    forecasts, errors = {}, {}
+    if workers <= 1:
+        for job in jobs:
+            try:
+                ticker, forecast = fit_forecast(job)
+                forecasts[ticker] = forecast
+            except Exception as e:
+                errors[job[0]] = str(e)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fit_forecast, job): job[0] for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    ticker, forecast = future.result()
+                    forecasts[ticker] = forecast
+                except Exception as e:
+                    errors[futures[future]] = str(e)
+    # เรียงตามลำดับเดิมของหุ้น
+    forecasts = {ticker: forecasts[ticker] for ticker in frames if ticker in forecasts}
+    return forecasts, errors
+
+
+def rank_forecasts(frames, forecasts):
+    """One row per ticker with the predicted return to the end of the horizon, best first."""
+    rows = []
+    for ticker, forecast in forecasts.items():
+        last_close = frames[ticker]["y"].iloc[-1]
+        end = forecast.iloc[-1]
+        rows.append({
+            "Ticker": ticker,
+            "Last Close": last_close,
+            "Predicted Price": end["yhat"],
+            "Predicted Return (%)": (end["yhat"] / last_close - 1) * 100,
+            "Lower (%)": (end["yhat_lower"] / last_close - 1) * 100,
+            "Upper (%)": (end["yhat_upper"] / last_close - 1) * 100,
+        })
+    columns = ["Ticker", "Last Close", "Predicted Price", "Predicted Return (%)", "Lower (%)", "Upper (%)"]
+    table = pd.DataFrame(rows, columns=columns)
+    return table.sort_values("Predicted Return (%)", ascending=False, ignore_index=True)
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+# พารามิเตอร์มาตรฐานของอินดิเคเตอร์
+SMA_WINDOWS = (20, 50)
+EMA_SPANS = (12, 26)
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_WINDOW, BB_STD = 20, 2.0
+ATR_PERIOD = 14
+
+# จำนวนแท่งย้อนหลังที่ต้องเก็บไว้สำหรับอัปเดตค่าแบบ rolling
+TAIL_BARS = max(max(SMA_WINDOWS), BB_WINDOW)
+
+
+def _ewm(frame, alpha, min_periods):
+    return frame.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean()
+
+
+def _true_range(high, low, prev_close):
+    high, low, prev_close = (np.asarray(x, dtype=np.float64) for x in (high, low, prev_close))
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def compute_indicators(close, high=None, low=None):
+    """Compute every indicator for a dates x tickers price matrix at once.
+
+    Returns ``(indicators, state)``: ``indicators`` maps a name such as
+    ``"RSI14"`` to a dates x tickers DataFrame, and ``state`` is what
+    ``update_indicators`` needs to extend them when new bars arrive.
+    ATR is only computed when ``high`` and ``low`` are given.
+    """
+    close = close.ffill()
+    out = {}
+    state = {"close": close.tail(TAIL_BARS), "count": close.notna().sum(), "ewm": {}}
+
+    for window in SMA_WINDOWS:
+        out[f"SMA{window}"] = close.rolling(window).mean()
+    for span in EMA_SPANS:
+        ema = _ewm(close, 2 / (span + 1), 0)
+        state["ewm"][f"EMA{span}"] = ema.iloc[-1]
+        out[f"EMA{span}"] = ema.where(close.notna().cumsum() >= span)
+
+    delta = close.diff()
+    avg_gain = _ewm(delta.clip(lower=0), 1 / RSI_PERIOD, 0)
+    avg_loss = _ewm(-delta.clip(upper=0), 1 / RSI_PERIOD, 0)
+    state["ewm"]["avg_gain"] = avg_gain.iloc[-1]
+    state["ewm"]["avg_loss"] = avg_loss.iloc[-1]
+    out[f"RSI{RSI_PERIOD}"] = _rsi(avg_gain, avg_loss).where(delta.notna().cumsum() >= RSI_PERIOD)
+
+    fast = _ewm(close, 2 / (MACD_FAST + 1), 0)
+    slow = _ewm(close, 2 / (MACD_SLOW + 1), 0)
+    macd = fast - slow
+    signal = _ewm(macd, 2 / (MACD_SIGNAL + 1), 0)
+    state["ewm"].update(macd_fast=fast.iloc[-1], macd_slow=slow.iloc[-1], macd_signal=signal.iloc[-1])
+    warm = close.notna().cumsum() >= MACD_SLOW
+    out["MACD"] = macd.where(warm)
+    out["MACD Signal"] = signal.where(warm)
+    out["MACD Hist"] = (macd - signal).where(warm)
+
+    mid = close.rolling(BB_WINDOW).mean()
+    std = close.rolling(BB_WINDOW).std()
+    out["BB Mid"] = mid
+    out["BB Upper"] = mid + BB_STD * std
+    out["BB Lower"] = mid - BB_STD * std
+
+    if high is not None and low is not None:
+        tr = pd.DataFrame(
+            _true_range(high, low, close.shift(1)), index=close.index, columns=close.columns
+        )
+        atr = _ewm(tr, 1 / ATR_PERIOD, 0)
+        state["ewm"]["atr"] = atr.iloc[-1]
+        out[f"ATR{ATR_PERIOD}"] = atr.where(close.notna().cumsum() >= ATR_PERIOD)
+
+    return out, state
+
+
+def _rsi(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def _ewm_step(prev, value, alpha):
+    """One recursive EWM step per ticker; a missing ``prev`` starts at ``value``."""
+    stepped = alpha * value + (1 - alpha) * prev
+    return stepped.where(prev.notna(), value).where(value.notna(), prev)
+
+
+def update_indicators(indicators, state, close, high=None, low=None):
+    """Extend ``indicators`` with new bars without recomputing the history.
+
+    Recursive indicators (EMA, RSI, MACD, ATR) continue from their last
+    values in ``state``; rolling ones are recomputed on the kept tail only.
+    Returns the updated ``(indicators, state)``.
+    """
+    prev_close = state["close"].iloc[-1]
+    close = close.reindex(columns=state["close"].columns)
+    close = pd.concat([state["close"].iloc[-1:], close]).ffill().iloc[1:]
+    ewm = dict(state["ewm"])
+    count = state["count"].copy()
+    rows = {name: [] for name in indicators}
+
+    if high is not None:
+        high = high.reindex(index=close.index, columns=close.columns)
+        low = low.reindex(index=close.index, columns=close.columns)
+
+    for i, (date, bar) in enumerate(close.iterrows()):
+        count = count + bar.notna()
+        delta = bar - prev_close
+        values = {}
+        for span in EMA_SPANS:
+            ewm[f"EMA{span}"] = _ewm_step(ewm[f"EMA{span}"], bar, 2 / (span + 1))
+            values[f"EMA{span}"] = ewm[f"EMA{span}"].where(count >= span)
+
+        ewm["avg_gain"] = _ewm_step(ewm["avg_gain"], delta.clip(lower=0), 1 / RSI_PERIOD)
+        ewm["avg_loss"] = _ewm_step(ewm["avg_loss"], -delta.clip(upper=0), 1 / RSI_PERIOD)
+        values[f"RSI{RSI_PERIOD}"] = _rsi(ewm["avg_gain"], ewm["avg_loss"]).where(count - 1 >= RSI_PERIOD)
+
+        ewm["macd_fast"] = _ewm_step(ewm["macd_fast"], bar, 2 / (MACD_FAST + 1))
+        ewm["macd_slow"] = _ewm_step(ewm["macd_slow"], bar, 2 / (MACD_SLOW + 1))
+        macd = ewm["macd_fast"] - ewm["macd_slow"]
+        ewm["macd_signal"] = _ewm_step(ewm["macd_signal"], macd, 2 / (MACD_SIGNAL + 1))
+        warm = count >= MACD_SLOW
+        values["MACD"] = macd.where(warm)
+        values["MACD Signal"] = ewm["macd_signal"].where(warm)
+        values["MACD Hist"] = (macd - ewm["macd_signal"]).where(warm)
+
+        if "atr" in ewm and high is not None:
+            tr = pd.Series(_true_range(high.iloc[i], low.iloc[i], prev_close), index=bar.index)
+            ewm["atr"] = _ewm_step(ewm["atr"], tr, 1 / ATR_PERIOD)
+            values[f"ATR{ATR_PERIOD}"] = ewm["atr"].where(count >= ATR_PERIOD)
+
+        for name, value in values.items():
+            rows[name].append(value.rename(date))
+        prev_close = bar.where(bar.notna(), prev_close)
+
+    tail = pd.concat([state["close"], close])
+    for window in SMA_WINDOWS:
+        rows[f"SMA{window}"] = tail.rolling(window).mean().iloc[-len(close):]
+    mid = tail.rolling(BB_WINDOW).mean().iloc[-len(close):]
+    std = tail.rolling(BB_WINDOW).std().iloc[-len(close):]
+    rows["BB Mid"] = mid
+    rows["BB Upper"] = mid + BB_STD * std
+    rows["BB Lower"] = mid - BB_STD * std
+
+    updated = {}
+    for name, frame in indicators.items():
+        new = rows[name]
+        if isinstance(new, list):
+            new = pd.DataFrame(new) if new else frame.iloc[:0]
+        updated[name] = pd.concat([frame, new])
+    state = {"close": tail.tail(TAIL_BARS), "count": count, "ewm": ewm}
+    return updated, state
+
+
+def latest_values(indicators, close=None):
+    """One row per ticker with the latest value of every indicator (float32).
+
+    When ``close`` is given, the distance of the last close from SMA50 in
+    percent is added as ``"% จาก SMA50"``.
+    """
+    latest = pd.DataFrame({name: frame.iloc[-1] for name, frame in indicators.items()})
+    if close is not None and "SMA50" in indicators:
+        last_close = close.ffill().iloc[-1]
+        latest["% จาก SMA50"] = (last_close / indicators["SMA50"].iloc[-1] - 1) * 100
+    return latest.astype(np.float32)
@@ -0,0 +1,162 @@
+import csv
+import os
+import threading
+import warnings
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+# วันหยุดทำการของตลาดหลักทรัพย์ฯ (อัปเดตตามประกาศของ SET ทุกปี)
+DEFAULT_HOLIDAY_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "set_holidays.csv"
+)
+
+TIMEZONE = "Asia/Bangkok"
+_TZ = ZoneInfo(TIMEZONE)
+
+# ช่วงเวลาซื้อขายภาคเช้าและภาคบ่าย (รวมช่วง pre-close และปิดตลาด)
+SESSIONS = ((time(10, 0), time(12, 30)), (time(14, 30), time(16, 40)))
+
+# เวลาที่เผื่อให้ผู้ให้บริการข้อมูลอัปเดตราคาหลังปิดแต่ละช่วง
+DATA_SETTLE = timedelta(minutes=30)
+
+# ช่วงเวลาที่แบ่ง cache ระหว่างตลาดเปิด (วินาที)
+INTRADAY_REFRESH = 3600
+
+# อายุสูงสุดของรายการใน cache ใช้เป็น ttl เพื่อล้างรายการของ epoch เก่าออกจากหน่วยความจำ
+MAX_ENTRY_AGE = timedelta(days=7)
+
+_holidays = None
+_holiday_years = frozenset()
+_warned_years = set()
+_holidays_lock = threading.Lock()
+
+
+def load_holidays(path=DEFAULT_HOLIDAY_FILE):
+    """Exchange holidays from a CSV file with a ``date`` column (YYYY-MM-DD)."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return frozenset(
+            pd.Timestamp(row["date"]).date() for row in csv.DictReader(f) if row.get("date")
+        )
+
+
+def holidays():
+    """Process-wide holiday set, read on first use."""
+    global _holidays, _holiday_years
+    if _holidays is None:
+        with _holidays_lock:
+            if _holidays is None:
+                loaded = load_holidays()
+                _holiday_years = frozenset(day.year for day in loaded)
+                _holidays = loaded
+    return _holidays
+
+
+def _check_year(year):
+    """Warn once per year that the holiday file does not cover ``year``.
+
+    Such days fall back to a weekday-only calendar, so holidays of that
+    year are taken as trading days until the file is updated.
+    """
+    if year in _holiday_years or year in _warned_years:
+        return
+    _warned_years.add(year)
+    warnings.warn(
+        f"{os.path.basename(DEFAULT_HOLIDAY_FILE)} has no SET holidays for {year}; "
+        "treating every weekday as a trading day",
+        RuntimeWarning,
+        stacklevel=3,
+    )
+
+
+def now_bangkok():
+    return datetime.now(_TZ)
+
+
+def _localize(moment):
+    """Aware Bangkok datetime; naive values are taken as Bangkok local time."""
+    moment = pd.Timestamp(moment).to_pydatetime()
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=_TZ)
+    return moment.astimezone(_TZ)
+
+
+def is_trading_day(day):
+    """Weekday that is not an exchange holiday."""
+    closed = holidays()
+    _check_year(day.year)
+    return day.weekday() < 5 and day not in closed
+
+
+def trading_seconds_per_day():
+    """Length of the regular sessions of one trading day."""
+    return sum(
+        (datetime.combine(datetime.min, end) - datetime.combine(datetime.min, start)).seconds
+        for start, end in SESSIONS
+    )
+
+
+def _windows(day, settle=DATA_SETTLE):
+    """(start, end) of each session on ``day``, with the data settle time added to the end."""
+    if not is_trading_day(day):
+        return []
+    return [
+        (datetime.combine(day, start, _TZ), datetime.combine(day, end, _TZ) + settle)
+        for start, end in SESSIONS
+    ]
+
+
+def market_is_open(now=None):
+    """True while a trading session (plus its settle time) is in progress."""
+    now = _localize(now or now_bangkok())
+    return any(start <= now < end for start, end in _windows(now.date()))
+
+
+def last_data_change(now=None, max_days=30):
+    """Latest moment at or before ``now`` when new market data could have appeared."""
+    now = _localize(now or now_bangkok())
+    for back in range(max_days):
+        for start, end in reversed(_windows(now.date() - timedelta(days=back))):
+            if start <= now < end:
+                return now
+            if end <= now:
+                return end
+    return now - timedelta(days=max_days)
+
+
+def next_data_change(now=None, max_days=30):
+    """Next moment after ``now`` when new market data can appear (next session start)."""
+    now = _localize(now or now_bangkok())
+    for ahead in range(max_days):
+        for start, end in _windows(now.date() + timedelta(days=ahead)):
+            if start <= now < end:
+                return now
+            if start > now:
+                return start
+    return now + timedelta(days=max_days)
+
+
+def cache_epoch(now=None, intraday=INTRADAY_REFRESH):
+    """Cache key component that only changes when the market can produce new data.
+
+    During a session it advances every ``intraday`` seconds. Outside trading
+    hours (nights, weekends, holidays) it stays at the end of the last
+    session, so cached entries remain valid until the next session opens.
+    """
+    now = _localize(now or now_bangkok())
+    if market_is_open(now):
+        bucket = int(now.timestamp()) // intraday * intraday
+        return f"open:{bucket}"
+    return f"closed:{last_data_change(now):%Y-%m-%dT%H:%M}"
+
+
+def intraday_cache_epoch(now=None):
+    """``cache_epoch`` with one-minute buckets, for intraday bars."""
+    return cache_epoch(now, intraday=60)
+
+
+def seconds_until_change(now=None):
+    """Seconds for which data fetched now stays current (0 while the market is open)."""
+    now = _localize(now or now_bangkok())
+    return max(0, int((next_data_change(now) - now).total_seconds()))
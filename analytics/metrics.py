@@ -0,0 +1,277 @@
+"""Latency and I/O instrumentation for the pages.
+
+Data fetches, cache lookups and heavy compute steps are wrapped with
+``timed``/``track``/``cached``. Each event is added to the current rerun
+(started by ``begin_run`` at the top of a page and shown by
+``render_debug_panel``) and to process-wide totals exported in the
+Prometheus text format by ``prometheus_text``.
+
+``PREDICTION_METRICS_PORT``
+    Serve the totals at ``http://<host>:<port>/metrics`` for scraping.
+``PREDICTION_DEBUG``
+    Set to ``1`` to always show the debug panel (otherwise add
+    ``?debug=1`` to the page URL).
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# ขอบบนของช่วงเวลา (วินาที) สำหรับ histogram
+DURATION_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_totals = {}
+_lock = threading.Lock()
+_run = contextvars.ContextVar("metrics_run", default=None)
+_cache_state = threading.local()
+_server = None
+
+
+def size_of(obj):
+    """Approximate payload size in bytes of a fetched or computed object."""
+    if obj is None:
+        return 0
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(index=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, str):
+        return len(obj.encode())
+    if isinstance(obj, dict):
+        return len(json.dumps(obj, default=str).encode())
+    if isinstance(obj, (tuple, list)):
+        return sum(size_of(item) for item in obj)
+    return 0
+
+
+def record(name, kind, seconds, nbytes=0, error=False, hit=None):
+    """Add one event to the current rerun and to the process totals."""
+    event = {"name": name, "kind": kind, "seconds": seconds, "bytes": nbytes,
+             "error": error, "hit": hit}
+    run = _run.get()
+    if run is not None:
+        with run["lock"]:
+            run["events"].append(event)
+    with _lock:
+        total = _totals.setdefault((name, kind), {
+            "count": 0, "seconds": 0.0, "bytes": 0, "errors": 0, "hits": 0, "misses": 0,
+            "buckets": [0] * len(DURATION_BUCKETS),
+        })
+        total["count"] += 1
+        total["seconds"] += seconds
+        total["bytes"] += nbytes
+        total["errors"] += int(error)
+        if hit is not None:
+            total["hits" if hit else "misses"] += 1
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                total["buckets"][i] += 1
+    return event
+
+
+@contextmanager
+def timed(name, kind="compute"):
+    """Time the ``with`` block; set ``event["bytes"]`` inside it to count I/O."""
+    event = {"bytes": 0}
+    start = time.perf_counter()
+    error = False
+    try:
+        yield event
+    except Exception:
+        error = True
+        raise
+    finally:
+        record(name, kind, time.perf_counter() - start, event["bytes"], error)
+
+
+def track(name, kind="compute"):
+    """Decorator form of ``timed`` that counts the size of the return value."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name, kind) as event:
+                result = func(*args, **kwargs)
+                event["bytes"] = size_of(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def cached(name, cache_decorator, key=None):
+    """Apply a Streamlit cache decorator and record each call as a hit or miss.
+
+    Use in place of the cache decorator, e.g.
+    ``@cached("screener.info", st.cache_data(ttl=3600))``. A call is a miss
+    when the wrapped body actually runs. ``key`` is an optional zero-argument
+    callable whose value is added to the cache key on every call (see
+    ``analytics.market_calendar.cache_epoch``), so entries expire when it
+    changes.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def body(*args, cache_key=None, **kwargs):
+            _cache_state.missed = True
+            return func(*args, **kwargs)
+
+        cached_func = cache_decorator(body)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _cache_state.missed = False
+            start = time.perf_counter()
+            error = False
+            result = None
+            if key is not None:
+                kwargs["cache_key"] = key()
+            try:
+                result = cached_func(*args, **kwargs)
+                return result
+            except Exception:
+                error = True
+                raise
+            finally:
+                record(name, "cache", time.perf_counter() - start, size_of(result),
+                       error, hit=not _cache_state.missed)
+
+        wrapper.clear = cached_func.clear
+        return wrapper
+    return decorator
+
+
+def bind(func):
+    """Run ``func`` in worker threads with the caller's rerun still attached."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def begin_run(page):
+    """Start collecting the events of one page rerun."""
+    port = os.environ.get("PREDICTION_METRICS_PORT")
+    if port:
+        start_exporter(int(port))
+    run = {"page": page, "start": time.perf_counter(), "events": [], "lock": threading.Lock()}
+    _run.set(run)
+    return run
+
+
+def run_events():
+    """Events of the current rerun as a DataFrame."""
+    run = _run.get()
+    columns = ["name", "kind", "seconds", "bytes", "error", "hit"]
+    if run is None:
+        return pd.DataFrame(columns=columns)
+    with run["lock"]:
+        return pd.DataFrame(list(run["events"]), columns=columns)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """Process totals in the Prometheus text exposition format."""
+    with _lock:
+        totals = {key: dict(value, buckets=list(value["buckets"])) for key, value in _totals.items()}
+    lines = [
+        "# HELP prediction_duration_seconds Time spent per fetch, cache lookup or compute step.",
+        "# TYPE prediction_duration_seconds histogram",
+    ]
+    for (name, kind), total in sorted(totals.items()):
+        labels = f'name="{_label(name)}",kind="{_label(kind)}"'
+        for bound, count in zip(DURATION_BUCKETS, total["buckets"]):
+            lines.append(f'prediction_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'prediction_duration_seconds_bucket{{{labels},le="+Inf"}} {total["count"]}')
+        lines.append(f"prediction_duration_seconds_sum{{{labels}}} {total['seconds']:.6f}")
+        lines.append(f"prediction_duration_seconds_count{{{labels}}} {total['count']}")
+    for metric, key, help_text in (
+        ("prediction_bytes_total", "bytes", "Bytes fetched or produced."),
+        ("prediction_errors_total", "errors", "Calls that raised an exception."),
+        ("prediction_cache_hits_total", "hits", "Streamlit cache hits."),
+        ("prediction_cache_misses_total", "misses", "Streamlit cache misses."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for (name, kind), total in sorted(totals.items()):
+            if key in ("hits", "misses") and kind != "cache":
+                continue
+            lines.append(f'{metric}{{name="{_label(name)}",kind="{_label(kind)}"}} {total[key]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_exporter(port):
+    """Serve ``/metrics`` on ``port`` from a daemon thread (once per process)."""
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("", port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+def _debug_enabled(st):
+    if os.environ.get("PREDICTION_DEBUG") == "1":
+        return True
+    try:
+        return st.query_params.get("debug") == "1"
+    except Exception:
+        return False
+
+
+def render_debug_panel():
+    """Record the page total and, in debug mode, show this rerun's timings in the sidebar."""
+    import streamlit as st
+
+    run = _run.get()
+    if run is None:
+        return
+    record(run["page"], "page", time.perf_counter() - run["start"])
+    if not _debug_enabled(st):
+        return
+
+    events = run_events()
+    with st.sidebar.expander("🐞 Debug: เวลาและข้อมูลที่ใช้", expanded=True):
+        page_seconds = events["seconds"].iloc[-1]
+        st.metric("เวลาทั้งหน้า", f"{page_seconds * 1000:,.0f} ms")
+        steps = events[events["kind"] != "page"]
+        if not steps.empty:
+            by_kind = steps.groupby("kind").agg(
+                calls=("name", "size"), ms=("seconds", "sum"), kb=("bytes", "sum")
+            )
+            by_kind["ms"] *= 1000
+            by_kind["kb"] /= 1024
+            st.dataframe(by_kind.round(1), use_container_width=True)
+            detail = steps.assign(ms=steps["seconds"] * 1000, kb=steps["bytes"] / 1024)
+            st.dataframe(detail[["name", "kind", "ms", "kb", "hit", "error"]].round(1),
+                         hide_index=True, use_container_width=True)
+        st.download_button("📥 Metrics (Prometheus)", data=prometheus_text,
+                           file_name="metrics.txt", mime="text/plain")
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+
+def calculate_portfolio(data, weights):
+    """Buy-and-hold portfolio value from a dates x tickers price matrix."""
+    normalized = data / data.iloc[0]
+    weighted = normalized.mul(weights, axis=1)
+    portfolio = weighted.sum(axis=1)
+    return portfolio
+
+
+def calculate_performance(portfolio, risk_free_rate=0.02):
+    """Historical return, volatility and Sharpe ratio of a portfolio value series."""
+    daily_return = portfolio.pct_change().dropna()
+    total_return = portfolio.iloc[-1] / portfolio.iloc[0] - 1
+    annual_return = (1 + total_return) ** (252 / len(portfolio)) - 1
+    annual_volatility = daily_return.std() * np.sqrt(252)
+    sharpe_ratio = (annual_return - risk_free_rate) / annual_volatility
+    return {
+        "Total Return (%)": total_return * 100,
+        "Annualized Return (%)": annual_return * 100,
+        "Annualized Volatility (%)": annual_volatility * 100,
+        "Sharpe Ratio": sharpe_ratio
+    }
+
+
+def relativereturn(df):
+    """Cumulative return of every column since the first row."""
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    # Convert to DataFrame if Series
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+
+    # Calculate percentage change
+    rel = df.pct_change()
+
+    # Calculate cumulative returns
+    cumret = (1 + rel).cumprod() - 1
+
+    # Fill NaN values with 0
+    cumret = cumret.fillna(0)
+
+    return cumret
+
+
+def calculate_max_drawdown(df):
+    """Largest peak-to-trough fall of ``df['Price']`` in percent (negative)."""
+    if df.empty:
+        return None
+    peak = df['Price'].cummax()
+    drawdown = (df['Price'] - peak) / peak
+    return drawdown.min() * 100
@@ -0,0 +1,180 @@
+"""Shared, memory-mapped daily price history.
+
+Prices for the whole universe are stored once on disk as a float32 array
+of shape (fields, dates, tickers) and mapped read-only by every session
+and worker process, so the operating system shares the pages between
+them instead of each session holding its own DataFrame copies. Each build
+goes to a new version directory and ``CURRENT`` is switched atomically, so
+readers never see a half-written matrix.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics.market_calendar import cache_epoch
+from analytics.providers import get_provider
+
+PRICE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "prices"
+)
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+# จำนวนเวอร์ชันเก่าที่เก็บไว้ให้ผู้ที่ยังเปิดไฟล์อยู่อ่านต่อได้
+KEEP_VERSIONS = 2
+
+_opened = {}
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+
+def _current_path(root):
+    return os.path.join(root, "CURRENT")
+
+
+def write_matrix(data, root=PRICE_DIR, start=None):
+    """Write a ``yf.download``-style frame ((field, ticker) columns) as a new version.
+
+    ``start`` is the start date the data was requested from; it is kept so
+    that later requests from that date are covered even when the provider
+    has no prices that early (e.g. a ticker listed later). Returns the
+    version name.
+    """
+    fields = [f for f in FIELDS if f in data.columns.get_level_values(0)]
+    tickers = sorted(data.columns.get_level_values(1).unique())
+    dates = pd.DatetimeIndex(data.index).tz_localize(None).normalize()
+
+    version = f"v{time.time_ns()}"
+    path = os.path.join(root, version)
+    os.makedirs(path)
+    values = np.lib.format.open_memmap(
+        os.path.join(path, "values.npy"), mode="w+", dtype=np.float32,
+        shape=(len(fields), len(dates), len(tickers)),
+    )
+    for i, field in enumerate(fields):
+        values[i] = data[field].reindex(columns=tickers).to_numpy(dtype=np.float32)
+    values.flush()
+    del values
+    np.save(os.path.join(path, "dates.npy"), dates.to_numpy(dtype="datetime64[ns]"))
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"fields": fields, "tickers": tickers, "built": time.time(),
+                   "start": None if start is None else str(pd.Timestamp(start).date())}, f)
+
+    tmp_path = _current_path(root) + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, _current_path(root))
+    _cleanup(root, version)
+    return version
+
+
+def _cleanup(root, current):
+    versions = sorted(d for d in os.listdir(root) if d.startswith("v") and d != current)
+    for old in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+
+def open_matrix(root=PRICE_DIR):
+    """Read-only handle on the current version, mapped once per process.
+
+    Returns a dict with ``values`` (memmap, fields x dates x tickers),
+    ``dates``, ``tickers``, ``fields``, ``built`` and ``version``, or None
+    when nothing has been written yet.
+    """
+    try:
+        with open(_current_path(root)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    key = (root, version)
+    with _lock:
+        matrix = _opened.get(key)
+        if matrix is None:
+            path = os.path.join(root, version)
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = {
+                "version": version,
+                "values": np.load(os.path.join(path, "values.npy"), mmap_mode="r"),
+                "dates": pd.DatetimeIndex(np.load(os.path.join(path, "dates.npy"))),
+                "tickers": tuple(meta["tickers"]),
+                "column": {t: i for i, t in enumerate(meta["tickers"])},
+                "fields": tuple(meta["fields"]),
+                "built": meta["built"],
+                "start": pd.Timestamp(meta["start"]) if meta.get("start") else None,
+            }
+            # เวอร์ชันอื่นที่เคยเปิดไว้ปล่อยให้ถูกเก็บกวาด
+            for old in [k for k in _opened if k[0] == root]:
+                del _opened[old]
+            _opened[key] = matrix
+    return matrix
+
+
+def _first_date(matrix):
+    """Earliest date the matrix answers for: its requested start or its first row."""
+    first = matrix["dates"][0]
+    return first if matrix["start"] is None else min(matrix["start"], first)
+
+
+def covers(matrix, tickers, start=None):
+    """True when ``matrix`` holds every ticker from ``start`` and is up to date."""
+    if matrix is None:
+        return False
+    if any(t not in matrix["column"] for t in tickers):
+        return False
+    if start is not None and len(matrix["dates"]):
+        # ครอบคลุมถ้าเคยขอข้อมูลตั้งแต่วันนั้นแล้ว แม้ผู้ให้บริการจะไม่มีราคาย้อนไปถึง
+        if _first_date(matrix) > pd.Timestamp(start) + pd.Timedelta(days=7):
+            return False
+    # สร้างใน epoch ของตลาดเดียวกับตอนนี้ = ยังไม่มีข้อมูลใหม่
+    return cache_epoch(pd.Timestamp(int(matrix["built"]), unit="s", tz="UTC")) == cache_epoch()
+
+
+def ensure_matrix(tickers, start, provider=None, root=PRICE_DIR):
+    """Current matrix, rebuilt from the provider when it misses tickers, history or new data."""
+    matrix = open_matrix(root)
+    if covers(matrix, tickers, start):
+        return matrix
+    with _build_lock:
+        # อาจมี session อื่นสร้างเสร็จระหว่างรอ lock
+        matrix = open_matrix(root)
+        if covers(matrix, tickers, start):
+            return matrix
+        return _rebuild(matrix, tickers, start, provider or get_provider(), root)
+
+
+def _rebuild(matrix, tickers, start, provider, root):
+    wanted = sorted(set(tickers) | set(matrix["tickers"] if matrix else ()))
+    if matrix is not None and len(matrix["dates"]):
+        start = min(pd.Timestamp(start), _first_date(matrix))
+    data = provider.download(wanted, start=start)
+    if data.empty:
+        return matrix
+    if not isinstance(data.columns, pd.MultiIndex):
+        data.columns = pd.MultiIndex.from_product([data.columns, wanted])
+    os.makedirs(root, exist_ok=True)
+    write_matrix(data, root, start)
+    return open_matrix(root)
+
+
+def price_frame(matrix, field="Close", tickers=None, start=None, end=None):
+    """Dates x tickers DataFrame of one field.
+
+    A date range over all tickers is a zero-copy view of the mapped file;
+    selecting a subset of tickers copies only those columns.
+    """
+    dates = matrix["dates"]
+    lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start))
+    hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side="right")
+    block = matrix["values"][matrix["fields"].index(field), lo:hi]
+    if tickers is None:
+        columns = list(matrix["tickers"])
+    else:
+        columns = [t for t in tickers if t in matrix["column"]]
+        block = block[:, [matrix["column"][t] for t in columns]]
+    return pd.DataFrame(block, index=dates[lo:hi], columns=columns, copy=False)
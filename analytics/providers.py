@@ -0,0 +1,417 @@
+"""Pluggable market-data providers.
+
+Every page fetches prices, ``.info`` fundamentals and FRED series through
+``get_provider()``, which also coalesces identical in-flight calls and
+records their timings. The backend is chosen with environment variables:
+
+``PREDICTION_DATA_PROVIDER``
+    ``yahoo`` (default), ``replay`` (serve recorded fixtures, no network) or
+    ``record`` (fetch from Yahoo and save fixtures for later replay).
+``PREDICTION_REPLAY_DIR``
+    Fixture directory (default ``data/fixtures``).
+``PREDICTION_REPLAY_LATENCY`` / ``PREDICTION_REPLAY_ERROR_RATE``
+    Seconds of injected latency and fraction of failed calls in replay mode.
+"""
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import pandas as pd
+
+from analytics.metrics import record, size_of, timed
+
+DEFAULT_FIXTURE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixtures"
+)
+
+_PERIOD_UNITS = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+
+
+class ProviderError(Exception):
+    """A data provider could not serve a request."""
+
+
+def _as_list(tickers):
+    if isinstance(tickers, str):
+        return [t for t in tickers.replace(",", " ").split() if t]
+    return list(tickers)
+
+
+def _period_start(end, period):
+    """Start timestamp of a yfinance-style ``period`` such as ``5y`` or ``6mo``."""
+    if period in (None, "max"):
+        return None
+    if period == "ytd":
+        return pd.Timestamp(end.year, 1, 1)
+    for suffix, unit in _PERIOD_UNITS.items():
+        if period.endswith(suffix) and period[: -len(suffix)].isdigit():
+            return end - pd.DateOffset(**{unit: int(period[: -len(suffix)])})
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def _safe_name(key):
+    name = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+    if len(name) > 80:
+        name = name[:60] + "_" + hashlib.sha1(key.encode()).hexdigest()[:12]
+    return name
+
+
+class DataProvider:
+    """Interface shared by all market-data backends."""
+
+    name = "base"
+
+    def download(self, tickers, start=None, end=None, period=None, interval="1d"):
+        """Price history like ``yf.download``: (field, ticker) MultiIndex columns."""
+        raise NotImplementedError
+
+    def history(self, ticker, period="5y"):
+        """Single-ticker history like ``yf.Ticker(ticker).history(period)``."""
+        raise NotImplementedError
+
+    def info(self, ticker):
+        """Fundamentals dict like ``yf.Ticker(ticker).info``."""
+        raise NotImplementedError
+
+    def actions(self, ticker, start=None):
+        """Unadjusted daily prices with ``Dividends`` and ``Stock Splits`` columns.
+
+        Like ``yf.Ticker(ticker).history(start=start, auto_adjust=False, actions=True)``.
+        """
+        raise NotImplementedError
+
+    def fred(self, series, start=None):
+        """FRED series like ``pandas_datareader.get_data_fred``."""
+        raise NotImplementedError
+
+
+class YahooProvider(DataProvider):
+    """Live data from Yahoo Finance and FRED."""
+
+    name = "yahoo"
+
+    def download(self, tickers, start=None, end=None, period=None, interval="1d"):
+        import yfinance as yf
+
+        kwargs = {"interval": interval, "progress": False}
+        if period is not None:
+            kwargs["period"] = period
+        else:
+            kwargs.update(start=start, end=end)
+        return yf.download(tickers, **kwargs)
+
+    def history(self, ticker, period="5y"):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).history(period=period)
+
+    def info(self, ticker):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).info
+
+    def actions(self, ticker, start=None):
+        import yfinance as yf
+
+        kwargs = {"auto_adjust": False, "actions": True}
+        if start is None:
+            kwargs["period"] = "max"
+        else:
+            kwargs["start"] = start
+        return yf.Ticker(ticker).history(**kwargs)
+
+    def fred(self, series, start=None):
+        import pandas_datareader as pdr
+
+        return pdr.get_data_fred(series, start=start)
+
+
+class ReplayProvider(DataProvider):
+    """Serve recorded fixtures from disk, with optional latency and failures.
+
+    Layout under ``root``: ``prices/<ticker>.parquet`` (daily OHLCV),
+    ``history/<ticker>.parquet``, ``actions/<ticker>.parquet``,
+    ``info/<ticker>.json`` and ``fred/<series>.parquet``. Requests are answered by slicing the recorded
+    range, so any ``start``/``end``/``period`` inside it can be replayed.
+    """
+
+    name = "replay"
+
+    def __init__(self, root=DEFAULT_FIXTURE_DIR, latency=0.0, error_rate=0.0, seed=None):
+        self.root = root
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _path(self, kind, key, ext):
+        return os.path.join(self.root, kind, _safe_name(key) + ext)
+
+    def _simulate(self, what):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+        if failed:
+            raise ProviderError(f"Injected failure for {what}")
+
+    def _read_frame(self, kind, key):
+        path = self._path(kind, key, ".parquet")
+        if not os.path.exists(path):
+            raise ProviderError(f"No {kind} fixture for {key}")
+        return pd.read_parquet(path)
+
+    @staticmethod
+    def _slice(frame, start=None, end=None, period=None):
+        if period is not None:
+            start = _period_start(frame.index.max(), period)
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame.index < pd.Timestamp(end)]
+        return frame
+
+    def download(self, tickers, start=None, end=None, period=None, interval="1d"):
+        tickers = _as_list(tickers)
+        self._simulate(f"download {tickers}")
+        if interval != "1d":
+            raise ProviderError(f"Replay only serves daily bars, not {interval}")
+        frames = {}
+        for ticker in tickers:
+            try:
+                frames[ticker] = self._slice(self._read_frame("prices", ticker), start, end, period)
+            except ProviderError:
+                continue
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames, axis=1, names=["Ticker", "Price"])
+        data = data.swaplevel(0, 1, axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+        data.index.name = "Date"
+        return data
+
+    def history(self, ticker, period="5y"):
+        self._simulate(f"history {ticker}")
+        return self._slice(self._read_frame("history", ticker), period=period)
+
+    def info(self, ticker):
+        self._simulate(f"info {ticker}")
+        path = self._path("info", ticker, ".json")
+        if not os.path.exists(path):
+            raise ProviderError(f"No info fixture for {ticker}")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def actions(self, ticker, start=None):
+        self._simulate(f"actions {ticker}")
+        return self._slice(self._read_frame("actions", ticker), start=start)
+
+    def fred(self, series, start=None):
+        self._simulate(f"fred {series}")
+        return self._slice(self._read_frame("fred", series), start=start)
+
+
+class RecordingProvider(DataProvider):
+    """Fetch through another provider and save every answer as a replay fixture."""
+
+    name = "record"
+
+    def __init__(self, upstream, root=DEFAULT_FIXTURE_DIR):
+        self.upstream = upstream
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _save_frame(self, kind, key, frame):
+        path = os.path.join(self.root, kind, _safe_name(key) + ".parquet")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            if os.path.exists(path):
+                # รวมกับช่วงเวลาที่เคยบันทึกไว้
+                frame = pd.concat([pd.read_parquet(path), frame])
+                frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+            frame.to_parquet(path)
+
+    def download(self, tickers, start=None, end=None, period=None, interval="1d"):
+        data = self.upstream.download(tickers, start=start, end=end, period=period, interval=interval)
+        if interval == "1d" and not data.empty and isinstance(data.columns, pd.MultiIndex):
+            for ticker in data.columns.get_level_values(1).unique():
+                frame = data.xs(ticker, axis=1, level=1).dropna(how="all")
+                self._save_frame("prices", ticker, frame)
+        return data
+
+    def history(self, ticker, period="5y"):
+        data = self.upstream.history(ticker, period=period)
+        if not data.empty:
+            self._save_frame("history", ticker, data)
+        return data
+
+    def info(self, ticker):
+        info = self.upstream.info(ticker)
+        path = os.path.join(self.root, "info", _safe_name(ticker) + ".json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False, default=str)
+        return info
+
+    def actions(self, ticker, start=None):
+        data = self.upstream.actions(ticker, start=start)
+        if not data.empty:
+            self._save_frame("actions", ticker, data)
+        return data
+
+    def fred(self, series, start=None):
+        data = self.upstream.fred(series, start=start)
+        if not data.empty:
+            self._save_frame("fred", series, data)
+        return data
+
+
+class InstrumentedProvider(DataProvider):
+    """Time every call of another provider and count the bytes it returns."""
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.name = upstream.name
+
+    def _call(self, method, *args, **kwargs):
+        with timed(f"{self.name}.{method}", "fetch") as event:
+            result = getattr(self.upstream, method)(*args, **kwargs)
+            event["bytes"] = size_of(result)
+        return result
+
+    def download(self, tickers, start=None, end=None, period=None, interval="1d"):
+        return self._call("download", tickers, start=start, end=end, period=period, interval=interval)
+
+    def history(self, ticker, period="5y"):
+        return self._call("history", ticker, period=period)
+
+    def info(self, ticker):
+        return self._call("info", ticker)
+
+    def actions(self, ticker, start=None):
+        return self._call("actions", ticker, start=start)
+
+    def fred(self, series, start=None):
+        return self._call("fred", series, start=start)
+
+
+def _day_key(value):
+    """Calendar day of a start/end argument; daily data does not depend on the time."""
+    return None if value is None else pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _share(result):
+    """Copy of a shared result so one caller's in-place edits do not leak to others.
+
+    The leader gets a copy too: followers copy the original after the
+    event is set, while the leader's caller may already be editing its
+    result.
+    """
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, dict):
+        return copy.deepcopy(result)
+    return result
+
+
+class CoalescingProvider(DataProvider):
+    """Single-flight layer: identical concurrent calls share one upstream fetch.
+
+    The first caller for a key (method plus normalized arguments) fetches;
+    callers arriving while it is in flight wait for that result instead of
+    sending their own request. Nothing is kept after the fetch finishes, so
+    this only removes duplicate traffic, it is not a cache.
+    """
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.name = upstream.name
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _call(self, key, method, *args, **kwargs):
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = {"done": threading.Event(), "result": None, "error": None}
+                self._inflight[key] = flight
+
+        if not leader:
+            start = time.perf_counter()
+            flight["done"].wait()
+            record(f"{self.name}.{method}", "coalesced", time.perf_counter() - start)
+            if flight["error"] is not None:
+                raise flight["error"]
+            return _share(flight["result"])
+
+        try:
+            flight["result"] = getattr(self.upstream, method)(*args, **kwargs)
+            # ผู้เรียกทุกรายได้สำเนาของตัวเอง ต้นฉบับใน flight ไม่ถูกแก้ไขระหว่างที่ผู้รอคัดลอก
+            return _share(flight["result"])
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight["done"].set()
+
+    def download(self, tickers, start=None, end=None, period=None, interval="1d"):
+        bounds = (_day_key(start), _day_key(end)) if interval == "1d" else (str(start), str(end))
+        key = ("download", tuple(_as_list(tickers))) + bounds + (period, interval)
+        return self._call(key, "download", tickers, start=start, end=end, period=period, interval=interval)
+
+    def history(self, ticker, period="5y"):
+        return self._call(("history", ticker, period), "history", ticker, period=period)
+
+    def info(self, ticker):
+        return self._call(("info", ticker), "info", ticker)
+
+    def actions(self, ticker, start=None):
+        return self._call(("actions", ticker, _day_key(start)), "actions", ticker, start=start)
+
+    def fred(self, series, start=None):
+        return self._call(("fred", series, _day_key(start)), "fred", series, start=start)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def create_provider(kind=None):
+    """Build the provider selected by ``kind`` or the environment."""
+    kind = (kind or os.environ.get("PREDICTION_DATA_PROVIDER", "yahoo")).lower()
+    root = os.environ.get("PREDICTION_REPLAY_DIR", DEFAULT_FIXTURE_DIR)
+    if kind == "yahoo":
+        return YahooProvider()
+    if kind == "replay":
+        return ReplayProvider(
+            root,
+            latency=float(os.environ.get("PREDICTION_REPLAY_LATENCY", 0)),
+            error_rate=float(os.environ.get("PREDICTION_REPLAY_ERROR_RATE", 0)),
+        )
+    if kind == "record":
+        return RecordingProvider(YahooProvider(), root)
+    raise ValueError(f"Unknown data provider: {kind}")
+
+
+def get_provider():
+    """Process-wide provider instance, coalesced and instrumented."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = CoalescingProvider(InstrumentedProvider(create_provider()))
+    return _provider
+
+
+def set_provider(provider):
+    """Replace the process-wide provider (benchmarks, load tests)."""
+    global _provider
+    _provider = provider
+    return provider
+
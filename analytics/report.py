@@ -0,0 +1,213 @@
+"""Headless reports over the symbol universe, for cron jobs.
+
+Run ``python -m analytics.report <report> [options]`` (see ``--help``).
+Each report runs the same engines as the pages, one ticker per job across
+a process pool, and writes one row per ticker to CSV or Parquet (chosen by
+the ``--out`` extension). A ticker that fails gets its message in the
+``Error`` column instead of stopping the run.
+"""
+import argparse
+import functools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analytics.corporate_actions import total_return_frame
+from analytics.dca import simulate_dca
+from analytics.performance import calculate_max_drawdown, calculate_performance, calculate_portfolio
+from analytics.providers import get_provider
+from analytics.screener import FILTER_RULES, apply_filters, build_fundamentals_table, empty_record, fundamentals_record
+from analytics.universe import index_members
+from analytics.valuation import (
+    DEFAULT_MARGIN,
+    DEFAULT_MULTIPLIER,
+    DEFAULT_NG_PE,
+    fetch_inputs,
+    get_aaa_yield,
+    graham_value,
+    recommendation,
+)
+
+
+def graham_row(ticker, current_yield=None, ng_pe=DEFAULT_NG_PE, multiplier=DEFAULT_MULTIPLIER,
+               margin=DEFAULT_MARGIN):
+    """Graham valuation of one ticker."""
+    inputs = fetch_inputs(ticker, current_yield=current_yield)
+    row = {"Ticker": ticker, **inputs}
+    if inputs["eps"] is None:
+        row["Error"] = "no EPS"
+        return row
+    value = graham_value(inputs["eps"], inputs["growth_rate"], inputs["current_yield"],
+                         ng_pe, multiplier, margin)
+    row.update(value)
+    row["recommendation"] = recommendation(inputs["current_price"], **value)
+    return row
+
+
+def drawdown_row(ticker, years=5):
+    """Max drawdown of the price and of the total-return index over ``years``."""
+    start = pd.Timestamp.now().normalize() - pd.DateOffset(years=years)
+    frame = total_return_frame(ticker, start=start)
+    if frame.empty:
+        raise ValueError("no price data")
+    return {
+        "Ticker": ticker,
+        "Start": frame.index[0],
+        "End": frame.index[-1],
+        "Max Drawdown (%)": calculate_max_drawdown(frame["Close"].to_frame("Price")),
+        "Max Drawdown Total Return (%)": calculate_max_drawdown(frame["Total Return"].to_frame("Price")),
+    }
+
+
+def dca_row(ticker, monthly_amount=1000.0, months=60, start=None, reinvest=True):
+    """Final state of a monthly DCA plan in ``ticker``."""
+    if start is None:
+        start = pd.Timestamp.now().normalize() - pd.DateOffset(months=months)
+    end = pd.Timestamp(start) + pd.DateOffset(months=months)
+    frame = total_return_frame(ticker, start=start, end=end)
+    if frame.empty:
+        raise ValueError("no price data")
+    # งวดที่เลยวันสุดท้ายของข้อมูลไม่ถูกนับ
+    months = min(months, len(pd.date_range(start, frame.index[-1], freq="MS")))
+    last = simulate_dca(frame, monthly_amount, months, start, reinvest).iloc[-1]
+    return {
+        "Ticker": ticker,
+        "Months": months,
+        "Total Invested": last["Total Invested"],
+        "Dividends": last["Dividends"],
+        "Portfolio Value": last["Portfolio Value"],
+        "Return (%)": (last["Portfolio Value"] / last["Total Invested"] - 1) * 100,
+    }
+
+
+def fundamentals_row(ticker):
+    """Screener record of one ticker (empty metrics when ``.info`` fails)."""
+    try:
+        return fundamentals_record(ticker, get_provider().info(ticker))
+    except Exception:
+        return empty_record(ticker)
+
+
+def portfolio_report(tickers, weights, start, end=None):
+    """Historical performance of a buy-and-hold portfolio, as one row."""
+    data = get_provider().download(list(tickers), start=start, end=end)["Close"].dropna()
+    if data.empty:
+        raise ValueError("no price data")
+    if isinstance(data, pd.Series):
+        data = data.to_frame(tickers[0])
+    performance = calculate_performance(calculate_portfolio(data[list(tickers)], weights))
+    return pd.DataFrame([{"Tickers": ",".join(tickers), "Weights": ",".join(map(str, weights)),
+                          "Start": data.index[0], "End": data.index[-1], **performance}])
+
+
+def _safe(func, ticker, **kwargs):
+    try:
+        return func(ticker, **kwargs)
+    except Exception as e:
+        return {"Ticker": ticker, "Error": str(e)}
+
+
+def run_jobs(func, tickers, workers=None, **kwargs):
+    """Run ``func(ticker, **kwargs)`` for every ticker and return one row per ticker, in order."""
+    job = functools.partial(_safe, func, **kwargs)
+    if workers is None:
+        workers = min(len(tickers), os.cpu_count() or 1)
+    if workers <= 1:
+        rows = [job(ticker) for ticker in tickers]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(job, tickers))
+    return pd.DataFrame(rows)
+
+
+def write_output(df, path):
+    """Write ``df`` as Parquet when ``path`` ends in ``.parquet``, otherwise as CSV."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+    return path
+
+
+def _list(text):
+    return [x.strip() for x in text.split(",") if x.strip()]
+
+
+def _floats(text):
+    return [float(x) for x in _list(text)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--tickers", type=_list, help="comma separated tickers (default: the index members)")
+    common.add_argument("--index", default="SET50", help="index whose members are reported (default SET50)")
+    common.add_argument("--workers", type=int, help="processes (default: one per CPU)")
+    common.add_argument("--out", help="output .csv or .parquet (default <report>-<date>.csv)")
+    reports = parser.add_subparsers(dest="report", required=True)
+
+    graham = reports.add_parser("graham", parents=[common], help="Graham intrinsic value")
+    graham.add_argument("--ng-pe", type=float, default=DEFAULT_NG_PE)
+    graham.add_argument("--multiplier", type=float, default=DEFAULT_MULTIPLIER)
+    graham.add_argument("--margin", type=float, default=DEFAULT_MARGIN, help="margin of safety in percent")
+
+    drawdown = reports.add_parser("drawdown", parents=[common], help="max drawdown, price and total return")
+    drawdown.add_argument("--years", type=int, default=5)
+
+    dca = reports.add_parser("dca", parents=[common], help="monthly DCA result")
+    dca.add_argument("--monthly", type=float, default=1000.0)
+    dca.add_argument("--months", type=int, default=60)
+    dca.add_argument("--start", help="first purchase date (default: --months ago)")
+    dca.add_argument("--no-reinvest", action="store_true", help="keep dividends as cash")
+
+    screen = reports.add_parser("screen", parents=[common], help="fundamentals table, optionally filtered")
+    for _, value_key, column, direction, _ in FILTER_RULES:
+        screen.add_argument(f"--{value_key.replace('_', '-')}", type=float,
+                            help=f"{direction} {column}")
+
+    portfolio = reports.add_parser("portfolio", parents=[common], help="buy-and-hold portfolio statistics")
+    portfolio.add_argument("--weights", type=_floats, required=True, help="percent per ticker, e.g. 40,30,30")
+    portfolio.add_argument("--start", default=str(pd.Timestamp.now().year - 5) + "-01-01")
+    args = parser.parse_args(argv)
+
+    tickers = args.tickers or index_members(args.index)
+    if not tickers:
+        parser.error(f"no tickers for index {args.index}")
+    out = args.out or f"{args.report}-{pd.Timestamp.now():%Y-%m-%d}.csv"
+
+    if args.report == "graham":
+        result = run_jobs(graham_row, tickers, args.workers, current_yield=get_aaa_yield(),
+                          ng_pe=args.ng_pe, multiplier=args.multiplier, margin=args.margin)
+    elif args.report == "drawdown":
+        result = run_jobs(drawdown_row, tickers, args.workers, years=args.years)
+    elif args.report == "dca":
+        result = run_jobs(dca_row, tickers, args.workers, monthly_amount=args.monthly,
+                          months=args.months, start=args.start, reinvest=not args.no_reinvest)
+    elif args.report == "screen":
+        table = build_fundamentals_table(run_jobs(fundamentals_row, tickers, args.workers).to_dict("records"))
+        filters = {}
+        for active_key, value_key, *_ in FILTER_RULES:
+            value = getattr(args, value_key)
+            filters[active_key] = value is not None
+            filters[value_key] = value
+        result = apply_filters(table, filters)
+    else:
+        if len(args.weights) != len(tickers):
+            parser.error("--weights needs one value per ticker")
+        weights = np.asarray(args.weights) / 100
+        result = portfolio_report(tickers, weights, args.start)
+
+    write_output(result, out)
+    errors = result["Error"].notna().sum() if "Error" in result else 0
+    print(f"{args.report}: {len(result)} rows -> {out}" + (f" ({errors} errors)" if errors else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
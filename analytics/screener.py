@@ -0,0 +1,274 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from analytics.universe import sector_of
+
+# คอลัมน์ตัวเลขของตารางปัจจัยพื้นฐาน (เก็บเป็น float32)
+METRIC_COLUMNS = [
+    "PE Ratio",
+    "PB Ratio",
+    "Debt to Equity",
+    "ROE",
+    "ROA",
+    "Current Price",
+    "Market Cap",
+]
+
+COLUMNS = ["Ticker", "Company Name"] + METRIC_COLUMNS + ["Sector"]
+
+# คอลัมน์ที่สร้างดัชนีเรียงลำดับไว้ล่วงหน้า
+INDEX_COLUMNS = ["PE Ratio", "PB Ratio", "Debt to Equity", "ROE", "ROA", "Market Cap"]
+
+# (สวิตช์เปิดใช้, ค่าเกณฑ์, คอลัมน์, ทิศทาง, ตัวหารของค่าเกณฑ์)
+FILTER_RULES = [
+    ("pe_active", "pe_ratio", "PE Ratio", "max", 1),
+    ("pb_active", "pb_ratio", "PB Ratio", "max", 1),
+    ("de_active", "de_ratio", "Debt to Equity", "max", 1),
+    ("roe_active", "roe", "ROE", "min", 100),
+    ("roa_active", "roa", "ROA", "min", 100),
+]
+
+# เกณฑ์ทางเทคนิค (คอลัมน์มาจาก analytics.indicators.latest_values)
+TECHNICAL_RULES = [
+    ("rsi_active", "rsi_max", "RSI14", "max", 1),
+    ("sma_active", "sma_gap", "% จาก SMA50", "min", 1),
+]
+
+
+def _safe_float(value):
+    if value is None or pd.isna(value):
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def fundamentals_record(ticker, info):
+    """Screener record for one ticker from its ``.info`` dict.
+
+    The sector comes from the symbol registry (the SET classification) and
+    falls back to Yahoo's ``sector`` for tickers not in the symbol file.
+    """
+    return {
+        "Ticker": ticker,
+        "Company Name": info.get('longName', ticker),
+        "PE Ratio": _safe_float(info.get('trailingPE')),
+        "PB Ratio": _safe_float(info.get('priceToBook')),
+        "Debt to Equity": _safe_float(info.get('debtToEquity')),
+        "ROE": _safe_float(info.get('returnOnEquity')),
+        "ROA": _safe_float(info.get('returnOnAssets')),
+        "Current Price": _safe_float(info.get('currentPrice')),
+        "Market Cap": _safe_float(info.get('marketCap')),
+        "Sector": sector_of(ticker, info.get('sector', 'N/A')),
+    }
+
+
+def empty_record(ticker):
+    """Screener record for a ticker whose fundamentals could not be fetched."""
+    record = {column: None for column in METRIC_COLUMNS}
+    record.update({"Ticker": ticker, "Company Name": "N/A", "Sector": sector_of(ticker)})
+    return {column: record[column] for column in COLUMNS}
+
+
+def build_fundamentals_table(records):
+    """Build the typed columnar screener table from per-ticker dicts.
+
+    Metric columns are float32 arrays (missing values become NaN) and
+    ``Sector`` is categorical, so thousands of tickers fit in a few hundred KB.
+    """
+    n = len(records)
+    columns = {
+        "Ticker": pd.array([r["Ticker"] for r in records], dtype="string"),
+        "Company Name": pd.array([r["Company Name"] for r in records], dtype="string"),
+    }
+    for column in METRIC_COLUMNS:
+        columns[column] = np.fromiter(
+            (np.nan if r[column] is None else r[column] for r in records),
+            dtype=np.float32,
+            count=n,
+        )
+    columns["Sector"] = pd.Categorical([r["Sector"] for r in records])
+    return pd.DataFrame(columns, columns=COLUMNS)
+
+
+def criteria_mask(columns, filters, shape, rules=FILTER_RULES):
+    """AND every active criterion into one boolean mask of ``shape``.
+
+    ``columns`` maps a metric name to an array (or Series) of that shape,
+    so the same rules evaluate a screener table or a dates x tickers panel.
+    Missing values never pass an active criterion because comparisons
+    against NaN are False.
+    """
+    mask = np.ones(shape, dtype=bool)
+    scratch = np.empty(shape, dtype=bool)
+    for active_key, value_key, column, direction, scale in rules:
+        if not filters.get(active_key) or filters.get(value_key) is None:
+            continue
+        values = np.asarray(columns[column])
+        threshold = values.dtype.type(filters[value_key] / scale)
+        if direction == "max":
+            np.less_equal(values, threshold, out=scratch)
+        else:
+            np.greater_equal(values, threshold, out=scratch)
+        mask &= scratch
+    return mask
+
+
+def filter_mask(df, filters):
+    """Evaluate every active criterion on ``df`` into a single boolean mask."""
+    return criteria_mask(df, filters, len(df))
+
+
+def build_screen_index(df, columns=INDEX_COLUMNS):
+    """Precompute per-metric sorted indexes and in-sector percentile ranks.
+
+    Built once per data refresh. ``sorted`` maps each metric to
+    ``(values, positions)``: its non-missing values in ascending order and
+    the row positions they came from. ``sector_rank`` holds the percentile
+    rank (0-1) of every row within its sector for each metric.
+    """
+    index = {"n_rows": len(df), "sorted": {}, "sector_rank": {}}
+    by_sector = df.groupby("Sector", observed=True)
+    for column in columns:
+        values = df[column].to_numpy()
+        positions = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[positions], kind="stable")
+        index["sorted"][column] = (values[positions][order], positions[order])
+        index["sector_rank"][column] = (
+            by_sector[column].rank(pct=True).to_numpy(dtype=np.float32)
+        )
+    return index
+
+
+def range_positions(index, column, low=None, high=None):
+    """Row positions whose ``column`` lies within ``[low, high]`` (binary search)."""
+    values, positions = index["sorted"][column]
+    start = 0 if low is None else np.searchsorted(values, values.dtype.type(low), side="left")
+    stop = len(values) if high is None else np.searchsorted(values, values.dtype.type(high), side="right")
+    return positions[start:stop]
+
+
+def query_positions(index, filters):
+    """Row positions passing every active filter, in ascending row order."""
+    matches = []
+    for active_key, value_key, column, direction, scale in FILTER_RULES:
+        if not filters.get(active_key) or filters.get(value_key) is None:
+            continue
+        threshold = filters[value_key] / scale
+        if direction == "max":
+            matches.append(range_positions(index, column, high=threshold))
+        else:
+            matches.append(range_positions(index, column, low=threshold))
+
+    if not matches:
+        return np.arange(index["n_rows"])
+    matches.sort(key=len)
+    result = np.sort(matches[0])
+    for positions in matches[1:]:
+        result = np.intersect1d(result, positions, assume_unique=True)
+    return result
+
+
+def top_n_positions(index, column, n, largest=True, within=None):
+    """Positions of the ``n`` best rows by ``column``, optionally restricted to ``within``."""
+    _, positions = index["sorted"][column]
+    if largest:
+        positions = positions[::-1]
+    if within is not None:
+        member = np.zeros(index["n_rows"], dtype=bool)
+        member[within] = True
+        positions = positions[member[positions]]
+    return positions[:n]
+
+
+def apply_filters(df, filters, index=None):
+    """Apply filters to dataframe with proper validation"""
+    if index is not None:
+        return df.iloc[query_positions(index, filters)]
+    return df[filter_mask(df, filters)]
+
+
+def sort_and_page(df, sort_by, ascending=True, page=1, page_size=50):
+    """Sort ``df`` by one column and return only the rows of one page.
+
+    Missing values always sort last. Only the requested page is sliced out
+    of the table, so the rendered payload stays small for large universes.
+    """
+    order = np.arange(len(df))
+    if sort_by in df.columns:
+        keys = df[sort_by].reset_index(drop=True)
+        order = keys.sort_values(
+            ascending=ascending, kind="stable", na_position="last"
+        ).index.to_numpy()
+    start = (max(page, 1) - 1) * page_size
+    return df.iloc[order[start:start + page_size]]
+
+
+# รูปแบบการแสดงผล: คอลัมน์ -> (รูปแบบ printf, ตัวคูณ)
+DISPLAY_FORMATS = {
+    "PE Ratio": ("%.2f", 1),
+    "PB Ratio": ("%.2f", 1),
+    "Debt to Equity": ("%.2f", 1),
+    "ROE": ("%.2f%%", 100),
+    "ROA": ("%.2f%%", 100),
+    "Current Price": ("%.2f", 1),
+}
+
+PERCENTILE_SUFFIX = " (%ile ในกลุ่ม)"
+
+
+def format_column(values, fmt, scale=1):
+    """Format a numeric array to strings in one vectorized pass, NaN as ``N/A``."""
+    values = np.asarray(values, dtype=np.float64) * scale
+    out = np.full(len(values), "N/A", dtype=object)
+    ok = np.isfinite(values)
+    out[ok] = np.char.mod(fmt, values[ok])
+    return out
+
+
+def build_display_table(df):
+    """Pre-format every display column of the screener table.
+
+    Built once per data refresh; rendering a page is then a row lookup
+    with no Styler and no per-row Python formatting.
+    """
+    display = pd.DataFrame({"Ticker": df["Ticker"], "Company Name": df["Company Name"]})
+    for column, (fmt, scale) in DISPLAY_FORMATS.items():
+        display[column] = format_column(df[column], fmt, scale)
+    display["Sector"] = df["Sector"]
+    market_cap = df["Market Cap"].to_numpy(dtype=np.float64)
+    display["Market Cap (B)"] = format_column(
+        np.where(market_cap > 0, market_cap, np.nan), "%.2f", 1e-9
+    )
+    return display
+
+
+def display_rows(display, page_df):
+    """Rows of the pre-formatted ``display`` table for the rows of ``page_df``.
+
+    ``page_df`` must carry the table's positional index. Extra columns that
+    only exist on the page (in-sector percentile ranks) are formatted here.
+    """
+    rows = display.iloc[page_df.index.to_numpy()]
+    for column in page_df.columns:
+        if column.endswith(PERCENTILE_SUFFIX):
+            rows = rows.assign(**{column: format_column(page_df[column], "%.0f%%", 100)})
+    return rows
+
+
+def write_csv(df, chunk_rows=10_000):
+    """CSV bytes of ``df`` (UTF-8 with BOM so Excel reads Thai text).
+
+    Rows are serialized in chunks so no single large string is built;
+    ``st.download_button`` takes the returned bytes as is.
+    """
+    buffer = io.BytesIO()
+    wrapper = io.TextIOWrapper(buffer, encoding="utf-8-sig", newline="")
+    for start in range(0, max(len(df), 1), chunk_rows):
+        df.iloc[start:start + chunk_rows].to_csv(wrapper, index=False, header=start == 0)
+    wrapper.flush()
+    wrapper.detach()
+    return buffer.getvalue()
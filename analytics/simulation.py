@@ -0,0 +1,121 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+# จำนวนเส้นทางขั้นต่ำที่คุ้มค่าจะแยกไปรันหลาย process
+PARALLEL_MIN_PATHS = 50_000
+
+# จำนวนจุดเวลาที่เก็บไว้ต่อเส้นทาง (พอสำหรับวาด fan chart)
+MAX_CHECKPOINTS = 64
+
+
+def _checkpoints(horizon):
+    """Evenly spaced step indices (0-based, always including the last step)."""
+    n = min(horizon, MAX_CHECKPOINTS)
+    return np.unique(np.linspace(0, horizon - 1, n).round().astype(np.int64))
+
+
+def _simulate_chunk(log_returns, n_paths, horizon, checkpoints, method, seed):
+    """Simulate one chunk of paths and keep only the checkpoint columns."""
+    rng = np.random.default_rng(seed)
+    if method == "bootstrap":
+        idx = rng.integers(0, len(log_returns), size=(n_paths, horizon))
+        steps = log_returns[idx]
+    else:
+        mu = log_returns.mean()
+        sigma = log_returns.std(ddof=1)
+        steps = rng.normal(mu, sigma, size=(n_paths, horizon))
+    np.cumsum(steps, axis=1, out=steps)
+    return np.exp(steps[:, checkpoints]).astype(np.float32)
+
+
+def _simulate_block(args):
+    """Worker entry point: simulate `n_paths` paths in memory-bounded chunks."""
+    log_returns, n_paths, horizon, checkpoints, method, chunk_size, seed = args
+    out = np.empty((n_paths, len(checkpoints)), dtype=np.float32)
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_paths // chunk_size))
+    for i, start in enumerate(range(0, n_paths, chunk_size)):
+        stop = min(start + chunk_size, n_paths)
+        out[start:stop] = _simulate_chunk(
+            log_returns, stop - start, horizon, checkpoints, method, seeds[i]
+        )
+    return out
+
+
+def simulate_paths(portfolio, horizon, n_paths=10_000, method="bootstrap",
+                   chunk_size=2_000, seed=None, workers=None):
+    """Simulate future growth paths of a portfolio value series.
+
+    Returns ``(steps, values)`` where ``steps`` are the simulated trading-day
+    offsets that were kept and ``values`` is an ``(n_paths, len(steps))``
+    float32 matrix of growth factors relative to today's value.
+    """
+    if method not in ("bootstrap", "gbm"):
+        raise ValueError(f"Unknown simulation method: {method}")
+    log_returns = np.log(np.asarray(portfolio, dtype=np.float64))
+    log_returns = np.diff(log_returns)
+    log_returns = log_returns[np.isfinite(log_returns)]
+    if len(log_returns) < 2:
+        raise ValueError("Not enough history to simulate")
+
+    horizon = int(horizon)
+    checkpoints = _checkpoints(horizon)
+
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1) if n_paths >= PARALLEL_MIN_PATHS else 1
+
+    if workers <= 1:
+        values = _simulate_block(
+            (log_returns, n_paths, horizon, checkpoints, method, chunk_size, seed)
+        )
+    else:
+        sizes = [n_paths // workers + (i < n_paths % workers) for i in range(workers)]
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        jobs = [
+            (log_returns, size, horizon, checkpoints, method, chunk_size, s)
+            for size, s in zip(sizes, seeds)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            values = np.concatenate(list(executor.map(_simulate_block, jobs)))
+
+    return checkpoints + 1, values
+
+
+def project_portfolio(portfolio, horizon_days, n_paths=10_000, method="bootstrap",
+                      percentiles=(5, 25, 50, 75, 95), seed=None, workers=None):
+    """Monte-Carlo projection of a portfolio value series.
+
+    Returns ``(fan, summary)``: ``fan`` is a DataFrame of projected portfolio
+    values per percentile indexed by future business date, and ``summary`` is
+    a dict of headline statistics in the same style as
+    ``calculate_performance``.
+    """
+    steps, values = simulate_paths(
+        portfolio, horizon_days, n_paths=n_paths, method=method,
+        seed=seed, workers=workers,
+    )
+    last_value = float(portfolio.iloc[-1])
+    bands = np.percentile(values, percentiles, axis=0) * last_value
+
+    dates = pd.bdate_range(portfolio.index[-1], periods=horizon_days + 1)[1:]
+    fan = pd.DataFrame(
+        bands.T,
+        index=dates[steps - 1],
+        columns=[f"P{p}" for p in percentiles],
+    )
+    fan.loc[portfolio.index[-1]] = last_value
+    fan = fan.sort_index()
+
+    final = values[:, -1].astype(np.float64)
+    summary = {
+        "Probability of Loss (%)": float((final < 1).mean() * 100),
+        "Expected Return (%)": float((final.mean() - 1) * 100),
+        "Median Return (%)": float((np.median(final) - 1) * 100),
+        "5th Percentile Return (%)": float((np.percentile(final, 5) - 1) * 100),
+        "95th Percentile Return (%)": float((np.percentile(final, 95) - 1) * 100),
+    }
+    return fan, summary
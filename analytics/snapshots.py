@@ -0,0 +1,128 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics.screener import COLUMNS, METRIC_COLUMNS
+
+# ที่เก็บ snapshot ปัจจัยพื้นฐานรายวัน (หนึ่งไฟล์ Parquet ต่อเดือน)
+SNAPSHOT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "snapshots"
+)
+
+COMPRESSION = "zstd"
+
+
+def _month_path(root, day):
+    return os.path.join(root, f"{day:%Y-%m}.parquet")
+
+
+def _month_files(root):
+    """Monthly snapshot files sorted by month."""
+    return sorted(glob.glob(os.path.join(root, "????-??.parquet")))
+
+
+def _month_of(path):
+    return pd.Timestamp(os.path.basename(path)[:7] + "-01")
+
+
+def _restore_types(df):
+    """Cast a snapshot frame back to the screener's columnar dtypes."""
+    df = df.astype({column: np.float32 for column in METRIC_COLUMNS})
+    df["Sector"] = df["Sector"].astype("category")
+    return df.reset_index(drop=True)
+
+
+def _write(df, path):
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, index=False, compression=COMPRESSION)
+    os.replace(tmp_path, path)
+
+
+def append_snapshot(table, day=None, root=SNAPSHOT_DIR):
+    """Store today's (or ``day``'s) fundamentals for every ticker in ``table``.
+
+    Rows are merged into that month's file: an existing row for the same
+    date and ticker is replaced, other tickers are kept. Tickers whose
+    metrics are all missing (failed fetches) are not recorded.
+    """
+    day = pd.Timestamp(day if day is not None else pd.Timestamp.now()).normalize()
+    snapshot = table[table[METRIC_COLUMNS].notna().any(axis=1)]
+    if snapshot.empty:
+        return 0
+    snapshot = snapshot[COLUMNS].assign(Date=day)[["Date"] + COLUMNS]
+
+    os.makedirs(root, exist_ok=True)
+    path = _month_path(root, day)
+    if os.path.exists(path):
+        existing = pd.read_parquet(path)
+        stale = (existing["Date"] == day) & existing["Ticker"].isin(snapshot["Ticker"])
+        snapshot = pd.concat(
+            [existing[~stale].astype({"Sector": object}), snapshot.astype({"Sector": object})],
+            ignore_index=True,
+        )
+    snapshot = _restore_types(snapshot.sort_values(["Date", "Ticker"], kind="stable"))
+    _write(snapshot, path)
+    return len(snapshot)
+
+
+def available_dates(root=SNAPSHOT_DIR):
+    """Sorted dates that have at least one stored snapshot."""
+    dates = [pd.read_parquet(path, columns=["Date"])["Date"] for path in _month_files(root)]
+    if not dates:
+        return pd.DatetimeIndex([])
+    return pd.DatetimeIndex(pd.concat(dates).unique()).sort_values()
+
+
+def load_snapshot(as_of, root=SNAPSHOT_DIR):
+    """Return ``(date, table)`` for the latest snapshot taken on or before ``as_of``.
+
+    Only the month file containing ``as_of`` (or earlier months if it has
+    no earlier date) is read. Returns ``(None, empty frame)`` when no
+    snapshot exists before ``as_of``.
+    """
+    as_of = pd.Timestamp(as_of).normalize()
+    for path in reversed(_month_files(root)):
+        if _month_of(path) > as_of:
+            continue
+        month = pd.read_parquet(path, filters=[("Date", "<=", as_of)])
+        if month.empty:
+            continue
+        day = month["Date"].max()
+        return day, _restore_types(month[month["Date"] == day][COLUMNS])
+    return None, pd.DataFrame(columns=COLUMNS)
+
+
+def load_history(start=None, end=None, columns=None, root=SNAPSHOT_DIR):
+    """Long ``Date``/``Ticker`` table of all snapshots between ``start`` and ``end``.
+
+    Only month files overlapping the range are opened and only the requested
+    metric ``columns`` are read.
+    """
+    start = pd.Timestamp(start).normalize() if start is not None else None
+    end = pd.Timestamp(end).normalize() if end is not None else None
+    read_columns = ["Date", "Ticker"] + list(columns or METRIC_COLUMNS + ["Sector"])
+    filters = []
+    if start is not None:
+        filters.append(("Date", ">=", start))
+    if end is not None:
+        filters.append(("Date", "<=", end))
+
+    frames = []
+    for path in _month_files(root):
+        month = _month_of(path)
+        if start is not None and month + pd.offsets.MonthEnd(0) < start:
+            continue
+        if end is not None and month > end:
+            continue
+        frames.append(pd.read_parquet(path, columns=read_columns, filters=filters or None))
+    if not frames:
+        return pd.DataFrame(columns=read_columns)
+    history = pd.concat(
+        [f.astype({"Sector": object}) if "Sector" in f else f for f in frames],
+        ignore_index=True,
+    )
+    if "Sector" in history:
+        history["Sector"] = history["Sector"].astype("category")
+    return history
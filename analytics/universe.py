@@ -0,0 +1,129 @@
+import csv
+import os
+import threading
+
+# ไฟล์รายชื่อหุ้นทั้งตลาด (SET + mai) แก้ไข/อัปเดตได้โดยไม่ต้องแก้โค้ด
+DEFAULT_SYMBOL_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "symbols.csv"
+)
+
+YAHOO_SUFFIX = ".BK"
+
+# ดัชนีอ้างอิงที่ใช้เปรียบเทียบ (ไม่ใช่หุ้นรายตัว)
+BENCHMARK_TICKERS = ("^SET.BK",)
+
+
+def to_yahoo_symbol(symbol):
+    """Map an exchange symbol such as ``PTT`` to its Yahoo ticker ``PTT.BK``."""
+    symbol = symbol.strip().upper()
+    if not symbol.endswith(YAHOO_SUFFIX):
+        symbol += YAHOO_SUFFIX
+    return symbol
+
+
+def load_symbols(path=DEFAULT_SYMBOL_FILE, markets=("SET", "mai")):
+    """Load the exchange listing from a local CSV file.
+
+    The file needs a ``symbol`` column and may have a ``market`` column
+    (``SET`` or ``mai``); rows from other markets are skipped. Returns a
+    tuple of unique Yahoo tickers in file order.
+    """
+    wanted = {m.upper() for m in markets}
+    universe = load_universe(path)
+    return tuple(t for t in universe["tickers"] if universe["meta"][t]["market"] in wanted)
+
+
+def load_universe(path=DEFAULT_SYMBOL_FILE):
+    """Read the symbol file into a registry with per-symbol metadata.
+
+    Besides ``symbol`` and ``market`` the file may carry ``sector`` and
+    ``indices`` (index memberships separated by ``|``, e.g. ``SET50|SET100``). Returns a dict with ``tickers`` (file order),
+    ``meta`` (ticker -> dict) and ``indices`` (index name -> tickers).
+    """
+    tickers = []
+    meta = {}
+    indices = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            symbol = (row.get("symbol") or "").strip()
+            if not symbol:
+                continue
+            ticker = to_yahoo_symbol(symbol)
+            if ticker in meta:
+                continue
+            memberships = tuple(
+                name.strip().upper() for name in (row.get("indices") or "").split("|") if name.strip()
+            )
+            meta[ticker] = {
+                "symbol": symbol.strip().upper(),
+                "market": (row.get("market") or "SET").strip().upper(),
+                "sector": (row.get("sector") or "").strip() or "N/A",
+                "indices": memberships,
+            }
+            tickers.append(ticker)
+            for name in memberships:
+                indices.setdefault(name, []).append(ticker)
+    return {
+        "path": path,
+        "mtime": os.path.getmtime(path),
+        "tickers": tuple(tickers),
+        "meta": meta,
+        "indices": {name: tuple(members) for name, members in indices.items()},
+    }
+
+
+_universe = None
+_universe_lock = threading.Lock()
+
+
+def get_universe():
+    """Process-wide registry, loaded on first use."""
+    global _universe
+    if _universe is None:
+        with _universe_lock:
+            if _universe is None:
+                _universe = load_universe()
+    return _universe
+
+
+def refresh_universe(path=None):
+    """Reload the registry, e.g. after an index rebalance edited the symbol file.
+
+    With no ``path`` the current file is reread only if it changed on disk.
+    """
+    global _universe
+    with _universe_lock:
+        current = _universe
+        if (path is None and current is not None
+                and os.path.getmtime(current["path"]) == current["mtime"]):
+            return current
+        _universe = load_universe(path or (current["path"] if current else DEFAULT_SYMBOL_FILE))
+    return _universe
+
+
+def index_members(name="SET50"):
+    """Tickers of an index such as ``SET50`` in file order."""
+    return get_universe()["indices"].get(name.upper(), ())
+
+
+def has_full_listing(index="SET50"):
+    """True when the symbol file lists more than the members of ``index``.
+
+    The bundled file only holds the SET50; the whole-market mode is offered
+    once the full SET + mai export has been dropped in.
+    """
+    universe = get_universe()
+    return len(universe["tickers"]) > len(universe["indices"].get(index.upper(), ()))
+
+
+def sector_of(ticker, default="N/A"):
+    """SET sector of ``ticker`` from the symbol file, or ``default`` when not listed there."""
+    info = symbol_info(ticker)
+    if info is None or info["sector"] == "N/A":
+        return default
+    return info["sector"]
+
+
+def symbol_info(ticker):
+    """Metadata of one ticker (sector, market, indices), or None."""
+    return get_universe()["meta"].get(to_yahoo_symbol(ticker))
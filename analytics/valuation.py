@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from analytics.providers import get_provider
+
+# ฟิลด์ใน .info ที่ลองตามลำดับ
+PRICE_FIELDS = [
+    "regularMarketPrice",
+    "regularMarketPreviousClose",
+    "currentPrice",
+    "ask",
+    "bid",
+    "previousClose",
+]
+EPS_FIELDS = ["trailingEps", "forwardEps", "eps"]
+GROWTH_FIELDS = ["earningsGrowth", "earningsQuarterlyGrowth", "revenueGrowth"]
+
+# ค่าเริ่มต้นเมื่อหาข้อมูลไม่ได้ (%)
+DEFAULT_GROWTH_RATE = 5.0
+DEFAULT_YIELD = 4.0
+
+# ค่าเริ่มต้นของสูตร Graham: PE ที่ไม่มีการเติบโต, ตัวคูณการเติบโต, ส่วนเผื่อราคา (%)
+DEFAULT_NG_PE = 8.5
+DEFAULT_MULTIPLIER = 2.0
+DEFAULT_MARGIN = 35.0
+
+
+def get_current_price(ticker, quote, provider=None):
+    """ฟังก์ชันสำหรับหาราคาปัจจุบันจากหลายแหล่ง"""
+    for field in PRICE_FIELDS:
+        if field in quote and quote[field] is not None:
+            try:
+                price = float(quote[field])
+                if price > 0:
+                    return price
+            except (ValueError, TypeError):
+                continue
+
+    # ถ้าไม่เจอราคาจาก info ให้ลองใช้ history
+    try:
+        hist = (provider or get_provider()).history(ticker, period="5d")
+        if not hist.empty:
+            return float(hist['Close'].iloc[-1])
+    except Exception:
+        pass
+
+    return None
+
+
+def get_eps(quote):
+    """ฟังก์ชันสำหรับหา EPS"""
+    for field in EPS_FIELDS:
+        if field in quote and quote[field] is not None:
+            try:
+                eps = float(quote[field])
+                if eps != 0:
+                    return eps
+            except (ValueError, TypeError):
+                continue
+
+    return None
+
+
+def get_growth_rate(quote):
+    """ฟังก์ชันสำหรับหาอัตราการเติบโต (%)"""
+    for field in GROWTH_FIELDS:
+        if field in quote and quote[field] is not None:
+            try:
+                growth = float(quote[field])
+                # แปลงเป็นเปอร์เซ็นต์ถ้าเป็นทศนิยม
+                if abs(growth) <= 1:
+                    growth = growth * 100
+                return growth
+            except (ValueError, TypeError):
+                continue
+
+    # ถ้าไม่เจอให้ใช้ค่าเริ่มต้น 5%
+    return DEFAULT_GROWTH_RATE
+
+
+def get_aaa_yield(provider=None):
+    """ฟังก์ชันสำหรับหาผลตอบแทนบอนด์ AAA (%)"""
+    provider = provider or get_provider()
+    start = datetime.now() - timedelta(days=30)
+    # ลองใช้ 10-year Treasury rate ก่อน แล้วจึงใช้ AAA
+    for series in ("DGS10", "AAA"):
+        try:
+            df = provider.fred(series, start=start)
+            if not df.empty:
+                return float(df.dropna().iloc[-1].iloc[0])
+        except Exception:
+            pass
+
+    # ถ้าไม่สามารถดึงข้อมูลได้ให้ใช้ค่าเริ่มต้น 4%
+    return DEFAULT_YIELD
+
+
+def fetch_inputs(ticker, provider=None, current_yield=None):
+    """Price, EPS, growth rate and bond yield for ``ticker``.
+
+    ``eps`` is None when the quote has none, so callers can ask for it.
+    Pass ``current_yield`` to reuse one bond yield across many tickers.
+    Raises ``ValueError`` when no current price is available.
+    """
+    provider = provider or get_provider()
+    quote = provider.info(ticker)
+    current_price = get_current_price(ticker, quote, provider)
+    if current_price is None:
+        raise ValueError(f"No current price for {ticker}")
+    return {
+        "current_price": float(current_price),
+        "eps": get_eps(quote),
+        "growth_rate": float(get_growth_rate(quote)),
+        "current_yield": float(current_yield if current_yield is not None else get_aaa_yield(provider)),
+    }
+
+
+def graham_value(eps, growth_rate, current_yield, ng_pe=DEFAULT_NG_PE,
+                 multiplier=DEFAULT_MULTIPLIER, margin=DEFAULT_MARGIN):
+    """Graham intrinsic value and the price accepted after ``margin`` percent.
+
+    V = EPS x (ng_pe + multiplier x g) x 4.4 / Y, with the growth rate g and
+    the bond yield Y both in percent (as returned by ``fetch_inputs``).
+    Computed as a one-point ``graham_grid`` so both give the same numbers.
+    """
+    grid = graham_grid([eps], [growth_rate], [current_yield], [ng_pe], multiplier, margin)
+    return {key: float(values.item()) for key, values in grid.items()}
+
+
+def graham_grid(eps, growth_rates, yields, ng_pes, multiplier=DEFAULT_MULTIPLIER, margin=DEFAULT_MARGIN):
+    """Graham value over every combination of EPS, growth rate, yield and PE base.
+
+    ``growth_rates`` and ``yields`` are in percent. All inputs are
+    broadcast against each other in one NumPy expression, so the results
+    have shape ``(len(eps), len(ng_pes), len(growth_rates), len(yields))``.
+    Returns a dict with ``intrinsic_value`` and ``accept_price`` arrays.
+    """
+    eps = np.asarray(eps, dtype=np.float64).reshape(-1, 1, 1, 1)
+    ng_pes = np.asarray(ng_pes, dtype=np.float64).reshape(1, -1, 1, 1)
+    growth_rates = np.asarray(growth_rates, dtype=np.float64).reshape(1, 1, -1, 1)
+    yields = np.asarray(yields, dtype=np.float64).reshape(1, 1, 1, -1)
+    intrinsic_value = eps * (ng_pes + multiplier * growth_rates) * 4.4 / yields
+    return {"intrinsic_value": intrinsic_value, "accept_price": (1 - margin / 100) * intrinsic_value}
+
+
+def recommendation(price, intrinsic_value, accept_price):
+    """``buy`` below the accepted price, ``consider`` up to the intrinsic value, else ``avoid``."""
+    if price <= accept_price:
+        return "buy"
+    if price <= intrinsic_value:
+        return "consider"
+    return "avoid"
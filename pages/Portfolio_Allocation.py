@@ -1,39 +1,24 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import datetime as dt
 import matplotlib.pyplot as plt
+from analytics.metrics import begin_run, render_debug_panel, timed
+from analytics.performance import calculate_performance, calculate_portfolio
+from analytics.providers import get_provider
+from analytics.simulation import project_portfolio
 
 # ========================
 # 📌 ฟังก์ชันคำนวณผลตอบแทนพอร์ต
 # ========================
 def download_data(tickers, start, end):
-    data = yf.download(tickers, start=start, end=end)["Close"]
+    data = get_provider().download(tickers, start=start, end=end)["Close"]
     return data.dropna()
 
-def calculate_portfolio(data, weights):
-    normalized = data / data.iloc[0]
-    weighted = normalized.mul(weights, axis=1)
-    portfolio = weighted.sum(axis=1)
-    return portfolio
-
-def calculate_performance(portfolio, risk_free_rate=0.02):
-    daily_return = portfolio.pct_change().dropna()
-    total_return = portfolio[-1] / portfolio[0] - 1
-    annual_return = (1 + total_return) ** (252 / len(portfolio)) - 1
-    annual_volatility = daily_return.std() * np.sqrt(252)
-    sharpe_ratio = (annual_return - risk_free_rate) / annual_volatility
-    return {
-        "Total Return (%)": total_return * 100,
-        "Annualized Return (%)": annual_return * 100,
-        "Annualized Volatility (%)": annual_volatility * 100,
-        "Sharpe Ratio": sharpe_ratio
-    }
-
 # ========================
 # 📌 Streamlit App
 # ========================
+begin_run("portfolio_allocation")
 st.title("📊 Portfolio Allocation Simulator")
 
 st.markdown("เลือกหุ้นและสัดส่วนการลงทุน เพื่อดูผลตอบแทนย้อนหลัง")
@@ -64,8 +49,9 @@ if data.empty:
     st.error("ไม่สามารถโหลดข้อมูลได้")
     st.stop()
 
-portfolio = calculate_portfolio(data, weights)
-performance = calculate_performance(portfolio)
+with timed("portfolio.performance"):
+    portfolio = calculate_portfolio(data, weights)
+    performance = calculate_performance(portfolio)
 
 # --- แสดงผล ---
 st.subheader("📈 ผลตอบแทนพอร์ตย้อนหลัง")
@@ -75,7 +61,7 @@ st.subheader("📊 สถิติของพอร์ต")
 st.write(pd.DataFrame(performance, index=["Portfolio"]).T)
 
 # --- เทียบกับ SPY ---
-spy = yf.download("SPY", start=start_date, end=end_date)["Close"]
+spy = get_provider().download("SPY", start=start_date, end=end_date)["Close"]
 spy = spy.reindex(portfolio.index).dropna()
 portfolio = portfolio.reindex(spy.index)
 
@@ -85,3 +71,31 @@ comparison = pd.DataFrame({
 })
 st.subheader("📉 เปรียบเทียบกับดัชนี S&P 500")
 st.line_chart(comparison)
+
+# --- คาดการณ์พอร์ตล่วงหน้า (Monte Carlo) ---
+st.subheader("🔮 คาดการณ์มูลค่าพอร์ตล่วงหน้า (Monte Carlo)")
+col1, col2, col3 = st.columns(3)
+with col1:
+    method_label = st.selectbox("วิธีจำลอง", ["Bootstrap", "GBM"])
+with col2:
+    n_paths = st.select_slider("จำนวนเส้นทาง", options=[10_000, 25_000, 50_000, 100_000], value=10_000)
+with col3:
+    horizon_years = st.number_input("ระยะเวลาคาดการณ์ (ปี)", min_value=1, max_value=10, value=1, step=1)
+
+if st.button("จำลอง"):
+    with st.spinner("🎲 กำลังจำลอง..."), timed("portfolio.project_portfolio"):
+        try:
+            fan, projection = project_portfolio(
+                portfolio.dropna(),
+                horizon_days=int(horizon_years) * 252,
+                n_paths=n_paths,
+                method=method_label.lower(),
+            )
+        except ValueError as e:
+            st.error(f"ไม่สามารถจำลองได้: {e}")
+            st.stop()
+
+    st.line_chart(fan)
+    st.write(pd.DataFrame(projection, index=["Portfolio"]).T)
+
+render_debug_panel()
@@ -1,8 +1,13 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import date, timedelta
+from analytics.charting import downsample, window
+from analytics.corporate_actions import total_return_frame
+from analytics.dca import simulate_dca
+from analytics.market_calendar import MAX_ENTRY_AGE, cache_epoch
+from analytics.metrics import begin_run, cached, render_debug_panel, timed
+from analytics.universe import index_members
 
 streamlit_style = """
 <style>
@@ -36,11 +41,12 @@ css_string = """
 st.markdown(css_string, unsafe_allow_html=True)
 
 # List of stock tickers
-tickers = ["ADVANC.BK", "AOT.BK", "AWC.BK", "BANPU.BK", "BBL.BK", "BDMS.BK", "BEM.BK", "BGRIM.BK", "BH.BK", "BTS.BK", 
-           "CBG.BK", "CENTEL.BK", "COM7.BK", "CPALL.BK", "CPF.BK", "CPN.BK", "CRC.BK", "DELTA.BK", "EA.BK", "EGCO.BK", 
-           "GLOBAL.BK", "GPSC.BK", "GULF.BK", "HMPRO.BK", "INTUCH.BK", "IVL.BK", "KBANK.BK", "KCE.BK", "KTB.BK", "KTC.BK", 
-           "LH.BK", "MINT.BK", "MTC.BK", "OR.BK", "OSP.BK", "PTT.BK", "PTTEP.BK", "PTTGC.BK", "RATCH.BK", "SAWAD.BK", 
-           "SCB.BK", "SCC.BK", "SCGP.BK", "TISCO.BK", "TOP.BK", "TTB.BK", "TU.BK", "WHA.BK"]
+tickers = index_members("SET50")
+
+@cached("dca.total_return", st.cache_data(ttl=MAX_ENTRY_AGE), key=cache_epoch)
+def load_total_return(ticker, start_date, end_date):
+    """Close, dividends and total-return index, topped up incrementally from the provider"""
+    return total_return_frame(ticker, start=start_date, end=end_date)
 
 # Streamlit app
 def main():
@@ -56,55 +62,59 @@ def main():
     # User input for investment amounts (input both to avoid confusion)
     monthly_amount = st.number_input("จำนวนเงินลงทุนต่อเดือน (DCA)", min_value=0.0, step=1.0)
     lump_sum_amount = st.number_input("จำนวนเงินลงทุนครั้งเดียว (Lump Sum)", min_value=0.0, step=1.0)
+    reinvest = st.checkbox("นำเงินปันผลไปลงทุนต่อ (Total Return)", value=True)
 
-    # Get stock data
+    # Get stock data (ราคาปิดพร้อมเงินปันผลและดัชนีผลตอบแทนรวม)
     end_date = start_date + pd.DateOffset(months=duration_months)
-    stock_data = yf.download(selected_ticker, start=start_date, end=end_date, progress=False)
-
-    # Forward fill missing data to handle non-trading days
-    stock_data = stock_data.ffill()
+    try:
+        stock_data = load_total_return(selected_ticker, start_date, end_date)
+    except Exception as e:
+        st.error(f"ไม่สามารถดึงข้อมูลหุ้นได้: {e}")
+        return
+    if stock_data.empty:
+        st.warning("ไม่มีข้อมูลราคาสำหรับช่วงเวลาที่เลือก")
+        return
 
     # Calculate returns and plot both methods
+    # (ผลยังแสดงอยู่หลังกดปุ่ม เพื่อให้เลื่อนช่วงเวลาของกราฟได้)
     if st.button("คำนวณ"):
+        st.session_state.dca_shown = True
+    if st.session_state.get("dca_shown"):
         # Simulate DCA
         total_dca_invested = monthly_amount * duration_months
-        dca_data = simulate_dca(stock_data, monthly_amount, duration_months, start_date)
+        with timed("simulate_dca"):
+            dca_data = simulate_dca(stock_data, monthly_amount, duration_months, start_date, reinvest)
         dca_final_portfolio_value = dca_data["Portfolio Value"].iloc[-1]
 
         # Simulate Lump Sum
-        initial_shares = lump_sum_amount / stock_data.iloc[0]["Adj Close"]
-        final_portfolio_value_lump_sum = initial_shares * stock_data.iloc[-1]["Adj Close"]
+        lump_sum_values = lump_sum_value(stock_data, lump_sum_amount, reinvest)
+        final_portfolio_value_lump_sum = lump_sum_values.iloc[-1]
 
         # Plot the comparison graph
-        fig = plot_comparison(dca_data, total_dca_invested, stock_data, lump_sum_amount, final_portfolio_value_lump_sum)
+        fig = plot_comparison(dca_data, total_dca_invested, lump_sum_values, lump_sum_amount)
         st.plotly_chart(fig)
 
         # Display summary for both
         display_summary(dca_data, total_dca_invested, "DCA", dca_final_portfolio_value)
-        display_summary(stock_data, lump_sum_amount, "Lump Sum", final_portfolio_value_lump_sum)
-
-# Function to simulate DCA
-def simulate_dca(stock_data, monthly_amount, duration_months, start_date):
-    dca_data = pd.DataFrame(columns=["Date", "Shares", "Total Invested", "Portfolio Value"])
-    total_invested = 0
-    shares = 0
-    start_date = pd.to_datetime(start_date)  # Convert start_date to datetime
-
-    for i in range(duration_months):
-        date = start_date + pd.DateOffset(months=i)  # Calculate the monthly date
-        if date not in stock_data.index:  # Check if the date is not a trading day
-            date = stock_data.index[stock_data.index.searchsorted(date)]  # Adjust to the closest trading day
-        price = stock_data.loc[date, "Adj Close"]
-        shares_bought = monthly_amount / price
-        shares += shares_bought
-        total_invested += monthly_amount
-        portfolio_value = shares * price
-        dca_data.loc[len(dca_data)] = [date, shares, total_invested, portfolio_value]
-
-    return dca_data
+        display_summary(lump_sum_values, lump_sum_amount, "Lump Sum", final_portfolio_value_lump_sum)
+
+# Daily value of a lump sum bought on the first day
+def lump_sum_value(stock_data, lump_sum_investment, reinvest):
+    initial_shares = lump_sum_investment / stock_data["Close"].iloc[0]
+    if reinvest:
+        return initial_shares * stock_data["Total Return"]
+    # ปันผลที่ไม่นำไปลงทุนต่อถือเป็นเงินสดในพอร์ต
+    return initial_shares * (stock_data["Close"] + stock_data["Dividends"].cumsum())
 
 # Function to plot comparison between DCA and Lump Sum
-def plot_comparison(dca_data, total_dca_invested, stock_data, lump_sum_investment, lump_sum_final_value):
+def plot_comparison(dca_data, total_dca_invested, lump_sum_values, lump_sum_investment):
+    # Only the visible range is sent, decimated to the chart width;
+    # narrowing the range brings back full resolution
+    first, last = lump_sum_values.index[0].to_pydatetime(), lump_sum_values.index[-1].to_pydatetime()
+    view_start, view_end = st.slider("ช่วงเวลาที่แสดง", min_value=first, max_value=last,
+                                     value=(first, last), format="YYYY-MM-DD")
+    dca_data = window(dca_data, view_start, view_end, column="Date")
+
     fig = go.Figure()
 
     # Plot DCA
@@ -112,9 +122,8 @@ def plot_comparison(dca_data, total_dca_invested, stock_data, lump_sum_investmen
     fig.add_trace(go.Scatter(x=dca_data["Date"], y=dca_data["Total Invested"], mode="lines", name="จำนวนเงินลงทุน DCA"))
 
     # Plot Lump Sum
-    initial_shares = lump_sum_investment / stock_data.iloc[0]["Adj Close"]
-    portfolio_value_lump_sum = initial_shares * stock_data["Adj Close"]
-    dates = stock_data.index
+    portfolio_value_lump_sum = downsample(window(lump_sum_values, view_start, view_end))
+    dates = portfolio_value_lump_sum.index
     fig.add_trace(go.Scatter(x=dates, y=portfolio_value_lump_sum, mode="lines", name="มูลค่าของพอร์ต Lump Sum"))
     fig.add_trace(go.Scatter(x=dates, y=[lump_sum_investment] * len(dates), mode="lines", name="จำนวนเงินลงทุน Lump Sum"))
 
@@ -130,6 +139,7 @@ def display_summary(data, initial_investment, investment_type, final_portfolio_v
         st.write(f"**ภาพรวมของการลงทุนแบบ DCA**")
         st.write(f"มูลค่าของพอร์ต: {final_portfolio_value:.2f}")
         st.write(f"จำนวนเงินที่ลงทุน: {total_invested:.2f}")
+        st.write(f"เงินปันผลที่ได้รับเป็นเงินสด: {data['Dividends'].iloc[-1]:.2f}")
         st.write(f"ผลตอบแทน: {returns:.2f}%")
     else:
         returns = (final_portfolio_value - initial_investment) / initial_investment * 100
@@ -139,4 +149,6 @@ def display_summary(data, initial_investment, investment_type, final_portfolio_v
         st.write(f"ผลตอบแทน: {returns:.2f}%")
 
 if __name__ == "__main__":
+    begin_run("dca")
     main()
+    render_debug_panel()
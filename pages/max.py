@@ -1,18 +1,15 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import pandas_datareader as pdr
 import numpy as np
+from analytics.bars import FREQUENCY_CHOICES, load_intraday
+from analytics.corporate_actions import total_return_frame
+from analytics.metrics import begin_run, render_debug_panel, timed
+from analytics.performance import calculate_max_drawdown
+from analytics.valuation import fetch_inputs, graham_value, recommendation
+from analytics.universe import index_members
 
 # หุ้นใน SET50
-stocks = ('SET50.BK', 'ADVANC.BK', 'AOT.BK', 'AWC.BK', 'BANPU.BK', 'BBL.BK', 'BDMS.BK', 
-          'BEM.BK', 'BGRIM.BK', 'BH.BK', 'BTS.BK', 'CBG.BK', 'CENTEL.BK', 'COM7.BK', 
-          'CPALL.BK', 'CPF.BK', 'CPN.BK', 'CRC.BK', 'DELTA.BK', 'EA.BK', 'EGCO.BK', 
-          'GLOBAL.BK', 'GPSC.BK', 'GULF.BK', 'HMPRO.BK', 'INTUCH.BK', 'IVL.BK', 
-          'KBANK.BK', 'KCE.BK', 'KTB.BK', 'KTC.BK', 'LH.BK', 'MINT.BK', 'MTC.BK', 
-          'OR.BK', 'OSP.BK', 'PTT.BK', 'PTTEP.BK', 'PTTGC.BK', 'RATCH.BK', 'SAWAD.BK', 
-          'SCB.BK', 'SCC.BK', 'SCGP.BK', 'TISCO.BK', 'TLI.BK', 'TOP.BK', 'TRUE.BK', 
-          'TTB.BK', 'TU.BK', 'WHA.BK')
+stocks = index_members("SET50")
 
 # สไตล์ Streamlit
 streamlit_style = """
@@ -22,6 +19,7 @@ streamlit_style = """
 .st-emotion-cache-1dp5vir { background-image: linear-gradient(90deg, rgb(0 0 0), rgb(0 0 0)); }
 </style>
 """
+begin_run("max_drawdown")
 st.markdown(streamlit_style, unsafe_allow_html=True)
 
 # ส่วนหัว
@@ -31,48 +29,42 @@ ticker = st.selectbox("เลือกหุ้น", stocks)
 ng_pe = st.text_input('PE ที่ไม่มีการเติบโต', "8.5")
 multiplier = st.text_input('ระยะการเติบโต', "2")
 margin = st.text_input('ส่วนเผื่อราคา (%)', "35")
+frequency = st.radio('ความถี่ข้อมูลสำหรับ Max Drawdown', list(FREQUENCY_CHOICES), horizontal=True)
+interval = FREQUENCY_CHOICES[frequency]
+total_return = st.checkbox('รวมเงินปันผลที่นำไปลงทุนต่อ (Total Return)', value=True)
 
-def get_data(ticker):
+def get_data(ticker, interval=None, total_return=False):
     try:
-        ticker_data = yf.Ticker(ticker)
-        df = ticker_data.history(period="5y")  # ดึงข้อมูลย้อนหลัง 5 ปี
-        if 'Adj Close' in df.columns:
-            df['Price'] = df['Adj Close']
+        if interval is None:
+            # ดึงข้อมูลย้อนหลัง 5 ปี พร้อมเงินปันผลและดัชนีผลตอบแทนรวม
+            start = pd.Timestamp.now().normalize() - pd.DateOffset(years=5)
+            df = total_return_frame(ticker, start=start)
+        else:
+            # แท่งราคาระหว่างวันจากที่เก็บในเครื่อง (เติมข้อมูลล่าสุดก่อนอ่าน)
+            df = load_intraday([ticker], interval).get(ticker, pd.DataFrame())
+        if total_return and 'Total Return' in df.columns:
+            df['Price'] = df['Total Return']
         elif 'Close' in df.columns:
             df['Price'] = df['Close']
         else:
-            st.warning("ไม่มีข้อมูลราคา ('Adj Close' หรือ 'Close') สำหรับหุ้นนี้")
+            st.warning("ไม่มีข้อมูลราคา ('Close') สำหรับหุ้นนี้")
             return pd.DataFrame()  # คืนค่า DataFrame ว่าง
         return df
     except Exception as e:
         st.error(f"ไม่สามารถดึงข้อมูลหุ้นได้: {e}")
         return pd.DataFrame()
-# คำนวณ Max Drawdown
-def calculate_max_drawdown(df):
-    if df.empty:
-        return None
-    peak = df['Price'].cummax()
-    drawdown = (df['Price'] - peak) / peak
-    return drawdown.min() * 100
-
-# ดึงข้อมูลหุ้นและดัชนี AAA
+# ดึงราคา, EPS, อัตราการเติบโต (%) และผลตอบแทนบอนด์ (%) แบบเดียวกับหน้าประเมินมูลค่าและรายงาน
 def get_stock_info(ticker, ng_pe, multiplier, margin):
     try:
-        ticker_data = yf.Ticker(ticker)
-        quote = ticker_data.info
-        current_price = quote.get("regularMarketPreviousClose", 0)
-        eps = quote.get("trailingEps", 0) or 0
-        growth_rate = quote.get("earningsGrowth", 0) or 0
-        aaa_df = pdr.get_data_fred('AAA')
-        current_yield = aaa_df.iloc[-1][0] if not aaa_df.empty else 0
+        inputs = fetch_inputs(ticker)
+        if inputs["eps"] is None:
+            st.error(f"ไม่สามารถดึงข้อมูล EPS ของ {ticker} ได้")
+            return None
         return {
-            "current_price": float(current_price or 0),
-            "eps": float(eps),
-            "growth_rate": float(growth_rate),
-            "current_yield": float(current_yield or 0),
+            **inputs,
             "ng_pe": float(ng_pe),
             "multiplier": float(multiplier),
-            "margin": float(margin) / 100
+            "margin": float(margin)
         }
     except Exception as e:
         st.error(f"ไม่สามารถดึงข้อมูลได้: {e}")
@@ -80,27 +72,29 @@ def get_stock_info(ticker, ng_pe, multiplier, margin):
 
 # คำนวณ
 if st.button('คํานวณ'):
-    df = get_data(ticker)
+    df = get_data(ticker, interval, total_return)
     if df.empty:
         st.error("ไม่สามารถดึงข้อมูลสำหรับหุ้นที่เลือกได้")
     else:
         data = get_stock_info(ticker, ng_pe, multiplier, margin)
         if data:
-            max_drawdown = calculate_max_drawdown(df) or 0
+            with timed("max_drawdown"):
+                max_drawdown = calculate_max_drawdown(df) or 0
             st.markdown("---")
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric(label="EPS(฿)", value=data["eps"])
+                st.metric(label="EPS(฿)", value=f"{data['eps']:.2f}")
             with col2:
-                st.metric(label="อัตรการเติบโตระยะยาว (5 ปี)", value=data["growth_rate"])
+                st.metric(label="อัตรการเติบโตระยะยาว (%)", value=f"{data['growth_rate']:.2f}")
             with col3:
-                st.metric(label="ผลตอบแทนของบริษัท AAA", value=data["current_yield"])
+                st.metric(label="ผลตอบแทนบอนด์อ้างอิง (%)", value=f"{data['current_yield']:.2f}")
             
             st.markdown("---")
-            intrinsic_value = (data["eps"] * (data["ng_pe"] + data["multiplier"] * data["growth_rate"]) * 4.486) / data["current_yield"]
-            intrinsic_value = round(intrinsic_value, 2)
+            value = graham_value(data["eps"], data["growth_rate"], data["current_yield"],
+                                 data["ng_pe"], data["multiplier"], data["margin"])
+            intrinsic_value = round(value["intrinsic_value"], 2)
             stock_price = round(data["current_price"], 2)
-            accept_price = round((1 - data["margin"]) * intrinsic_value, 2)
+            accept_price = round(value["accept_price"], 2)
             
             col4, col5, col6 = st.columns(3)
             with col4:
@@ -113,5 +107,10 @@ if st.button('คํานวณ'):
                 st.subheader('ราคาที่ยอมรับได้(฿)')
                 st.subheader(f"**:blue[{accept_price}]**")
             
+            advice = recommendation(stock_price, intrinsic_value, accept_price)
+            st.caption({"buy": "🟢 แนะนำซื้อ", "consider": "🟡 พิจารณา", "avoid": "🔴 ไม่แนะนำ"}[advice])
+            
             st.markdown("---")
             st.subheader(f"Max Drawdown: **:red[{round(max_drawdown, 2)}%]**")
+
+render_debug_panel()
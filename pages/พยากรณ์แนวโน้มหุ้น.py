@@ -1,12 +1,18 @@
 import streamlit as st
 from datetime import date
-import yfinance as yf
-from prophet import Prophet
-from prophet.plot import plot_plotly
 import plotly.graph_objs as go
-import streamlit.components.v1 as components
 import numpy as np
 import pandas as pd
+from analytics.bars import FREQUENCY_CHOICES, load_intraday
+from analytics.charting import component_figures, downsample, forecast_figure, window
+from analytics.forecast_store import MAX_HORIZON_DAYS, stored_forecasts
+from analytics.forecasting import rank_forecasts, training_frames
+from analytics.indicators import compute_indicators
+from analytics.market_calendar import MAX_ENTRY_AGE, cache_epoch, intraday_cache_epoch
+from analytics.metrics import begin_run, cached, render_debug_panel, timed
+from analytics.price_matrix import ensure_matrix, price_frame
+from analytics.providers import get_provider
+from analytics.universe import index_members
 
 # CSS Styling
 streamlit_style = """
@@ -29,22 +35,27 @@ TODAY = date.today().strftime("%Y-%m-%d")
 st.title("พยากรณ์แนวโน้มหุ้น")
 
 # Stock list
-stocks = ('ADVANC.BK', 'AOT.BK', 'AWC.BK', 'BANPU.BK', 'BBL.BK', 'BDMS.BK', 'BEM.BK', 
-         'BGRIM.BK', 'BH.BK', 'BTS.BK', 'CBG.BK', 'CENTEL.BK', 'COM7.BK', 'CPALL.BK', 
-         'CPF.BK', 'CPN.BK', 'CRC.BK', 'DELTA.BK', 'EA.BK', 'EGCO.BK', 'GLOBAL.BK', 
-         'GPSC.BK', 'GULF.BK', 'HMPRO.BK', 'INTUCH.BK', 'IVL.BK', 'KBANK.BK', 'KCE.BK', 
-         'KTB.BK', 'KTC.BK', 'LH.BK', 'MINT.BK', 'MTC.BK', 'OR.BK', 'OSP.BK', 'PTT.BK', 
-         'PTTEP.BK', 'PTTGC.BK', 'RATCH.BK', 'SAWAD.BK', 'SCB.BK', 'SCC.BK', 'SCGP.BK', 
-         'TISCO.BK', 'TLI.BK', 'TOP.BK', 'TRUE.BK', 'TTB.BK', 'TU.BK', 'WHA.BK')
-
-selected_stocks = st.selectbox("เลือกหุ้น", stocks)
-n_years = st.slider("จํานวนปีที่ต้องการพยากรณ์", 1, 4)
+stocks = index_members("SET50")
+
+mode = st.radio("รูปแบบการพยากรณ์", ["หุ้นตัวเดียว", "หลายหุ้น"], horizontal=True)
+if mode == "หุ้นตัวเดียว":
+    selected_stocks = st.selectbox("เลือกหุ้น", stocks)
+else:
+    batch_stocks = st.multiselect("เลือกหุ้น", stocks, default=stocks[:9])
+n_years = st.slider("จํานวนปีที่ต้องการพยากรณ์", 1, MAX_HORIZON_DAYS // 365)
+if mode == "หุ้นตัวเดียว":
+    overlays = st.multiselect("อินดิเคเตอร์บนกราฟราคา", ["SMA20", "SMA50", "EMA12", "EMA26", "Bollinger Bands"])
+    chart_frequency = st.radio("ความถี่กราฟราคา", list(FREQUENCY_CHOICES), horizontal=True,
+                               help="การพยากรณ์ใช้ข้อมูลรายวันเสมอ")
 period = n_years * 365
 
-@st.cache_data
+# จำนวนกราฟพยากรณ์ต่อแถวในโหมดหลายหุ้น
+GRID_COLUMNS = 3
+
+@cached("forecast.load_data", st.cache_data(ttl=MAX_ENTRY_AGE), key=cache_epoch)
 def load_data(ticker):
     try:
-        data = yf.download(ticker, START, TODAY, progress=False)
+        data = get_provider().download(ticker, start=START, end=TODAY)
         if data.empty:
             st.error(f"ไม่สามารถโหลดข้อมูลสำหรับ {ticker} ได้")
             return None
@@ -54,20 +65,91 @@ def load_data(ticker):
         st.error(f"เกิดข้อผิดพลาดในการโหลดข้อมูล: {str(e)}")
         return None
 
-def plot_raw_data(data):
+@cached("forecast.intraday_data", st.cache_data(ttl=MAX_ENTRY_AGE, show_spinner=False),
+        key=intraday_cache_epoch)
+def load_intraday_data(ticker, interval):
+    """Intraday bars from the local bar store in the same layout as load_data"""
+    frame = load_intraday([ticker], interval).get(ticker)
+    if frame is None:
+        return None
+    return frame.reset_index()
+
+# อินดิเคเตอร์ที่เลือกได้ -> เส้นที่ต้องวาด
+OVERLAY_SERIES = {
+    "SMA20": ["SMA20"],
+    "SMA50": ["SMA50"],
+    "EMA12": ["EMA12"],
+    "EMA26": ["EMA26"],
+    "Bollinger Bands": ["BB Upper", "BB Mid", "BB Lower"],
+}
+
+def plot_raw_data(data, overlays=()):
     if data is None or data.empty:
         st.error("ไม่มีข้อมูลสำหรับการแสดงกราф")
         return
     
     try:
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=data['Date'], y=data['Open'], name='ราคาเปิด'))
-        fig.add_trace(go.Scatter(x=data['Date'], y=data['Close'], name='ราคาปิด'))
-        fig.layout.update(title_text="ราคาหุ้น", xaxis_rangeslider_visible=True)
-        st.plotly_chart(fig)
+        prices = pd.DataFrame({
+            'ราคาเปิด': np.asarray(data['Open'], dtype=float).ravel(),
+            'ราคาปิด': np.asarray(data['Close'], dtype=float).ravel(),
+        }, index=pd.DatetimeIndex(data['Date']))
+        if overlays:
+            with timed("forecast.indicators"):
+                indicators, _ = compute_indicators(prices[['ราคาปิด']])
+            for overlay in overlays:
+                for name in OVERLAY_SERIES[overlay]:
+                    prices[name] = indicators[name].iloc[:, 0]
+        
+        # Only the visible range is sent, decimated to the chart width;
+        # narrowing the range brings back full resolution
+        first, last = prices.index[0].to_pydatetime(), prices.index[-1].to_pydatetime()
+        view_start, view_end = st.slider("ช่วงเวลาที่แสดง", min_value=first, max_value=last,
+                                         value=(first, last), format="YYYY-MM-DD")
+        chart = downsample(window(prices, view_start, view_end))
+        
+        with timed("forecast.price_chart", "render"):
+            fig = go.Figure()
+            for name in chart.columns:
+                line = dict(width=1) if name in prices.columns[2:] else None
+                fig.add_trace(go.Scatter(x=chart.index, y=chart[name], name=name, line=line))
+            fig.layout.update(title_text="ราคาหุ้น", xaxis_rangeslider_visible=True)
+            st.plotly_chart(fig)
     except Exception as e:
         st.error(f"เกิดข้อผิดพลาดในการแสดงกราฟ: {str(e)}")
 
+def fit_forecast(ticker, period, df_train):
+    """Forecast `period` days ahead from the forecast store, fitting only on new data"""
+    with timed("forecast.store", "fetch"), st.spinner("กำลังสร้างแบบจำลองพยากรณ์..."):
+        forecasts, errors = stored_forecasts({ticker: df_train}, period, workers=1)
+    if ticker in errors:
+        raise RuntimeError(errors[ticker])
+    return forecasts[ticker]
+
+@cached("forecast.batch", st.cache_data(ttl=MAX_ENTRY_AGE, show_spinner="กำลังสร้างแบบจำลองพยากรณ์หลายหุ้น..."),
+        key=cache_epoch)
+def fit_batch(tickers, period):
+    """Training frames and forecasts for many tickers, read from the shared price matrix"""
+    with timed("forecast.batch_prices", "fetch"):
+        matrix = ensure_matrix(tickers, START)
+        if matrix is None:
+            return {}, {}, {}
+        prices = price_frame(matrix, 'Close', tickers, start=START)
+    with timed("forecast.training_frames"):
+        frames = training_frames(prices)
+    with timed("forecast.store", "fetch"):
+        forecasts, errors = stored_forecasts(frames, period)
+    missing = {t: "ข้อมูลไม่เพียงพอสำหรับการพยากรณ์" for t in tickers if t not in frames}
+    return frames, forecasts, {**missing, **errors}
+
+def forecast_key(forecast):
+    """Cheap identity of a forecast frame for caching its component figures"""
+    return len(forecast), str(forecast['ds'].iloc[-1]), float(forecast['yhat'].iloc[-1])
+
+@cached("forecast.components", st.cache_data(show_spinner=False))
+def forecast_components(ticker, period, key, _forecast):
+    """Component figures, cached per model (ticker, horizon and forecast identity)"""
+    return component_figures(_forecast)
+
 def main():
     # Load data
     data_load_state = st.text("กําลังโหลดข้อมูล....")
@@ -80,7 +162,16 @@ def main():
     data_load_state.text("โหลดข้อมูล...สําเร็จ")
     
     # Plot raw data
-    plot_raw_data(data)
+    interval = FREQUENCY_CHOICES[chart_frequency]
+    if interval is None:
+        plot_raw_data(data, overlays)
+    else:
+        try:
+            intraday = load_intraday_data(selected_stocks, interval)
+        except Exception as e:
+            st.error(f"เกิดข้อผิดพลาดในการโหลดข้อมูลระหว่างวัน: {str(e)}")
+            intraday = None
+        plot_raw_data(intraday, overlays)
     
     # Check if data has required columns
     if 'Close' not in data.columns or 'Date' not in data.columns:
@@ -93,28 +184,17 @@ def main():
         return
     
     try:
-        # Prepare data for Prophet
-        df_train = data[['Date', 'Close']].copy()
-        df_train.columns = ['ds', 'y']
-        
-        # Clean data - remove NaN values
-        df_train = df_train.dropna()
-        
-        # Ensure data types are correct
-        df_train['y'] = pd.to_numeric(df_train['y'], errors='coerce')
-        df_train = df_train.dropna()  # Remove any remaining NaN after conversion
+        # Prepare data for Prophet (same cleaning as the multi-ticker mode)
+        close = pd.DataFrame({selected_stocks: np.asarray(data['Close'], dtype=float).ravel()},
+                             index=pd.DatetimeIndex(data['Date']))
+        df_train = training_frames(close, min_rows=10).get(selected_stocks)
         
-        if len(df_train) < 10:
+        if df_train is None:
             st.error("ข้อมูลที่สะอาดแล้วไม่เพียงพอสำหรับการพยากรณ์")
             return
         
-        # Create and fit Prophet model
-        m = Prophet()
-        m.fit(df_train)
-        
-        # Make future predictions
-        future = m.make_future_dataframe(periods=period)
-        forecast = m.predict(future)
+        # Fit once per (ticker, data) for the longest horizon; shorter horizons are slices
+        forecast = fit_forecast(selected_stocks, period, df_train)
         
         # Display forecast data
         st.subheader('ข้อมูลการพยากรณ์')
@@ -124,18 +204,17 @@ def main():
             st.error("ไม่สามารถสร้างการพยากรณ์ได้")
             return
         
-        # Plot forecast
+        # Plot forecast with the page's own plotly client (no embedded HTML)
         try:
-            fig1 = plot_plotly(m, forecast)
-            if fig1:
-                components.html(fig1.to_html(full_html=False), height=600)
+            with timed("forecast.forecast_chart", "render"):
+                st.plotly_chart(forecast_figure(df_train, forecast), use_container_width=True)
         except Exception as e:
             st.error(f"เกิดข้อผิดพลาดในการแสดงกราฟพยากรณ์: {str(e)}")
         
         # Plot components
         try:
-            fig2 = m.plot_components(forecast)
-            st.pyplot(fig2)
+            for fig in forecast_components(selected_stocks, period, forecast_key(forecast), forecast):
+                st.plotly_chart(fig, use_container_width=True)
         except Exception as e:
             st.error(f"เกิดข้อผิดพลาดในการแสดงกราฟส่วนประกอบ: {str(e)}")
         
@@ -168,6 +247,43 @@ def main():
     except Exception as e:
         st.error(f"เกิดข้อผิดพลาดในการประมวลผล: {str(e)}")
 
+def main_batch():
+    if not batch_stocks:
+        st.info("เลือกหุ้นอย่างน้อยหนึ่งตัว")
+        return
+    try:
+        frames, forecasts, errors = fit_batch(tuple(batch_stocks), period)
+    except Exception as e:
+        st.error(f"เกิดข้อผิดพลาดในการพยากรณ์: {str(e)}")
+        return
+    for ticker, message in errors.items():
+        st.warning(f"{ticker}: {message}")
+    if not forecasts:
+        st.error("ไม่สามารถสร้างการพยากรณ์ได้")
+        return
+    
+    # Ranking by predicted return at the end of the horizon
+    st.subheader(f"อันดับผลตอบแทนที่พยากรณ์ ({n_years} ปี)")
+    ranking = rank_forecasts(frames, forecasts)
+    st.dataframe(ranking.round(2), hide_index=True, use_container_width=True)
+    
+    # Grid of forecasts, best predicted return first
+    st.subheader("กราฟพยากรณ์")
+    with timed("forecast.batch_charts", "render"):
+        tickers = list(ranking['Ticker'])
+        for row in range(0, len(tickers), GRID_COLUMNS):
+            columns = st.columns(GRID_COLUMNS)
+            for column, ticker in zip(columns, tickers[row:row + GRID_COLUMNS]):
+                fig = forecast_figure(frames[ticker], forecasts[ticker], width_px=300)
+                fig.update_layout(title_text=ticker, height=300, showlegend=False,
+                                  xaxis_rangeslider_visible=False, margin=dict(t=40, b=20, l=10, r=10))
+                column.plotly_chart(fig, use_container_width=True)
+
 # Run the main function
 if __name__ == "__main__":
-    main()
+    begin_run("forecast")
+    if mode == "หุ้นตัวเดียว":
+        main()
+    else:
+        main_batch()
+    render_debug_panel()
@@ -1,9 +1,32 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
+from analytics.backtest import INDICATOR_WARMUP, RISK_FREE_RATE, make_filter_grid, prepare, run_grid, run_rule
+from analytics.indicators import compute_indicators, latest_values
+from analytics.market_calendar import MAX_ENTRY_AGE, cache_epoch
+from analytics.metrics import begin_run, bind, cached, render_debug_panel, timed
+from analytics.screener import (
+    INDEX_COLUMNS,
+    PERCENTILE_SUFFIX,
+    TECHNICAL_RULES,
+    build_display_table,
+    build_fundamentals_table,
+    build_screen_index,
+    criteria_mask,
+    display_rows,
+    empty_record,
+    fundamentals_record,
+    query_positions,
+    sort_and_page,
+    top_n_positions,
+    write_csv,
+)
+from analytics.price_matrix import ensure_matrix, price_frame
+from analytics.providers import get_provider
+from analytics.snapshots import append_snapshot, load_history, load_snapshot
+from analytics.universe import get_universe, has_full_listing, index_members, refresh_universe
 
 # Configure Streamlit page
 st.set_page_config(
@@ -23,14 +46,8 @@ streamlit_style = """
 """
 st.markdown(streamlit_style, unsafe_allow_html=True)
 
-# List of stock tickers
-stocks = ["ADVANC.BK", "AOT.BK", "AWC.BK", "BANPU.BK", "BBL.BK", "BDMS.BK", "BEM.BK", "BGRIM.BK", "BH.BK", "BTS.BK",
-          "CBG.BK", "CENTEL.BK", "COM7.BK", "CPALL.BK", "CPF.BK", "CPN.BK", "CRC.BK", "DELTA.BK", "EA.BK", "EGCO.BK",
-          "GLOBAL.BK", "GPSC.BK", "GULF.BK", "HMPRO.BK", "INTUCH.BK", "IVL.BK", "KBANK.BK", "KCE.BK", "KTB.BK", "KTC.BK",
-          "LH.BK", "MINT.BK", "MTC.BK", "OR.BK", "OSP.BK", "PTT.BK", "PTTEP.BK", "PTTGC.BK", "RATCH.BK", "SAWAD.BK",
-          "SCB.BK", "SCC.BK", "SCGP.BK", "TISCO.BK", "TLI.BK", "TOP.BK", "TRUE.BK", "TTB.BK", "TU.BK", "WHA.BK"]
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
+@cached("screener.stock_info", st.cache_data(ttl=MAX_ENTRY_AGE), key=cache_epoch)  # Valid until the next trading session
 def get_stock_data(ticker):
     """Get stock data with proper error handling and retry logic"""
     max_retries = 3
@@ -38,8 +55,7 @@ def get_stock_data(ticker):
     
     for attempt in range(max_retries):
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
+            info = get_provider().info(ticker)
             
             # Validate that we got actual data
             if not info or len(info) < 10:
@@ -49,28 +65,7 @@ def get_stock_data(ticker):
                 else:
                     return create_empty_stock_data(ticker)
             
-            # Safely extract data with proper type conversion
-            def safe_get_float(key, default=None):
-                value = info.get(key, default)
-                if value is None or pd.isna(value):
-                    return None
-                try:
-                    return float(value)
-                except (ValueError, TypeError):
-                    return None
-            
-            return {
-                "Ticker": ticker,
-                "Company Name": info.get('longName', ticker),
-                "PE Ratio": safe_get_float('trailingPE'),
-                "PB Ratio": safe_get_float('priceToBook'),
-                "Debt to Equity": safe_get_float('debtToEquity'),
-                "ROE": safe_get_float('returnOnEquity'),
-                "ROA": safe_get_float('returnOnAssets'),
-                "Current Price": safe_get_float('currentPrice'),
-                "Market Cap": safe_get_float('marketCap'),
-                "Sector": info.get('sector', 'N/A')
-            }
+            return fundamentals_record(ticker, info)
             
         except Exception as e:
             if attempt < max_retries - 1:
@@ -82,108 +77,120 @@ def get_stock_data(ticker):
 
 def create_empty_stock_data(ticker):
     """Create empty stock data structure"""
-    return {
-        "Ticker": ticker,
-        "Company Name": "N/A",
-        "PE Ratio": None,
-        "PB Ratio": None,
-        "Debt to Equity": None,
-        "ROE": None,
-        "ROA": None,
-        "Current Price": None,
-        "Market Cap": None,
-        "Sector": "N/A"
-    }
+    return empty_record(ticker)
 
-def load_all_stock_data(stock_list):
-    """Load all stock data with progress bar and multithreading"""
+def load_all_stock_data(stock_list, batch_size=50, max_workers=8):
+    """Load all stock data with progress bar, fetching in parallel batches"""
     progress_bar = st.progress(0)
     status_text = st.empty()
     data = []
+    completed = 0
     
-    # Use ThreadPoolExecutor for concurrent downloads
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Submit all tasks
-        future_to_stock = {executor.submit(get_stock_data, stock): stock for stock in stock_list}
-        
-        # Collect results as they complete
-        completed = 0
-        for future in as_completed(future_to_stock):
-            stock = future_to_stock[future]
-            try:
-                result = future.result()
-                if result:
-                    data.append(result)
-            except Exception as e:
-                st.warning(f"Error processing {stock}: {str(e)}")
-                data.append(create_empty_stock_data(stock))
+    # Use one ThreadPoolExecutor and feed it one batch at a time so a large
+    # universe does not flood the data provider with hundreds of requests
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch_start in range(0, len(stock_list), batch_size):
+            batch = stock_list[batch_start:batch_start + batch_size]
+            future_to_stock = {executor.submit(bind(get_stock_data), stock): stock for stock in batch}
             
-            completed += 1
-            progress = completed / len(stock_list)
-            progress_bar.progress(progress)
-            status_text.text(f'กำลังดาวน์โหลดข้อมูล... {completed}/{len(stock_list)}')
+            # Collect results as they complete
+            for future in as_completed(future_to_stock):
+                stock = future_to_stock[future]
+                try:
+                    result = future.result()
+                    if result:
+                        data.append(result)
+                except Exception as e:
+                    st.warning(f"Error processing {stock}: {str(e)}")
+                    data.append(create_empty_stock_data(stock))
+                
+                completed += 1
+                progress = completed / len(stock_list)
+                progress_bar.progress(progress)
+                status_text.text(f'กำลังดาวน์โหลดข้อมูล... {completed}/{len(stock_list)}')
     
     progress_bar.empty()
     status_text.empty()
     return data
 
-def apply_filters(df, filters):
-    """Apply filters to dataframe with proper validation"""
-    filtered_df = df.copy()
-    
-    # Only apply filters if the filter is active and has valid data
-    if filters['pe_active'] and filters['pe_ratio'] is not None:
-        mask = (df['PE Ratio'].notna()) & (df['PE Ratio'] <= filters['pe_ratio'])
-        filtered_df = filtered_df[mask]
-    
-    if filters['pb_active'] and filters['pb_ratio'] is not None:
-        mask = (df['PB Ratio'].notna()) & (df['PB Ratio'] <= filters['pb_ratio'])
-        filtered_df = filtered_df[mask]
-    
-    if filters['de_active'] and filters['de_ratio'] is not None:
-        mask = (df['Debt to Equity'].notna()) & (df['Debt to Equity'] <= filters['de_ratio'])
-        filtered_df = filtered_df[mask]
-    
-    if filters['roe_active'] and filters['roe'] is not None:
-        mask = (df['ROE'].notna()) & (df['ROE'] >= (filters['roe'] / 100))
-        filtered_df = filtered_df[mask]
-    
-    if filters['roa_active'] and filters['roa'] is not None:
-        mask = (df['ROA'].notna()) & (df['ROA'] >= (filters['roa'] / 100))
-        filtered_df = filtered_df[mask]
-    
-    return filtered_df
+@cached("screener.technical_table", st.cache_data(ttl=MAX_ENTRY_AGE), key=cache_epoch)
+def load_technical_table(tickers):
+    """Latest technical indicator values for every ticker, computed in one pass"""
+    start = (pd.Timestamp.now() - pd.DateOffset(years=1)).normalize()
+    matrix = ensure_matrix(tickers, start)
+    if matrix is None:
+        return pd.DataFrame()
+    close, high, low = (price_frame(matrix, field, tickers, start=start) for field in ('Close', 'High', 'Low'))
+    indicators, _ = compute_indicators(close, high, low)
+    return latest_values(indicators, close)
 
-def format_dataframe(df):
-    """Format dataframe for display"""
-    if df.empty:
-        return df
-    
-    # Create a copy to avoid modifying original
-    display_df = df.copy()
-    
-    # Format numeric columns
-    format_dict = {}
-    if 'PE Ratio' in display_df.columns:
-        format_dict['PE Ratio'] = "{:.2f}"
-    if 'PB Ratio' in display_df.columns:
-        format_dict['PB Ratio'] = "{:.2f}"
-    if 'Debt to Equity' in display_df.columns:
-        format_dict['Debt to Equity'] = "{:.2f}"
-    if 'ROE' in display_df.columns:
-        format_dict['ROE'] = "{:.2%}"
-    if 'ROA' in display_df.columns:
-        format_dict['ROA'] = "{:.2%}"
-    if 'Current Price' in display_df.columns:
-        format_dict['Current Price'] = "{:.2f}"
-    if 'Market Cap' in display_df.columns:
-        # Format market cap in billions
-        display_df['Market Cap (B)'] = display_df['Market Cap'].apply(
-            lambda x: f"{x/1e9:.2f}" if pd.notna(x) and x > 0 else "N/A"
-        )
-        display_df = display_df.drop('Market Cap', axis=1)
-    
-    return display_df.style.format(format_dict)
+def load_backtest_prices(tickers, start):
+    """Daily closes for the backtest universe, read from the shared price matrix"""
+    with timed("screener.backtest_prices", "fetch"):
+        matrix = ensure_matrix(tickers, start)
+        if matrix is None:
+            return pd.DataFrame()
+        return price_frame(matrix, 'Close', tickers, start=start)
+
+def parse_values(text):
+    """Parse a comma separated list of numbers"""
+    return [float(x) for x in text.split(",") if x.strip()]
+
+def render_backtest(filters, stock_list):
+    """Backtest the current screening rules on stored snapshots"""
+    with st.expander("🧪 ทดสอบเกณฑ์ย้อนหลัง (Backtest)"):
+        st.caption("ใช้ข้อมูลปัจจัยพื้นฐานย้อนหลังที่บันทึกไว้และ RSI/SMA50 ที่คำนวณจากราคา ณ วันปรับพอร์ต "
+                   "เลือกหุ้นที่ผ่านเกณฑ์ทุกรอบการปรับพอร์ต แล้วถือแบบน้ำหนักเท่ากัน "
+                   f"(Sharpe Ratio หักอัตราผลตอบแทนที่ไม่มีความเสี่ยง {RISK_FREE_RATE:.0%} ต่อปี)")
+        col1, col2 = st.columns(2)
+        with col1:
+            freq_label = st.selectbox("ปรับพอร์ตทุก", ["เดือน", "ไตรมาส", "สัปดาห์"])
+        with col2:
+            start = st.date_input("เริ่มทดสอบ", value=(pd.Timestamp.now() - pd.DateOffset(years=3)).date())
+        freq = {"เดือน": "M", "ไตรมาส": "Q", "สัปดาห์": "W"}[freq_label]
+        
+        grid_active = st.checkbox("ทดสอบหลายเกณฑ์พร้อมกัน (Grid)")
+        if grid_active:
+            pe_values = st.text_input("PE Ratio สูงสุด (คั่นด้วย ,)", "10,15,20,25")
+            roe_values = st.text_input("ROE ขั้นต่ำ % (คั่นด้วย ,)", "5,10,15")
+        
+        if not st.button("▶️ เริ่มทดสอบ"):
+            return
+        
+        history = load_history(start=start)
+        history = history[history['Ticker'].isin(stock_list)]
+        if history.empty:
+            st.warning("ยังไม่มีข้อมูลปัจจัยพื้นฐานย้อนหลังในช่วงเวลาที่เลือก")
+            return
+        
+        with st.spinner('กำลังดาวน์โหลดราคาหุ้น...'):
+            # โหลดราคาก่อนวันเริ่มเพิ่ม เพื่อให้อินดิเคเตอร์มีค่าตั้งแต่รอบแรก
+            prices = load_backtest_prices(tuple(sorted(history['Ticker'].unique())),
+                                          pd.Timestamp(start) - INDICATOR_WARMUP)
+        if prices.empty:
+            st.error("ไม่สามารถดาวน์โหลดราคาหุ้นได้")
+            return
+        
+        with timed("backtest.prepare"):
+            prepared = prepare(prices, history, freq)
+        if len(prepared['dates']) < 2:
+            st.warning("ช่วงข้อมูลสั้นเกินไปสำหรับการทดสอบ")
+            return
+        
+        if grid_active:
+            try:
+                grid = make_filter_grid(filters, pe_ratio=parse_values(pe_values), roe=parse_values(roe_values))
+            except ValueError:
+                st.error("กรุณาใส่ตัวเลขคั่นด้วย ,")
+                return
+            with st.spinner(f'กำลังทดสอบ {len(grid)} เกณฑ์...'), timed("backtest.run_grid"):
+                results = run_grid(prepared, grid, workers=4 if len(grid) > 200 else 1)
+            st.dataframe(results.sort_values("Sharpe Ratio", ascending=False), use_container_width=True)
+        else:
+            with timed("backtest.run_rule"):
+                result = run_rule(prepared, filters)
+            st.line_chart(result['equity'])
+            st.write(pd.DataFrame(result['stats'], index=["Backtest"]).T)
 
 def main():
     """Main application function"""
@@ -265,6 +272,62 @@ def main():
             filters['roa'] = None
         
         st.markdown("---")
+        st.subheader("เกณฑ์ทางเทคนิค")
+        
+        # RSI filter
+        filters['rsi_active'] = st.checkbox("RSI (14)")
+        if filters['rsi_active']:
+            filters['rsi_max'] = st.number_input(
+                "RSI (มากสุด)",
+                min_value=0.0,
+                max_value=100.0,
+                value=30.0,
+                step=1.0,
+                help="RSI ต่ำกว่า 30 มักถือว่าอยู่ในภาวะขายมากเกินไป (Oversold)"
+            )
+        else:
+            filters['rsi_max'] = None
+        
+        # Distance from SMA50 filter
+        filters['sma_active'] = st.checkbox("ราคาเทียบ SMA50")
+        if filters['sma_active']:
+            filters['sma_gap'] = st.number_input(
+                "ราคาเหนือ SMA50 อย่างน้อย (%)",
+                value=0.0,
+                step=0.5,
+                help="ค่าติดลบหมายถึงยอมให้ราคาอยู่ต่ำกว่า SMA50 ได้"
+            )
+        else:
+            filters['sma_gap'] = None
+        
+        st.markdown("---")
+        st.subheader("การค้นหาเพิ่มเติม")
+        
+        # Top-N filter
+        top_n_active = st.checkbox("เฉพาะ Top-N")
+        if top_n_active:
+            top_n_column = st.selectbox("Top-N ตาม", INDEX_COLUMNS, index=len(INDEX_COLUMNS) - 1)
+            top_n = st.number_input("จำนวน (N)", min_value=1, value=10, step=1)
+            top_n_largest = st.radio("เลือกค่า", ["มากสุด", "น้อยสุด"], horizontal=True) == "มากสุด"
+        
+        # Percentile rank within sector
+        rank_columns = st.multiselect(
+            "เปอร์เซ็นไทล์ในกลุ่มอุตสาหกรรม",
+            INDEX_COLUMNS,
+            help="แสดงอันดับเปอร์เซ็นไทล์ของหุ้นเทียบกับหุ้นในกลุ่มอุตสาหกรรมเดียวกัน"
+        )
+        
+        st.markdown("---")
+        if has_full_listing():
+            universe = st.radio("ชุดหุ้น", ["SET50", "ทั้งตลาด (SET + mai)"])
+        else:
+            # ไฟล์รายชื่อมีแค่ SET50 โหมดทั้งตลาดจะได้ผลเหมือนกัน จึงยังไม่แสดง
+            universe = "SET50"
+            st.caption("ชุดหุ้น: SET50 (เพิ่มรายชื่อทั้งตลาดใน data/symbols.csv เพื่อสกรีนทั้งตลาด)")
+        as_of_active = st.checkbox("ใช้ข้อมูลย้อนหลัง (ณ วันที่)")
+        as_of = None
+        if as_of_active:
+            as_of = st.date_input("ข้อมูล ณ วันที่", value=pd.Timestamp.now().date())
         refresh_button = st.button("🔄 รีเฟรชข้อมูล", use_container_width=True)
     
     # Main content area
@@ -278,23 +341,75 @@ def main():
             st.info("กรุณารอจนข้อมูลโหลดเสร็จแล้วกดดาวน์โหลดใหม่")
     
     # Load data
-    if 'stock_data' not in st.session_state or refresh_button:
-        with st.spinner('กำลังดาวน์โหลดข้อมูลหุ้น...'):
-            stock_data = load_all_stock_data(stocks)
-            st.session_state.stock_data = stock_data
-            st.success(f"ดาวน์โหลดข้อมูลเสร็จสิ้น! ทั้งหมด {len(stock_data)} หุ้น")
-    else:
-        stock_data = st.session_state.stock_data
+    try:
+        if refresh_button:
+            # Pick up index rebalances written to the symbol file
+            refresh_universe()
+        if universe == "SET50":
+            stock_list = list(index_members("SET50"))
+        else:
+            stock_list = list(get_universe()["tickers"])
+    except OSError as e:
+        st.error(f"ไม่สามารถอ่านไฟล์รายชื่อหุ้นได้: {str(e)}")
+        return
+    
+    source = (universe, as_of)
+    if ('stock_table' not in st.session_state or refresh_button
+            or st.session_state.get('stock_source') != source):
+        if as_of is not None:
+            # Point-in-time mode: read the stored snapshot instead of live data
+            snapshot_date, table = load_snapshot(as_of)
+            if snapshot_date is None:
+                st.error("ไม่พบข้อมูลย้อนหลัง ณ วันที่เลือก")
+                return
+            table = table[table['Ticker'].isin(stock_list)].reset_index(drop=True)
+            st.session_state.snapshot_date = snapshot_date
+        else:
+            with st.spinner('กำลังดาวน์โหลดข้อมูลหุ้น...'):
+                stock_data = load_all_stock_data(stock_list)
+                # Build the typed columnar table once per data refresh
+                with timed("screener.build_table"):
+                    table = build_fundamentals_table(stock_data)
+                try:
+                    append_snapshot(table)
+                except Exception as e:
+                    st.warning(f"ไม่สามารถบันทึกข้อมูลย้อนหลังได้: {str(e)}")
+                st.success(f"ดาวน์โหลดข้อมูลเสร็จสิ้น! ทั้งหมด {len(stock_data)} หุ้น")
+        st.session_state.stock_source = source
+        st.session_state.stock_table = table
+        with timed("screener.build_index"):
+            st.session_state.stock_index = build_screen_index(table)
+            st.session_state.stock_display = build_display_table(table)
     
-    # Create DataFrame
-    df = pd.DataFrame(stock_data)
+    if as_of is not None:
+        st.info(f"แสดงข้อมูล ณ วันที่ {st.session_state.snapshot_date:%Y-%m-%d}")
+    
+    df = st.session_state.stock_table
+    index = st.session_state.stock_index
     
     if df.empty:
         st.error("ไม่สามารถดาวน์โหลดข้อมูลหุ้นได้")
         return
     
-    # Apply filters
-    filtered_df = apply_filters(df, filters)
+    # Apply filters with binary searches over the precomputed indexes
+    with timed("screener.apply_filters"):
+        positions = query_positions(index, filters)
+    if any(filters.get(rule[0]) for rule in TECHNICAL_RULES):
+        with st.spinner('กำลังคำนวณอินดิเคเตอร์...'):
+            technical = load_technical_table(tuple(df['Ticker']))
+        if technical.empty:
+            st.warning("ไม่สามารถคำนวณเกณฑ์ทางเทคนิคได้")
+        else:
+            technical = technical.reindex(df['Ticker'])
+            technical_mask = criteria_mask(technical, filters, len(df), TECHNICAL_RULES)
+            positions = positions[technical_mask[positions]]
+    if top_n_active:
+        positions = top_n_positions(index, top_n_column, int(top_n), top_n_largest, within=positions)
+    filtered_df = df.iloc[positions]
+    for column in rank_columns:
+        filtered_df = filtered_df.assign(
+            **{column + PERCENTILE_SUFFIX: index["sector_rank"][column][positions]}
+        )
     
     # Display results
     st.markdown(f"**จำนวนหุ้นที่ผ่านการกรอง: {len(filtered_df)} จาก {len(df)} หุ้น**")
@@ -302,15 +417,30 @@ def main():
     if filtered_df.empty:
         st.warning("ไม่มีหุ้นที่ผ่านเกณฑ์การกรองที่กำหนด กรุณาปรับเกณฑ์ใหม่")
     else:
-        # Display formatted table
-        formatted_df = format_dataframe(filtered_df)
-        st.dataframe(formatted_df, height=600, use_container_width=True)
+        # Sort and paginate on the server, only one page is sent to the browser
+        sort_col1, sort_col2, sort_col3, sort_col4 = st.columns(4)
+        with sort_col1:
+            sort_by = st.selectbox("เรียงตาม", list(filtered_df.columns), index=0)
+        with sort_col2:
+            ascending = st.radio("ลำดับ", ["น้อยไปมาก", "มากไปน้อย"], horizontal=True) == "น้อยไปมาก"
+        with sort_col3:
+            page_size = st.selectbox("แถวต่อหน้า", [25, 50, 100], index=1)
+        with sort_col4:
+            n_pages = max(1, -(-len(filtered_df) // page_size))
+            page = st.number_input("หน้า", min_value=1, max_value=n_pages, value=1, step=1,
+                                   help=f"ทั้งหมด {n_pages} หน้า")
         
-        # Download button
-        csv_data = filtered_df.to_csv(index=False, encoding='utf-8-sig')
+        with timed("screener.sort_and_page"):
+            page_df = sort_and_page(filtered_df, sort_by, ascending, int(page), page_size)
+        
+        # Display the pre-formatted rows of this page only
+        st.dataframe(display_rows(st.session_state.stock_display, page_df),
+                     height=600, use_container_width=True)
+        
+        # Download button, the CSV is only generated when the button is clicked
         st.download_button(
             label="📥 ดาวน์โหลดผลการสกรีน (CSV)",
-            data=csv_data,
+            data=lambda: write_csv(filtered_df),
             file_name=f'screened_stocks_{pd.Timestamp.now().strftime("%Y%m%d_%H%M")}.csv',
             mime='text/csv',
             use_container_width=True
@@ -335,7 +465,11 @@ def main():
             with col4:
                 avg_roa = filtered_df['ROA'].mean()
                 st.metric("ROA เฉลี่ย", f"{avg_roa:.2%}" if pd.notna(avg_roa) else "N/A")
+    
+    render_backtest(filters, stock_list)
 
 # Run the application
 if __name__ == "__main__":
+    begin_run("screener")
     main()
+    render_debug_panel()
@@ -1,12 +1,20 @@
 import streamlit as st
 from datetime import date
-import yfinance as yf 
 from prophet import Prophet
 from prophet.plot import plot_plotly
 from plotly import graph_objects as go
 import pandas as pd
 import plotly.express as px
 import numpy as np
+from analytics.bars import FREQUENCY_CHOICES, load_intraday, periods_per_year
+from analytics.charting import downsample, window
+from analytics.correlation import average_correlation, cluster, covariance_matrices, rolling_correlation
+from analytics.market_calendar import MAX_ENTRY_AGE, intraday_cache_epoch
+from analytics.metrics import begin_run, cached, render_debug_panel, timed
+from analytics.performance import relativereturn
+from analytics.price_matrix import ensure_matrix, price_frame
+from analytics.providers import get_provider
+from analytics.universe import BENCHMARK_TICKERS, index_members
 
 # CSS Styling
 streamlit_style = """
@@ -39,39 +47,21 @@ st.markdown(css_string, unsafe_allow_html=True)
 st.title("เปรียบเทียบหุ้น")
 
 # Stock list
-stocks = ('^SET.BK','ADVANC.BK', 'AOT.BK', 'AWC.BK', 'BANPU.BK', 'BBL.BK', 'BDMS.BK', 'BEM.BK', 
-         'BGRIM.BK', 'BH.BK', 'BTS.BK', 'CBG.BK', 'CENTEL.BK', 'COM7.BK', 'CPALL.BK', 'CPF.BK', 
-         'CPN.BK', 'CRC.BK', 'DELTA.BK', 'EA.BK', 'EGCO.BK', 'GLOBAL.BK', 'GPSC.BK', 'GULF.BK', 
-         'HMPRO.BK', 'INTUCH.BK', 'IVL.BK', 'KBANK.BK', 'KCE.BK', 'KTB.BK', 'KTC.BK', 'LH.BK', 
-         'MINT.BK', 'MTC.BK', 'OR.BK', 'OSP.BK', 'PTT.BK', 'PTTEP.BK', 'PTTGC.BK', 'RATCH.BK', 
-         'SAWAD.BK', 'SCB.BK', 'SCC.BK', 'SCGP.BK', 'TISCO.BK', 'TLI.BK', 'TOP.BK', 'TRUE.BK', 
-         'TTB.BK', 'TU.BK', 'WHA.BK')
+stocks = BENCHMARK_TICKERS + index_members("SET50")
 
 # User inputs
 dropdown = st.multiselect('เลือกหุ้นที่ต้องการเปรียบเทียบ', options=stocks)
 start = st.date_input('วันที่เริ่ม', value=pd.to_datetime('2019-01-01'))
 end = st.date_input('วันที่ล่าสุด', value=pd.to_datetime('today'))
+frequency = st.radio('ความถี่ข้อมูล', list(FREQUENCY_CHOICES), horizontal=True,
+                     help="ข้อมูลระหว่างวันใช้ได้ตั้งแต่วันที่เริ่มเก็บข้อมูลในเครื่อง (Yahoo ให้ย้อนหลังได้ไม่กี่สัปดาห์)")
+interval = FREQUENCY_CHOICES[frequency]
 
-def relativereturn(df):
+def relative_return(df):
     """Calculate relative return with proper error handling"""
     try:
-        if df is None or df.empty:
-            return pd.DataFrame()
-        
-        # Convert to DataFrame if Series
-        if isinstance(df, pd.Series):
-            df = df.to_frame()
-        
-        # Calculate percentage change
-        rel = df.pct_change()
-        
-        # Calculate cumulative returns
-        cumret = (1 + rel).cumprod() - 1
-        
-        # Fill NaN values with 0
-        cumret = cumret.fillna(0)
-        
-        return cumret
+        with timed("compare.relativereturn"):
+            return relativereturn(df)
     except Exception as e:
         st.error(f"เกิดข้อผิดพลาดในการคำนวณผลตอบแทน: {str(e)}")
         return pd.DataFrame()
@@ -83,7 +73,7 @@ def safe_download_data(tickers, start_date, end_date):
             return None
         
         # Download data
-        data = yf.download(tickers, start=start_date, end=end_date, progress=False)
+        data = get_provider().download(tickers, start=start_date, end=end_date)
         
         if data.empty:
             st.warning("ไม่พบข้อมูลสำหรับหุ้นที่เลือก")
@@ -104,6 +94,26 @@ def safe_download_data(tickers, start_date, end_date):
         st.error(f"เกิดข้อผิดพลาดในการดาวน์โหลดข้อมูล: {str(e)}")
         return None
 
+@cached("compare.intraday_prices", st.cache_data(ttl=MAX_ENTRY_AGE, show_spinner=False),
+        key=intraday_cache_epoch)
+def load_intraday_prices(tickers, interval, start_date):
+    """Intraday closes from the local bar store, topped up from the provider"""
+    frames = load_intraday(list(tickers), interval, start=start_date)
+    return pd.DataFrame({ticker: frame['Close'] for ticker, frame in frames.items()}).sort_index()
+
+def safe_intraday_data(tickers, interval, start_date, end_date):
+    """Safely load intraday closes with error handling"""
+    try:
+        data = load_intraday_prices(tuple(tickers), interval, start_date)
+        data = data[data.index < pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+        if data.empty:
+            st.warning("ไม่พบข้อมูลระหว่างวันสำหรับหุ้นที่เลือกในช่วงเวลานี้")
+            return None
+        return data
+    except Exception as e:
+        st.error(f"เกิดข้อผิดพลาดในการโหลดข้อมูลระหว่างวัน: {str(e)}")
+        return None
+
 def get_financial_ratios(tickers):
     """Get financial ratios with proper error handling"""
     ratios = {}
@@ -119,7 +129,7 @@ def get_financial_ratios(tickers):
             status_text.text(f'กำลังดาวน์โหลดข้อมูล {ticker}...')
             progress_bar.progress((i + 1) / len(tickers))
             
-            stock_info = yf.Ticker(ticker).info
+            stock_info = get_provider().info(ticker)
             
             # Safely get values with default fallback
             def safe_get(key, default='N/A'):
@@ -195,6 +205,93 @@ def create_ratio_chart(ratios_df, ratio_col):
     except Exception as e:
         st.error(f"เกิดข้อผิดพลาดในการสร้างกราฟ: {str(e)}")
 
+def plot_matrix(matrix, title, order=None, zrange=(None, None)):
+    """Heatmap of a correlation or covariance matrix, optionally reordered"""
+    if order is not None:
+        matrix = matrix.iloc[order, order]
+    fig = px.imshow(matrix, color_continuous_scale='RdBu_r', zmin=zrange[0], zmax=zrange[1],
+                    aspect='auto', title=title)
+    st.plotly_chart(fig, use_container_width=True)
+
+def visible(frame, key):
+    """Rows inside the range picked on a date slider, decimated to the chart width"""
+    if frame.empty:
+        return frame
+    first, last = frame.index[0].to_pydatetime(), frame.index[-1].to_pydatetime()
+    if first == last:
+        return frame
+    # ข้อมูลระหว่างวันต้องเลือกได้ถึงระดับนาที
+    date_format = "YYYY-MM-DD" if interval is None else "YYYY-MM-DD HH:mm"
+    view_start, view_end = st.slider("ช่วงเวลาที่แสดง", min_value=first, max_value=last,
+                                     value=(first, last), format=date_format, key=key)
+    return downsample(window(frame, view_start, view_end))
+
+def show_correlation(prices, periods=252):
+    """Correlation, covariance and rolling correlation of the selected stocks"""
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    if returns.shape[1] < 2:
+        return
+    
+    st.subheader("ความสัมพันธ์ของผลตอบแทน")
+    with timed("compare.covariance"):
+        cov, corr = covariance_matrices(returns)
+        order = cluster(corr)[0] if returns.shape[1] > 2 else None
+    
+    # จำนวนแท่งต่อวันทำการ (1 สำหรับข้อมูลรายวัน)
+    bars_per_day = max(periods // 252, 1)
+    
+    view = st.radio("แสดง", ["สหสัมพันธ์ (Correlation)", "ความแปรปรวนร่วม (Covariance)"], horizontal=True)
+    if view.startswith("สหสัมพันธ์"):
+        plot_matrix(corr, "สหสัมพันธ์ของผลตอบแทน" + ("รายวัน" if bars_per_day == 1 else "รายแท่ง"),
+                    order, (-1, 1))
+    else:
+        plot_matrix(cov * periods, "ความแปรปรวนร่วมรายปี", order)
+    
+    # หน้าต่างกำหนดเป็นวันทำการแล้วแปลงเป็นจำนวนแท่งตามความถี่ข้อมูล
+    if bars_per_day == 1:
+        days = st.slider("หน้าต่างสหสัมพันธ์เคลื่อนที่ (วันทำการ)", 20, 250, 60, step=10)
+    else:
+        days = st.slider("หน้าต่างสหสัมพันธ์เคลื่อนที่ (วันทำการ)", 1, 20, 5,
+                         help=f"1 วันทำการ = {bars_per_day} แท่ง")
+    with timed("compare.rolling_correlation"):
+        stack = rolling_correlation(returns, days * bars_per_day)
+    tickers = list(returns.columns)
+    pair = st.multiselect("เลือกคู่หุ้น (2 ตัว) หรือเว้นว่างเพื่อดูค่าเฉลี่ยทุกคู่", tickers, max_selections=2)
+    if len(pair) == 2:
+        i, j = tickers.index(pair[0]), tickers.index(pair[1])
+        rolling = pd.Series(stack[:, i, j], index=returns.index, name=f"{pair[0]} / {pair[1]}")
+    else:
+        rolling = average_correlation(stack, returns.index).rename("สหสัมพันธ์เฉลี่ย")
+    st.line_chart(visible(rolling.dropna(), "rolling_view"))
+
+def load_universe_prices(tickers, start_date, end_date):
+    """Closing prices for a whole universe, read from the shared price matrix"""
+    with timed("compare.universe_prices", "fetch"):
+        matrix = ensure_matrix(tickers, start_date)
+        if matrix is None:
+            return pd.DataFrame()
+        return price_frame(matrix, 'Close', tickers, start=start_date, end=end_date)
+
+def show_clustering(start_date, end_date):
+    """Hierarchical clustering of the SET50 universe by return correlation"""
+    with st.expander("🧬 จัดกลุ่มหุ้น SET50 ตามความสัมพันธ์ของราคา"):
+        n_clusters = st.slider("จำนวนกลุ่ม", 2, 10, 5)
+        if not st.button("จัดกลุ่ม"):
+            return
+        universe = index_members("SET50")
+        with st.spinner('กำลังดาวน์โหลดข้อมูลหุ้น SET50...'):
+            prices = load_universe_prices(universe, start_date, end_date)
+        if prices.empty:
+            st.error("ไม่สามารถดาวน์โหลดข้อมูลได้")
+            return
+        returns = prices.pct_change(fill_method=None).iloc[1:].dropna(axis=1, how='all')
+        with timed("compare.clustering"):
+            _, corr = covariance_matrices(returns)
+            order, labels = cluster(corr, n_clusters)
+        plot_matrix(corr, "สหสัมพันธ์ของหุ้น SET50 (เรียงตามกลุ่ม)", order, (-1, 1))
+        groups = pd.DataFrame({'หุ้น': corr.index, 'กลุ่ม': labels}).sort_values(['กลุ่ม', 'หุ้น'])
+        st.dataframe(groups.groupby('กลุ่ม')['หุ้น'].apply(', '.join), use_container_width=True)
+
 def main():
     """Main function to run the app"""
     
@@ -204,20 +301,28 @@ def main():
         
         # Download and process data
         with st.spinner('กำลังดาวน์โหลดข้อมูลราคาหุ้น...'):
-            raw_data = safe_download_data(dropdown, start, end)
+            if interval is None:
+                raw_data = safe_download_data(dropdown, start, end)
+            else:
+                raw_data = safe_intraday_data(dropdown, interval, start, end)
         
         if raw_data is not None:
             # Calculate relative returns
-            df = relativereturn(raw_data)
+            df = relative_return(raw_data)
             
             if not df.empty:
-                # Display line chart
-                st.line_chart(df)
+                # Display line chart; only the visible range is sent, decimated
+                # to the chart width, so narrowing it brings back full resolution
+                st.line_chart(visible(df, "return_view"))
                 
                 # Show summary statistics
                 st.subheader("สถิติสรุป")
                 summary_stats = df.describe()
                 st.dataframe(summary_stats)
+                
+                # Correlation between the selected stocks
+                if isinstance(raw_data, pd.DataFrame) and len(dropdown) > 1:
+                    show_correlation(raw_data, periods_per_year(interval))
             else:
                 st.error("ไม่สามารถคำนวณผลตอบแทนได้")
     
@@ -242,6 +347,8 @@ def main():
         else:
             st.warning("ไม่สามารถดาวน์โหลดข้อมูลการเงินได้")
     
+    show_clustering(start, end)
+    
     # Instructions for users
     if len(dropdown) == 0:
         st.info("กรุณาเลือกหุ้นที่ต้องการเปรียบเทียบ")
@@ -254,4 +361,6 @@ def main():
 
 # Run the application
 if __name__ == "__main__":
+    begin_run("compare")
     main()
+    render_debug_panel()
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import pytest
+
+import analytics.api as api
+
+
+def _get(path, query="", headers=()):
+    """Status, headers and body of one GET request sent straight to the ASGI app."""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(api.app(scope, receive, send))
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+@pytest.fixture
+def graham_calls(monkeypatch):
+    calls = []
+
+    def graham_row(ticker, current_yield=None, **params):
+        calls.append(ticker)
+        return {"Ticker": ticker, "current_yield": current_yield, **params}
+
+    monkeypatch.setattr(api, "graham_row", graham_row)
+    monkeypatch.setattr(api, "get_aaa_yield", lambda: 4.2)
+    monkeypatch.setattr(api, "_responses", {})
+    return calls
+
+
+def test_matching_etag_gets_304(graham_calls):
+    status, headers, body = _get("/graham/PTT.BK", "margin=30")
+    assert status == 200
+    assert json.loads(body)["margin"] == 30
+    assert headers["cache-control"].startswith("public, max-age=")
+
+    etag = headers["etag"]
+    status, headers, body = _get("/graham/PTT.BK", "margin=30", [("If-None-Match", f'"other", {etag}')])
+    assert status == 304
+    assert body == b""
+    assert headers["etag"] == etag
+    # คำตอบที่สองมาจาก cache ไม่ได้คำนวณใหม่
+    assert graham_calls == ["PTT.BK"]
+
+
+def test_stale_etag_gets_the_body(graham_calls):
+    status, _, body = _get("/graham/PTT.BK", headers=[("If-None-Match", '"stale"')])
+    assert status == 200
+    assert json.loads(body)["Ticker"] == "PTT.BK"
+
+
+def test_bad_query_is_a_400(graham_calls):
+    status, _, body = _get("/graham/PTT.BK", "margin=abc")
+    assert status == 400
+    assert "margin" in json.loads(body)["error"]
+    assert graham_calls == []
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.backtest import prepare, run_rule, summarize
+
+
+def _data():
+    dates = pd.bdate_range("2023-01-02", "2024-12-31")
+    steps = np.arange(len(dates))
+    prices = pd.DataFrame({
+        # ขึ้นต่อเนื่อง: อยู่เหนือ SMA50 เสมอ
+        "UP.BK": 10 * 1.001 ** steps,
+        # ลงต่อเนื่อง: อยู่ใต้ SMA50 เสมอ
+        "DOWN.BK": 10 * 0.999 ** steps,
+    }, index=dates)
+    history = pd.DataFrame({
+        "Date": [pd.Timestamp("2023-06-01")] * 2,
+        "Ticker": ["UP.BK", "DOWN.BK"],
+        "PE Ratio": [12.0, 8.0],
+        "PB Ratio": [1.0, 1.0],
+        "Debt to Equity": [50.0, 50.0],
+        "ROE": [0.1, 0.1],
+        "ROA": [0.05, 0.05],
+    })
+    return prices, history
+
+
+def test_sharpe_subtracts_the_risk_free_rate():
+    returns = pd.Series([0.02, -0.01, 0.03, 0.01])
+    stats = summarize(returns, 12, risk_free_rate=0.05)
+    excess = stats["Annualized Return (%)"] / 100 - 0.05
+    assert stats["Sharpe Ratio"] == pytest.approx(excess / (stats["Annualized Volatility (%)"] / 100))
+    assert summarize(returns, 12, risk_free_rate=0.0)["Sharpe Ratio"] > stats["Sharpe Ratio"]
+
+
+def test_fundamental_criteria_select_point_in_time():
+    prices, history = _data()
+    prepared = prepare(prices, history, "M")
+    assert prepared["dates"][0] >= history["Date"].min()
+    result = run_rule(prepared, {"pe_active": True, "pe_ratio": 10})
+    # มีเพียง DOWN.BK ที่ PE ไม่เกิน 10
+    assert (result["holdings"] == 1).all()
+    assert (result["returns"] < 0).all()
+
+
+def test_technical_criteria_are_applied():
+    prices, history = _data()
+    prepared = prepare(prices, history, "M")
+    unfiltered = run_rule(prepared, {})
+    above_sma = run_rule(prepared, {"sma_active": True, "sma_gap": 0})
+    assert (unfiltered["holdings"] == 2).all()
+    assert (above_sma["holdings"] == 1).all()
+    assert (above_sma["returns"] > 0).all()
+    assert above_sma["stats"]["Sharpe Ratio"] > unfiltered["stats"]["Sharpe Ratio"]
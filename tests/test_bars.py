@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from analytics.bars import append_bars, bars_from_frame, load_bars, resample, to_frame
+
+
+def _minute_frame(start="2026-03-02 10:00", n=30, offset=0.0):
+    index = pd.date_range(start, periods=n, freq="min")
+    close = 100 + offset + np.arange(n, dtype=float)
+    return pd.DataFrame({"Open": close - 0.5, "High": close + 1, "Low": close - 1,
+                         "Close": close, "Volume": 10.0}, index=index)
+
+
+def test_append_merges_and_newer_bars_win(tmp_path):
+    root = str(tmp_path)
+    append_bars("PTT.BK", bars_from_frame(_minute_frame()), "1m", root)
+    append_bars("PTT.BK", bars_from_frame(_minute_frame("2026-03-02 10:20", 20, offset=1000)), "1m", root)
+    bars = load_bars("PTT.BK", interval="1m", root=root)
+    assert len(bars) == 40
+    assert (np.diff(bars["time"]) == 60).all()
+    frame = to_frame(bars)
+    assert frame.index[0] == pd.Timestamp("2026-03-02 10:00")
+    assert frame.loc["2026-03-02 10:19", "Close"] == 119
+    assert frame.loc["2026-03-02 10:20", "Close"] == 1100
+
+
+def test_load_bars_cuts_the_range_across_months(tmp_path):
+    root = str(tmp_path)
+    append_bars("PTT.BK", bars_from_frame(_minute_frame("2026-02-27 16:00", 10)), "1m", root)
+    append_bars("PTT.BK", bars_from_frame(_minute_frame("2026-03-02 10:00", 10)), "1m", root)
+    bars = load_bars("PTT.BK", start="2026-02-27 16:05", end="2026-03-02 10:03", interval="1m", root=root)
+    times = to_frame(bars).index
+    assert times[0] == pd.Timestamp("2026-02-27 16:05")
+    assert times[-1] == pd.Timestamp("2026-03-02 10:02")
+    assert len(times) == 8
+
+
+def test_resample_aggregates_on_bangkok_clock():
+    bars = bars_from_frame(_minute_frame())
+    five = to_frame(resample(bars, "5m"))
+    assert list(five.index[:2]) == [pd.Timestamp("2026-03-02 10:00"), pd.Timestamp("2026-03-02 10:05")]
+    first = five.iloc[0]
+    assert (first["Open"], first["High"], first["Low"], first["Close"], first["Volume"]) == (99.5, 105, 99, 104, 50)
+    daily = to_frame(resample(bars, "1d"))
+    assert list(daily.index) == [pd.Timestamp("2026-03-02")]
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from analytics.charting import downsample, lttb_indices, minmax_indices, window
+
+
+def _frame(n=10_000):
+    index = pd.date_range("2000-01-03", periods=n, freq="D")
+    x = np.arange(n)
+    return pd.DataFrame({"A": np.sin(x / 200), "B": np.cos(x / 50)}, index=index)
+
+
+def test_lttb_keeps_ends_and_spikes():
+    y = np.zeros(5_000)
+    y[1234] = 10.0
+    idx = lttb_indices(y, 100)
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert 1234 in idx
+    assert len(idx) <= 100
+    assert (np.diff(idx) > 0).all()
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    y = np.random.default_rng(0).normal(size=4_000)
+    idx = minmax_indices(y, 50)
+    assert y.argmax() in idx and y.argmin() in idx
+    assert len(idx) <= 2 * 50 + 2
+
+
+def test_downsample_shares_rows_and_skips_small_frames():
+    frame = _frame()
+    small = frame.iloc[:500]
+    assert downsample(small) is small
+    chart = downsample(frame, max_points=400)
+    assert len(chart) <= 400
+    assert chart.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(chart, frame.loc[chart.index])
+    assert len(downsample(frame["A"], max_points=300)) <= 300
+
+
+def test_window_then_downsample_restores_resolution():
+    frame = _frame()
+    narrow = window(frame, "2005-01-01", "2005-06-30")
+    assert narrow.index[0] == pd.Timestamp("2005-01-01")
+    assert narrow.index[-1] == pd.Timestamp("2005-06-30")
+    pd.testing.assert_frame_equal(downsample(narrow), narrow)
+    by_column = window(frame.reset_index(names="Date"), end="2000-01-10", column="Date")
+    assert len(by_column) == 8
+
+
+def test_downsample_accepts_a_timezone_aware_index():
+    frame = _frame()
+    local = frame.tz_localize("Asia/Bangkok")
+    chart = downsample(local, max_points=400)
+    assert chart.index.tz is not None
+    pd.testing.assert_frame_equal(chart.tz_localize(None), downsample(frame, max_points=400))
+    start, end = (pd.Timestamp(day, tz="Asia/Bangkok") for day in ("2005-01-01", "2005-01-31"))
+    narrow = window(local, start, end)
+    assert len(narrow) == 31
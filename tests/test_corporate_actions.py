@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from analytics.corporate_actions import extend_total_return, load_actions, total_return_frame
+from analytics.dca import simulate_dca
+from analytics.providers import DataProvider
+
+
+def _actions(close, dividends=None, splits=None, start="2024-01-01"):
+    index = pd.bdate_range(start, periods=len(close))
+    return pd.DataFrame({
+        "Close": close,
+        "Dividends": dividends if dividends is not None else 0.0,
+        "Stock Splits": splits if splits is not None else 0.0,
+    }, index=index)
+
+
+def _empty():
+    return pd.DataFrame(columns=["Close", "Dividends", "Stock Splits", "Total Return"], dtype=float)
+
+
+def test_incremental_extension_equals_a_full_build():
+    close = np.linspace(10, 12, 40)
+    dividends = np.zeros(40)
+    dividends[[10, 30]] = 0.5
+    actions = _actions(close, dividends)
+    full = extend_total_return(_empty(), actions)
+    stepwise = extend_total_return(extend_total_return(_empty(), actions.iloc[:25]), actions.iloc[20:])
+    pd.testing.assert_frame_equal(stepwise, full)
+    assert full["Total Return"].iloc[-1] > full["Close"].iloc[-1]
+
+
+def test_split_rescales_the_stored_rows():
+    before = _actions([20.0, 22.0, 24.0])
+    stored = extend_total_return(_empty(), before)
+    after = _actions([12.5, 13.0], splits=[2.0, 0.0], start="2024-01-04")
+    extended = extend_total_return(stored, after)
+    # ผลเหมือนดาวน์โหลดประวัติที่ปรับการแตกพาร์แล้วทั้งหมด
+    adjusted = extend_total_return(_empty(), _actions([10.0, 11.0, 12.0, 12.5, 13.0]))
+    np.testing.assert_allclose(extended["Close"], adjusted["Close"])
+    np.testing.assert_allclose(extended["Total Return"], adjusted["Total Return"])
+
+
+class _Provider(DataProvider):
+    def __init__(self, actions):
+        self.frame = actions
+        self.starts = []
+
+    def actions(self, ticker, start=None):
+        self.starts.append(pd.Timestamp(start))
+        return self.frame[self.frame.index >= pd.Timestamp(start)]
+
+
+def test_total_return_frame_fetches_only_new_days(tmp_path):
+    actions = _actions(np.linspace(10, 11, 30), np.r_[np.zeros(15), 0.3, np.zeros(14)])
+    provider = _Provider(actions.iloc[:20])
+    total_return_frame("PTT.BK", provider=provider, root=str(tmp_path))
+    provider.frame = actions
+    frame = total_return_frame("PTT.BK", start="2024-01-10", provider=provider, root=str(tmp_path))
+    assert provider.starts[-1] == actions.index[19]
+    assert len(load_actions("PTT.BK", str(tmp_path))) == 30
+    assert frame["Total Return"].iloc[0] == frame["Close"].iloc[0]
+
+
+def test_dca_reinvests_or_keeps_dividends():
+    actions = _actions(np.full(80, 10.0), np.r_[np.zeros(30), 1.0, np.zeros(49)])
+    cash = simulate_dca(actions, 100, 3, "2024-01-01", reinvest_dividends=False)
+    reinvested = simulate_dca(actions, 100, 3, "2024-01-01", reinvest_dividends=True)
+    assert list(cash["Total Invested"]) == [100, 200, 300]
+    # ถือ 20 หุ้นตอนขึ้น XD ได้ปันผล 20 บาท
+    assert cash["Dividends"].iloc[-1] == 20
+    assert cash["Portfolio Value"].iloc[-1] == 320
+    assert reinvested["Dividends"].iloc[-1] == 0
+    assert reinvested["Portfolio Value"].iloc[-1] == 320
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from analytics.correlation import average_correlation, cluster, covariance_matrices, rolling_correlation
+
+
+def _returns(n=200, seed=1):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(0, 0.01, n)
+    returns = pd.DataFrame({
+        "A": base + rng.normal(0, 0.002, n),
+        "B": base + rng.normal(0, 0.002, n),
+        "C": rng.normal(0, 0.01, n),
+    }, index=pd.bdate_range("2024-01-01", periods=n))
+    returns.iloc[:30, 2] = np.nan
+    return returns
+
+
+def test_covariance_matches_pandas_pairwise():
+    returns = _returns()
+    cov, corr = covariance_matrices(returns)
+    pd.testing.assert_frame_equal(cov, returns.cov())
+    pd.testing.assert_frame_equal(corr, returns.corr())
+
+
+def test_rolling_matches_pandas():
+    returns = _returns().iloc[40:]
+    stack = rolling_correlation(returns, 20)
+    expected = returns["A"].rolling(20).corr(returns["C"])
+    np.testing.assert_allclose(stack[:, 0, 2], expected, rtol=1e-4, atol=1e-5)
+    average = average_correlation(stack, returns.index)
+    assert average.iloc[:19].isna().all()
+    assert average.iloc[19:].notna().all()
+
+
+def test_cluster_groups_correlated_names():
+    _, corr = covariance_matrices(_returns())
+    order, labels = cluster(corr, 2)
+    assert sorted(order) == [0, 1, 2]
+    assert labels[0] == labels[1] != labels[2]
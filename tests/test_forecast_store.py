@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+
+import analytics.forecast_store as forecast_store
+
+
+def _train(end="2026-06-30", n=60):
+    return pd.DataFrame({"ds": pd.date_range(end=end, periods=n), "y": [float(i) for i in range(n)]})
+
+
+def _fake_fits(calls):
+    def forecast_many(frames, period, workers=None):
+        calls.append((sorted(frames), period))
+        forecasts = {}
+        for ticker, df_train in frames.items():
+            ds = pd.date_range(df_train["ds"].iloc[0], df_train["ds"].iloc[-1] + pd.Timedelta(days=period))
+            forecasts[ticker] = pd.DataFrame({"ds": ds, "yhat": 1.0, "yhat_lower": 0.5, "yhat_upper": 1.5})
+        return forecasts, {}
+    return forecast_many
+
+
+def test_fits_once_for_the_longest_horizon_and_slices(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(forecast_store, "forecast_many", _fake_fits(calls))
+    root = str(tmp_path)
+    frames = {"PTT.BK": _train()}
+
+    first, errors = forecast_store.stored_forecasts(frames, 30, root=root)
+    assert errors == {}
+    assert calls == [(["PTT.BK"], forecast_store.MAX_HORIZON_DAYS)]
+    assert first["PTT.BK"]["ds"].iloc[-1] == pd.Timestamp("2026-07-30")
+
+    longer, _ = forecast_store.stored_forecasts(frames, 365, root=root)
+    assert len(calls) == 1
+    assert longer["PTT.BK"]["ds"].iloc[-1] == pd.Timestamp("2027-06-30")
+
+
+def test_new_training_data_replaces_the_stored_forecast(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(forecast_store, "forecast_many", _fake_fits(calls))
+    root = str(tmp_path)
+    forecast_store.stored_forecasts({"PTT.BK": _train()}, 30, root=root)
+    forecast_store.stored_forecasts({"PTT.BK": _train("2026-07-01")}, 30, root=root)
+    assert len(calls) == 2
+    directory = os.path.join(root, forecast_store.MODEL_VERSION, "PTT.BK")
+    assert len(os.listdir(directory)) == 1
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics.forecasting as forecasting
+from analytics.forecasting import forecast_many, rank_forecasts, training_frames
+
+
+def _prices():
+    dates = pd.bdate_range("2025-01-01", periods=40)
+    prices = pd.DataFrame({
+        "UP.BK": np.linspace(10, 14, 40),
+        "DOWN.BK": np.linspace(20, 18, 40),
+        "SHORT.BK": np.r_[np.full(30, np.nan), np.linspace(5, 6, 10)],
+    }, index=dates)
+    prices.iloc[5, 0] = np.nan
+    prices.iloc[6, 0] = 0.0
+    return prices
+
+
+def _stub_fit(job):
+    """Linear trend in place of Prophet: continues the last daily change."""
+    ticker, df_train, period = job
+    if ticker == "FAIL.BK":
+        raise RuntimeError("fit failed")
+    slope = df_train["y"].iloc[-1] - df_train["y"].iloc[-2]
+    ds = pd.date_range(df_train["ds"].iloc[-1], periods=period + 1)[1:]
+    yhat = df_train["y"].iloc[-1] + slope * np.arange(1, period + 1)
+    return ticker, pd.DataFrame({"ds": ds, "yhat": yhat, "yhat_lower": yhat - 1, "yhat_upper": yhat + 1})
+
+
+def test_training_frames_drop_invalid_rows_and_short_series():
+    frames = training_frames(_prices())
+    assert list(frames) == ["UP.BK", "DOWN.BK"]
+    up = frames["UP.BK"]
+    assert list(up.columns) == ["ds", "y"]
+    assert len(up) == 38
+    assert (up["y"] > 0).all()
+    assert up["ds"].iloc[0] == pd.Timestamp("2025-01-01")
+    assert "SHORT.BK" in training_frames(_prices(), min_rows=10)
+
+
+def test_forecast_many_keeps_order_and_errors(monkeypatch):
+    monkeypatch.setattr(forecasting, "fit_forecast", _stub_fit)
+    frames = training_frames(_prices())
+    frames = {"FAIL.BK": frames["UP.BK"], **frames}
+    forecasts, errors = forecast_many(frames, 10, workers=1)
+    assert list(forecasts) == ["UP.BK", "DOWN.BK"]
+    assert errors == {"FAIL.BK": "fit failed"}
+    assert all(len(forecast) == 10 for forecast in forecasts.values())
+
+
+def test_rank_forecasts_orders_by_predicted_return(monkeypatch):
+    monkeypatch.setattr(forecasting, "fit_forecast", _stub_fit)
+    frames = training_frames(_prices())
+    forecasts, _ = forecast_many(frames, 10, workers=1)
+    table = rank_forecasts(frames, forecasts)
+    assert list(table["Ticker"]) == ["UP.BK", "DOWN.BK"]
+    up = table.iloc[0]
+    assert up["Predicted Return (%)"] == pytest.approx((forecasts["UP.BK"]["yhat"].iloc[-1] / 14 - 1) * 100)
+    assert up["Lower (%)"] < up["Predicted Return (%)"] < up["Upper (%)"]
+    assert table.iloc[1]["Predicted Return (%)"] < 0
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from analytics.indicators import compute_indicators, latest_values, update_indicators
+
+
+def _prices(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2024-01-01", periods=n)
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n, 3)), axis=0)),
+                         index=dates, columns=["A.BK", "B.BK", "C.BK"])
+    close.iloc[:10, 2] = np.nan  # เข้าตลาดทีหลัง
+    high, low = close * 1.01, close * 0.99
+    return close, high, low
+
+
+def test_matches_pandas_definitions():
+    close, high, low = _prices()
+    indicators, _ = compute_indicators(close, high, low)
+    pd.testing.assert_frame_equal(indicators["SMA20"], close.rolling(20).mean())
+    rsi = indicators["RSI14"].stack().dropna()
+    assert ((rsi >= 0) & (rsi <= 100)).all()
+    assert indicators["RSI14"]["C.BK"].iloc[:24].isna().all()
+    assert "ATR14" in indicators
+
+
+def test_update_matches_a_full_recompute():
+    close, high, low = _prices()
+    full, _ = compute_indicators(close, high, low)
+    head, state = compute_indicators(close.iloc[:100], high.iloc[:100], low.iloc[:100])
+    updated, _ = update_indicators(head, state, close.iloc[100:], high.iloc[100:], low.iloc[100:])
+    for name, frame in full.items():
+        pd.testing.assert_frame_equal(updated[name], frame, check_freq=False, rtol=1e-9, obj=name)
+
+
+def test_latest_values_adds_distance_from_sma50():
+    close, _, _ = _prices()
+    indicators, _ = compute_indicators(close)
+    latest = latest_values(indicators, close)
+    expected = (close.iloc[-1] / indicators["SMA50"].iloc[-1] - 1) * 100
+    np.testing.assert_allclose(latest["% จาก SMA50"], expected, rtol=1e-5)
+    assert (latest.dtypes == np.float32).all()
@@ -0,0 +1,63 @@
+import warnings
+from datetime import date, datetime
+
+import pytest
+
+import analytics.market_calendar as market_calendar
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    monkeypatch.setattr(market_calendar, "_holidays", frozenset({date(2026, 12, 31)}))
+    monkeypatch.setattr(market_calendar, "_holiday_years", frozenset({2026}))
+    monkeypatch.setattr(market_calendar, "_warned_years", set())
+    return market_calendar
+
+
+def test_covered_year_uses_the_holiday_file(calendar):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert not calendar.is_trading_day(date(2026, 12, 31))
+        assert calendar.is_trading_day(date(2026, 12, 30))
+        assert not calendar.is_trading_day(date(2026, 12, 26))
+
+
+def test_missing_year_warns_once_and_falls_back_to_weekdays(calendar):
+    with pytest.warns(RuntimeWarning, match="2027"):
+        assert calendar.is_trading_day(date(2027, 1, 1))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert not calendar.is_trading_day(date(2027, 1, 2))
+
+
+def test_bundled_file_loads():
+    days = market_calendar.load_holidays()
+    assert date(2026, 12, 31) in days
+
+
+def _at(text):
+    return datetime.fromisoformat(text).replace(tzinfo=market_calendar._TZ)
+
+
+def test_epoch_holds_overnight_across_a_holiday_and_the_weekend():
+    # 2026-10-23 (ศุกร์) เป็นวันหยุดในไฟล์ ตลาดปิดตั้งแต่เย็นวันพฤหัสถึงเช้าวันจันทร์
+    after_close = market_calendar.cache_epoch(_at("2026-10-22T17:30"))
+    assert after_close == "closed:2026-10-22T17:10"
+    for moment in ("2026-10-22T23:59", "2026-10-23T11:00", "2026-10-24T12:00", "2026-10-26T09:59"):
+        assert market_calendar.cache_epoch(_at(moment)) == after_close, moment
+    assert market_calendar.seconds_until_change(_at("2026-10-22T17:30")) == (3 * 24 + 16) * 3600 + 30 * 60
+
+
+def test_epoch_changes_at_session_open_and_close():
+    cache_epoch = market_calendar.cache_epoch
+    morning = cache_epoch(_at("2026-10-26T10:00"))
+    assert morning.startswith("open:")
+    assert cache_epoch(_at("2026-10-26T10:59")) == morning
+    assert cache_epoch(_at("2026-10-26T11:00")) != morning
+    # พักกลางวัน: ปิดเมื่อครบเวลาเผื่อหลังภาคเช้า แล้วคงที่จนเปิดภาคบ่าย
+    lunch = cache_epoch(_at("2026-10-26T13:00"))
+    assert lunch == "closed:2026-10-26T13:00"
+    assert cache_epoch(_at("2026-10-26T14:29")) == lunch
+    assert cache_epoch(_at("2026-10-26T14:30")).startswith("open:")
+    assert cache_epoch(_at("2026-10-26T17:10")) == "closed:2026-10-26T17:10"
+    assert market_calendar.seconds_until_change(_at("2026-10-26T11:00")) == 0
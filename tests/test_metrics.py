@@ -0,0 +1,84 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import streamlit as st
+
+from analytics.metrics import begin_run, bind, cached, prometheus_text, record, run_events, timed
+
+
+def _total(name, kind, metric):
+    text = prometheus_text()
+    match = re.search(rf'^{metric}{{name="{re.escape(name)}",kind="{kind}"}} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_cache_hits_misses_and_epoch_key():
+    epoch = {"value": 1}
+    calls = []
+
+    @cached("test.cached", st.cache_data, key=lambda: epoch["value"])
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    square.clear()
+    assert [square(3), square(3), square(4)] == [9, 9, 16]
+    assert calls == [3, 4]
+    assert _total("test.cached", "cache", "prediction_cache_hits_total") == 1
+    assert _total("test.cached", "cache", "prediction_cache_misses_total") == 2
+
+    # epoch ใหม่ = คีย์ใหม่ ต้องคำนวณอีกครั้ง
+    epoch["value"] = 2
+    assert square(3) == 9
+    assert calls == [3, 4, 3]
+    assert _total("test.cached", "cache", "prediction_cache_misses_total") == 3
+
+
+def test_bind_keeps_the_rerun_in_worker_threads():
+    begin_run("test.bind")
+
+    def work(i):
+        with timed("test.bind.step"):
+            return threading.get_ident()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(bind(work), range(8)))
+        # ไม่ bind: event ไม่ถูกนับในรอบของหน้า
+        list(executor.map(work, range(3)))
+    events = run_events()
+    assert (events["name"] == "test.bind.step").sum() == 8
+    assert _total("test.bind.step", "compute", "prediction_duration_seconds_count") == 11
+
+
+def test_timed_counts_errors_and_bytes():
+    with pytest.raises(ValueError):
+        with timed("test.timed", "fetch") as event:
+            event["bytes"] = 10
+            raise ValueError("boom")
+    assert _total("test.timed", "fetch", "prediction_errors_total") == 1
+    assert _total("test.timed", "fetch", "prediction_bytes_total") == 10
+
+
+def test_prometheus_exposition_format():
+    record("test.format", "compute", 0.2, nbytes=5)
+    record("test.format", "compute", 3.0)
+    record('test."quoted"', "compute", 0.001)
+    text = prometheus_text()
+    assert text.endswith("\n")
+    assert "# TYPE prediction_duration_seconds histogram" in text
+    assert "# TYPE prediction_cache_hits_total counter" in text
+    labels = 'name="test.format",kind="compute"'
+    assert f'prediction_duration_seconds_bucket{{{labels},le="0.1"}} 0' in text
+    assert f'prediction_duration_seconds_bucket{{{labels},le="0.25"}} 1' in text
+    assert f'prediction_duration_seconds_bucket{{{labels},le="5.0"}} 2' in text
+    assert f'prediction_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"prediction_duration_seconds_sum{{{labels}}} 3.200000" in text
+    assert f"prediction_duration_seconds_count{{{labels}}} 2" in text
+    assert 'name="test.\\"quoted\\""' in text
+    # hit/miss มีเฉพาะ kind="cache"
+    assert f"prediction_cache_hits_total{{{labels}}}" not in text
+    sample = re.compile(r'^[a-z_]+\{name="(?:[^"\\]|\\.)*",kind="[a-z]+"(?:,le="[^"]+")?\} [0-9.]+$')
+    for line in text.splitlines():
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or sample.match(line), line
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import analytics.corporate_actions as corporate_actions
+from analytics.providers import DataProvider, get_provider, set_provider
+from analytics.valuation import graham_value
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _Provider(DataProvider):
+    def info(self, ticker):
+        return {"regularMarketPrice": 10.0, "trailingEps": 2.0, "earningsGrowth": 0.05}
+
+    def fred(self, series, start=None):
+        return pd.DataFrame({series: [4.2]}, index=[pd.Timestamp("2026-10-01")])
+
+    def actions(self, ticker, start=None):
+        index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=300)
+        close = 10 + np.sin(np.arange(len(index)) / 20)
+        return pd.DataFrame({"Close": close, "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    previous = get_provider()
+    set_provider(_Provider())
+    full = corporate_actions.total_return_frame
+    monkeypatch.setattr(corporate_actions, "total_return_frame",
+                        lambda *args, **kwargs: full(*args, root=str(tmp_path), **kwargs))
+    yield
+    set_provider(previous)
+
+
+def test_drawdown_page_uses_the_shared_graham_value(provider):
+    at = AppTest.from_file(os.path.join(ROOT, "pages", "max.py"), default_timeout=60).run()
+    at.button[0].click().run()
+    assert not at.exception
+    expected = graham_value(2.0, 5.0, 4.2)
+    shown = [s.value for s in at.subheader]
+    assert f"**:blue[{round(expected['intrinsic_value'], 2)}]**" in shown
+    assert f"**:blue[{round(expected['accept_price'], 2)}]**" in shown
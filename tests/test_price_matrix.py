@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from analytics.price_matrix import ensure_matrix, price_frame
+from analytics.providers import DataProvider
+
+
+class _Provider(DataProvider):
+    def __init__(self, first="2024-01-01"):
+        self.first = first
+        self.requests = []
+
+    def download(self, tickers, start=None, end=None, period=None, interval="1d"):
+        self.requests.append(list(tickers))
+        dates = pd.bdate_range(max(pd.Timestamp(start), pd.Timestamp(self.first)), "2024-03-29")
+        columns = pd.MultiIndex.from_product([["Open", "High", "Low", "Close", "Volume"], tickers])
+        values = np.tile([[i + 1.0 for i in range(len(tickers))]], (len(dates), 5))
+        return pd.DataFrame(values, index=dates, columns=columns)
+
+
+def test_matrix_is_built_once_and_grown_for_new_tickers(tmp_path):
+    provider, root = _Provider(), str(tmp_path)
+    matrix = ensure_matrix(["B.BK", "A.BK"], "2024-01-01", provider, root)
+    assert matrix["tickers"] == ("A.BK", "B.BK")
+    assert ensure_matrix(["A.BK"], "2024-01-01", provider, root) is matrix
+    assert len(provider.requests) == 1
+
+    grown = ensure_matrix(["C.BK"], "2024-01-01", provider, root)
+    assert provider.requests[-1] == ["A.BK", "B.BK", "C.BK"]
+    assert grown["tickers"] == ("A.BK", "B.BK", "C.BK")
+
+
+def test_price_frame_slices_dates_and_tickers(tmp_path):
+    matrix = ensure_matrix(["A.BK", "B.BK"], "2024-01-01", _Provider(), str(tmp_path))
+    close = price_frame(matrix, "Close", ["B.BK", "X.BK"], start="2024-02-01", end="2024-02-29")
+    assert list(close.columns) == ["B.BK"]
+    assert close.index[0] == pd.Timestamp("2024-02-01")
+    assert close.index[-1] == pd.Timestamp("2024-02-29")
+    assert (close["B.BK"] == 2).all()
+    assert close.dtypes.iloc[0] == np.float32
+
+
+def test_start_before_the_first_price_is_covered_after_one_build(tmp_path):
+    # ผู้ให้บริการมีราคาตั้งแต่ 2024-02-01 (เช่นหุ้นเข้าตลาดทีหลัง)
+    provider, root = _Provider(first="2024-02-01"), str(tmp_path)
+    matrix = ensure_matrix(["A.BK"], "2023-01-01", provider, root)
+    assert matrix["dates"][0] == pd.Timestamp("2024-02-01")
+    assert ensure_matrix(["A.BK"], "2023-01-01", provider, root) is matrix
+    assert ensure_matrix(["A.BK"], "2023-06-01", provider, root) is matrix
+    assert len(provider.requests) == 1
+    ensure_matrix(["A.BK"], "2022-01-01", provider, root)
+    assert len(provider.requests) == 2
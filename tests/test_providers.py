@@ -0,0 +1,178 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.metrics import begin_run, run_events
+from analytics.providers import (
+    CoalescingProvider,
+    DataProvider,
+    InstrumentedProvider,
+    ProviderError,
+    RecordingProvider,
+    ReplayProvider,
+)
+
+
+class _SlowProvider(DataProvider):
+    name = "slow"
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.quote = {"nested": {"pe": 10}}
+
+    def download(self, tickers, start=None, end=None, period=None, interval="1d"):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return pd.DataFrame({"Close": [1.0, 2.0, 3.0]})
+
+    def info(self, ticker):
+        return self.quote
+
+
+def test_concurrent_calls_share_one_fetch_but_not_the_object():
+    upstream = _SlowProvider()
+    provider = CoalescingProvider(upstream)
+    results = [None] * 4
+
+    def call(i):
+        results[i] = provider.download("PTT.BK", start="2024-01-01")
+
+    threads = [threading.Thread(target=call, args=(0,))]
+    threads[0].start()
+    upstream.started.wait(5)
+    threads += [threading.Thread(target=call, args=(i,)) for i in range(1, 4)]
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.2)  # ให้ผู้เรียกที่ตามมารอผลของ flight เดียวกัน
+    upstream.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert upstream.calls == 1
+    assert len({id(r) for r in results}) == 4
+    results[0].reset_index(inplace=True)
+    results[0]["Close"] *= 10
+    for other in results[1:]:
+        assert list(other.columns) == ["Close"]
+        assert other["Close"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_leader_result_is_a_copy():
+    upstream = _SlowProvider()
+    provider = CoalescingProvider(upstream)
+    quote = provider.info("PTT.BK")
+    assert quote is not upstream.quote
+    quote["nested"]["pe"] = 99
+    assert upstream.quote["nested"]["pe"] == 10
+
+
+class _Upstream(DataProvider):
+    """Deterministic stand-in for Yahoo/FRED."""
+
+    name = "fake"
+    dates = pd.bdate_range("2024-01-01", "2024-12-31")
+
+    def _ohlcv(self, offset):
+        close = offset + np.arange(len(self.dates), dtype=float)
+        return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                             "Volume": 100.0}, index=self.dates.rename("Date"))
+
+    def download(self, tickers, start=None, end=None, period=None, interval="1d"):
+        frames = {t: self._ohlcv(10 * (i + 1)) for i, t in enumerate(tickers)}
+        data = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+        data = data.sort_index(axis=1, level=0, sort_remaining=False)
+        return data[data.index >= pd.Timestamp(start)] if start is not None else data
+
+    def history(self, ticker, period="5y"):
+        return self._ohlcv(50)
+
+    def info(self, ticker):
+        return {"symbol": ticker, "longName": "บริษัท ทดสอบ", "trailingPE": 12.5}
+
+    def actions(self, ticker, start=None):
+        return self._ohlcv(50).assign(Dividends=0.0, **{"Stock Splits": 0.0})
+
+    def fred(self, series, start=None):
+        return pd.DataFrame({series: 4.0 + np.arange(12) / 10},
+                            index=pd.date_range("2024-01-01", periods=12, freq="MS").rename("DATE"))
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    root = str(tmp_path)
+    recorder = RecordingProvider(_Upstream(), root)
+    live = recorder.download(["A.BK", "B.BK"], start="2024-01-01")
+    recorder.history("A.BK")
+    recorder.info("A.BK")
+    recorder.actions("A.BK")
+    recorder.fred("AAA")
+    return root, live
+
+
+def test_record_then_replay_round_trip(recorded):
+    root, live = recorded
+    replay = ReplayProvider(root)
+    pd.testing.assert_frame_equal(replay.download(["A.BK", "B.BK"]), live,
+                                  check_freq=False, check_names=False)
+    assert replay.info("A.BK") == _Upstream().info("A.BK")
+    pd.testing.assert_frame_equal(replay.fred("AAA"), _Upstream().fred("AAA"), check_freq=False)
+
+
+def test_replay_slices_by_start_end_and_period(recorded):
+    root, _ = recorded
+    replay = ReplayProvider(root)
+    window = replay.download(["A.BK"], start="2024-03-01", end="2024-04-01")
+    assert window.index[0] == pd.Timestamp("2024-03-01")
+    assert window.index[-1] == pd.Timestamp("2024-03-29")
+    assert list(window.columns.get_level_values(0).unique()) == ["Close", "High", "Low", "Open", "Volume"]
+    month = replay.history("A.BK", period="1mo")
+    assert month.index[0] >= pd.Timestamp("2024-11-29")
+    assert replay.actions("A.BK", start="2024-12-02").index[0] == pd.Timestamp("2024-12-02")
+    assert len(replay.fred("AAA", start="2024-07-01")) == 6
+    # หุ้นที่ไม่มี fixture ถูกข้าม ไม่ใช่ทั้งคำขอล้มเหลว
+    assert list(replay.download(["A.BK", "MISSING.BK"]).columns.get_level_values(1).unique()) == ["A.BK"]
+    with pytest.raises(ProviderError):
+        replay.info("MISSING.BK")
+    with pytest.raises(ProviderError):
+        replay.download(["A.BK"], interval="5m")
+
+
+def test_replay_injects_latency_and_seeded_failures(recorded):
+    root, _ = recorded
+    slow = ReplayProvider(root, latency=0.05)
+    start = time.perf_counter()
+    slow.info("A.BK")
+    assert time.perf_counter() - start >= 0.05
+
+    def outcomes(seed):
+        replay = ReplayProvider(root, error_rate=0.3, seed=seed)
+        results = []
+        for _ in range(200):
+            try:
+                replay.info("A.BK")
+                results.append(True)
+            except ProviderError:
+                results.append(False)
+        return results
+
+    first = outcomes(1)
+    assert first == outcomes(1)
+    assert 0.2 < first.count(False) / len(first) < 0.4
+    with pytest.raises(ProviderError, match="Injected failure"):
+        ReplayProvider(root, error_rate=1.0).info("A.BK")
+
+
+def test_instrumented_provider_records_time_and_bytes():
+    begin_run("test")
+    provider = InstrumentedProvider(_Upstream())
+    data = provider.download(["A.BK"])
+    events = run_events()
+    assert list(events["name"]) == ["fake.download"]
+    assert events["kind"].iloc[0] == "fetch"
+    assert events["bytes"].iloc[0] == int(data.memory_usage(index=True).sum())
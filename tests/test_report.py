@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+import analytics.report as report
+from analytics.valuation import graham_value
+
+
+@pytest.fixture
+def inputs(monkeypatch):
+    quotes = {
+        "A.BK": {"current_price": 10.0, "eps": 2.0, "growth_rate": 5.0, "current_yield": 4.2},
+        "B.BK": {"current_price": 50.0, "eps": None, "growth_rate": 5.0, "current_yield": 4.2},
+    }
+
+    def fetch_inputs(ticker, current_yield=None):
+        if ticker not in quotes:
+            raise ValueError(f"No current price for {ticker}")
+        return dict(quotes[ticker])
+
+    monkeypatch.setattr(report, "fetch_inputs", fetch_inputs)
+    monkeypatch.setattr(report, "get_aaa_yield", lambda: 4.2)
+    return quotes
+
+
+def test_graham_rows_keep_errors_per_ticker(inputs):
+    result = report.run_jobs(report.graham_row, ["A.BK", "B.BK", "X.BK"], workers=1, current_yield=4.2)
+    assert list(result["Ticker"]) == ["A.BK", "B.BK", "X.BK"]
+    assert result.loc[0, "intrinsic_value"] == pytest.approx(graham_value(2.0, 5.0, 4.2)["intrinsic_value"])
+    assert result.loc[0, "recommendation"] == "buy"
+    assert result.loc[1, "Error"] == "no EPS"
+    assert "No current price" in result.loc[2, "Error"]
+
+
+def test_cli_writes_csv_and_parquet(inputs, tmp_path, capsys):
+    csv_path = tmp_path / "out" / "graham.csv"
+    assert report.main(["graham", "--tickers", "A.BK,B.BK", "--workers", "1", "--out", str(csv_path)]) == 0
+    assert "2 rows" in capsys.readouterr().out
+    table = pd.read_csv(csv_path, encoding="utf-8-sig")
+    assert list(table["Ticker"]) == ["A.BK", "B.BK"]
+
+    parquet_path = tmp_path / "graham.parquet"
+    report.main(["graham", "--tickers", "A.BK", "--workers", "1", "--margin", "0", "--out", str(parquet_path)])
+    row = pd.read_parquet(parquet_path).iloc[0]
+    assert row["accept_price"] == pytest.approx(row["intrinsic_value"])
@@ -0,0 +1,123 @@
+import io
+
+import numpy as np
+import pandas as pd
+from streamlit.elements.widgets.button import convert_data_to_bytes_and_infer_mime
+
+from analytics.screener import (
+    PERCENTILE_SUFFIX,
+    apply_filters,
+    build_display_table,
+    build_fundamentals_table,
+    build_screen_index,
+    display_rows,
+    empty_record,
+    fundamentals_record,
+    sort_and_page,
+    top_n_positions,
+    write_csv,
+)
+
+
+def _table(n):
+    return pd.DataFrame({"Ticker": [f"S{i}.BK" for i in range(n)], "ชื่อ": ["บริษัท"] * n, "PE": range(n)})
+
+
+def test_write_csv_is_accepted_by_download_button():
+    data, _ = convert_data_to_bytes_and_infer_mime(write_csv(_table(3)), RuntimeError("unsupported"))
+    assert data.startswith(b"\xef\xbb\xbf")
+    assert "บริษัท" in data.decode("utf-8-sig")
+
+
+def test_write_csv_chunks_match_single_pass():
+    df = _table(25)
+    data = write_csv(df, chunk_rows=7)
+    assert pd.read_csv(io.BytesIO(data), encoding="utf-8-sig").equals(df)
+    assert data == write_csv(df)
+
+
+def _fundamentals(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(n):
+        info = {
+            "longName": f"Company {i}",
+            "trailingPE": rng.uniform(2, 40),
+            "priceToBook": rng.uniform(0.3, 5),
+            "debtToEquity": rng.uniform(0, 300),
+            "returnOnEquity": rng.uniform(-0.1, 0.3),
+            "returnOnAssets": rng.uniform(-0.05, 0.15),
+            "currentPrice": rng.uniform(1, 200),
+            "sector": ["Energy", "Banking", "Property"][i % 3],
+        }
+        if i % 17 == 0:
+            info["trailingPE"] = None
+        records.append(fundamentals_record(f"S{i}.BK", info))
+    records.append(empty_record("NONE.BK"))
+    return build_fundamentals_table(records)
+
+
+def test_index_query_matches_the_row_mask():
+    table = _fundamentals()
+    index = build_screen_index(table)
+    for filters in (
+        {},
+        {"pe_active": True, "pe_ratio": 15},
+        {"pe_active": True, "pe_ratio": 15, "roe_active": True, "roe": 10, "de_active": True, "de_ratio": 150},
+        {"roa_active": True, "roa": 20},
+    ):
+        pd.testing.assert_frame_equal(apply_filters(table, filters, index), apply_filters(table, filters))
+
+
+def test_top_n_and_paging_put_missing_values_last():
+    table = _fundamentals()
+    index = build_screen_index(table)
+    top = table.iloc[top_n_positions(index, "ROE", 5)]
+    assert list(top["ROE"]) == sorted(table["ROE"].dropna(), reverse=True)[:5]
+    last_page = sort_and_page(table, "PE Ratio", page=7, page_size=50)
+    assert last_page["PE Ratio"].isna().all()
+    first_page = sort_and_page(table, "PE Ratio", page=1, page_size=50)
+    assert first_page["PE Ratio"].is_monotonic_increasing
+
+
+def test_display_table_formats_each_column_once():
+    table = build_fundamentals_table([
+        fundamentals_record("A.BK", {"longName": "บริษัท เอ", "trailingPE": 12.345, "returnOnEquity": 0.1534,
+                                     "marketCap": 2.5e10, "currentPrice": 7.0, "sector": "Energy"}),
+        empty_record("B.BK"),
+    ])
+    display = build_display_table(table)
+    first, missing = display.iloc[0], display.iloc[1]
+    assert (first["PE Ratio"], first["ROE"], first["Current Price"], first["Market Cap (B)"]) == (
+        "12.35", "15.34%", "7.00", "25.00")
+    assert first["Company Name"] == "บริษัท เอ"
+    assert (missing[["PE Ratio", "ROE", "Market Cap (B)"]] == "N/A").all()
+
+
+def test_display_rows_follow_the_page_and_its_bounds():
+    table = _fundamentals(120)
+    display = build_display_table(table)
+    index = build_screen_index(table)
+    filtered = table.iloc[np.arange(0, 120, 2)]
+    filtered = filtered.assign(**{"ROE" + PERCENTILE_SUFFIX: index["sector_rank"]["ROE"][np.arange(0, 120, 2)]})
+
+    page = sort_and_page(filtered, "Market Cap", ascending=False, page=2, page_size=25)
+    rows = display_rows(display, page)
+    assert list(rows["Ticker"]) == list(page["Ticker"])
+    assert len(rows) == 25
+    assert rows["ROE" + PERCENTILE_SUFFIX].str.endswith("%").all()
+
+    last = sort_and_page(filtered, "Market Cap", page=3, page_size=25)
+    assert len(last) == 10
+    assert sort_and_page(filtered, "Market Cap", page=4, page_size=25).empty
+    pd.testing.assert_frame_equal(sort_and_page(filtered, "Ticker", page=0, page_size=25),
+                                  sort_and_page(filtered, "Ticker", page=1, page_size=25))
+
+
+def test_display_rows_of_an_empty_result():
+    table = _fundamentals(10)
+    display = build_display_table(table)
+    empty = sort_and_page(table.iloc[[]], "PE Ratio")
+    rows = display_rows(display, empty)
+    assert rows.empty
+    assert list(rows.columns) == list(display.columns)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.simulation import MAX_CHECKPOINTS, project_portfolio, simulate_paths
+
+
+def _portfolio(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    values = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.01, n)))
+    return pd.Series(values, index=pd.bdate_range("2022-01-03", periods=n))
+
+
+def test_paths_are_reproducible_with_a_seed():
+    portfolio = _portfolio()
+    steps, values = simulate_paths(portfolio, 300, n_paths=1_000, seed=7, workers=1)
+    _, again = simulate_paths(portfolio, 300, n_paths=1_000, seed=7, workers=1)
+    assert steps[-1] == 300
+    assert len(steps) <= MAX_CHECKPOINTS
+    assert values.shape == (1_000, len(steps))
+    assert values.dtype == np.float32
+    np.testing.assert_array_equal(values, again)
+
+
+def test_constant_growth_is_reproduced_exactly():
+    portfolio = pd.Series(100 * 1.01 ** np.arange(50), index=pd.bdate_range("2024-01-01", periods=50))
+    steps, values = simulate_paths(portfolio, 10, n_paths=100, seed=0, workers=1)
+    np.testing.assert_allclose(values, np.broadcast_to(1.01 ** steps, values.shape), rtol=1e-6)
+    _, gbm = simulate_paths(portfolio, 10, n_paths=100, method="gbm", seed=0, workers=1)
+    np.testing.assert_allclose(gbm[:, -1], 1.01 ** 10, rtol=1e-6)
+
+
+def test_projection_fan_and_summary():
+    portfolio = _portfolio()
+    fan, summary = project_portfolio(portfolio, 60, n_paths=2_000, seed=1, workers=1)
+    assert fan.index[0] == portfolio.index[-1]
+    assert (fan.iloc[0] == portfolio.iloc[-1]).all()
+    assert (fan["P5"] <= fan["P50"]).all() and (fan["P50"] <= fan["P95"]).all()
+    assert 0 <= summary["Probability of Loss (%)"] <= 100
+
+
+def test_bad_inputs_raise():
+    with pytest.raises(ValueError):
+        simulate_paths(_portfolio(), 10, method="unknown")
+    with pytest.raises(ValueError):
+        simulate_paths(pd.Series([1.0, 1.0]), 10)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from analytics.screener import build_fundamentals_table, empty_record, fundamentals_record
+from analytics.snapshots import append_snapshot, available_dates, load_history, load_snapshot
+
+
+def _table(pe, tickers=("PTT.BK", "AOT.BK")):
+    records = [fundamentals_record(t, {"trailingPE": pe, "sector": "Energy"}) for t in tickers]
+    return build_fundamentals_table(records + [empty_record("FAIL.BK")])
+
+
+def test_snapshots_are_point_in_time(tmp_path):
+    root = str(tmp_path)
+    append_snapshot(_table(10.0), "2026-01-30", root)
+    append_snapshot(_table(12.0), "2026-02-02", root)
+    append_snapshot(_table(14.0, ("PTT.BK",)), "2026-02-02", root)
+
+    assert list(available_dates(root)) == [pd.Timestamp("2026-01-30"), pd.Timestamp("2026-02-02")]
+    day, table = load_snapshot("2026-02-01", root)
+    assert day == pd.Timestamp("2026-01-30")
+    assert set(table["Ticker"]) == {"PTT.BK", "AOT.BK"}
+    assert (table["PE Ratio"] == 10).all()
+    assert table["PE Ratio"].dtype == np.float32
+
+    # แถวของวันเดียวกันถูกแทนที่ หุ้นอื่นยังอยู่
+    _, latest = load_snapshot("2026-12-31", root)
+    assert dict(zip(latest["Ticker"], latest["PE Ratio"])) == {"AOT.BK": 12, "PTT.BK": 14}
+    assert load_snapshot("2025-12-31", root)[0] is None
+
+
+def test_history_reads_only_the_requested_range(tmp_path):
+    root = str(tmp_path)
+    for day, pe in (("2026-01-15", 9.0), ("2026-02-16", 10.0), ("2026-03-16", 11.0)):
+        append_snapshot(_table(pe), day, root)
+    history = load_history("2026-02-01", "2026-03-31", columns=["PE Ratio"], root=root)
+    assert list(history.columns) == ["Date", "Ticker", "PE Ratio"]
+    assert sorted(history["PE Ratio"].unique()) == [10, 11]
+    assert "FAIL.BK" not in set(history["Ticker"])
@@ -0,0 +1,30 @@
+import analytics.universe as universe
+
+
+def _write(path, rows):
+    path.write_text("symbol,market,sector,indices\n" + "\n".join(rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_full_listing_needs_more_than_the_index(tmp_path, monkeypatch):
+    seeded = _write(tmp_path / "set50.csv", ["PTT,SET,Energy,SET50", "AOT,SET,Services,SET50"])
+    monkeypatch.setattr(universe, "_universe", universe.load_universe(seeded))
+    assert not universe.has_full_listing()
+
+    full = _write(tmp_path / "full.csv", ["PTT,SET,Energy,SET50", "AOT,SET,Services,SET50",
+                                          "ABC,mai,Technology,"])
+    universe.refresh_universe(full)
+    assert universe.has_full_listing()
+    assert universe.load_symbols(full, markets=("mai",)) == ("ABC.BK",)
+    assert universe.index_members("SET50") == ("PTT.BK", "AOT.BK")
+
+
+def test_screener_sector_comes_from_the_registry(tmp_path, monkeypatch):
+    from analytics.screener import empty_record, fundamentals_record
+
+    listing = _write(tmp_path / "symbols.csv", ["PTT,SET,Energy,SET50", "NEW,mai,,"])
+    monkeypatch.setattr(universe, "_universe", universe.load_universe(listing))
+    assert fundamentals_record("PTT.BK", {"sector": "Oil & Gas"})["Sector"] == "Energy"
+    assert fundamentals_record("NEW.BK", {"sector": "Industrials"})["Sector"] == "Industrials"
+    assert fundamentals_record("OTHER.BK", {})["Sector"] == "N/A"
+    assert empty_record("PTT.BK")["Sector"] == "Energy"
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from analytics.valuation import get_growth_rate, graham_grid, graham_value, recommendation
+
+
+@pytest.mark.parametrize("growth, expected", [(-5.0, -3.1428571), (0.8, 21.1619048), (5.0, 38.7619048)])
+def test_graham_value_reads_growth_as_percent(growth, expected):
+    value = graham_value(2.0, growth, 4.2, ng_pe=8.5, multiplier=2, margin=35)
+    assert value["intrinsic_value"] == pytest.approx(expected)
+    assert value["accept_price"] == pytest.approx(expected * 0.65)
+
+
+def test_growth_rate_from_quote_is_percent():
+    assert get_growth_rate({"earningsGrowth": 0.008}) == pytest.approx(0.8)
+    assert get_growth_rate({"earningsGrowth": -0.05}) == pytest.approx(-5.0)
+
+
+def test_recommendation_bands():
+    assert recommendation(30, 50, 35) == "buy"
+    assert recommendation(40, 50, 35) == "consider"
+    assert recommendation(60, 50, 35) == "avoid"
+
+
+def test_graham_value_matches_grid():
+    eps = [2.0, -1.0, 5.5]
+    growth_rates = np.linspace(-5, 20, 11)
+    yields = np.linspace(1, 8, 8)
+    ng_pes = [7.0, 8.5, 10.0]
+    grid = graham_grid(eps, growth_rates, yields, ng_pes, multiplier=2, margin=30)
+    assert grid["intrinsic_value"].shape == (3, 3, 11, 8)
+    for i, e in enumerate(eps):
+        for j, pe in enumerate(ng_pes):
+            for k, g in enumerate(growth_rates):
+                for m, y in enumerate(yields):
+                    value = graham_value(e, g, y, ng_pe=pe, multiplier=2, margin=30)
+                    assert value["intrinsic_value"] == pytest.approx(grid["intrinsic_value"][i, j, k, m])
+                    assert value["accept_price"] == pytest.approx(grid["accept_price"][i, j, k, m])